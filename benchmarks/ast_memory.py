@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Measure memory taken by the AST of a large generated Angel program.
+
+Run from the repository root: python3 benchmarks/ast_memory.py [number of statement groups]
+
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler import parsers, visitors  # noqa: E402
+
+
+def generate_code(groups: int) -> str:
+    lines = []
+    for i in range(groups):
+        lines.extend([
+            f"let a{i}: I32 = {i} + b{i} * (c{i} - 2)",
+            f"if a{i} == {i}:",
+            f"    print(point{i}.x + point{i}.y)",
+            f"    values{i}.append(a{i})",
+            f"fun f{i}(x: I32, y: I32) -> I32:",
+            f"    return x * y + {i}",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def count_nodes(ast) -> int:
+    return sum(1 for _ in visitors.walk(ast))
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    code = generate_code(groups)
+    parser = parsers.Parser()
+    gc.collect()
+    tracemalloc.start()
+    ast = parser.parse(code)
+    del parser
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes_count = count_nodes(ast)
+    print(f"{nodes_count} nodes, {size / 2 ** 20:.1f} MiB, {size / nodes_count:.0f} bytes per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Measure checking code without estimating values at compile time.
+
+Compiles a generated program whose constants are computed by calling functions with loops (so normal compilation
+runs the loops at compile time) and only checks it (compiler.check_string), which gives the same type errors
+without estimating values and without translating the code.
+
+Run from the repository root: python3 benchmarks/check_only.py [number of functions] [loop iterations]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiler  # noqa: E402
+
+
+def generate_code(functions: int, iterations: int) -> str:
+    lines = []
+    for i in range(functions):
+        lines.extend([
+            f"fun count{i}(limit: I64) -> I64:",
+            "    var total: I64 = 0",
+            "    var j: I64 = 0",
+            "    while j < limit:",
+            f"        total = total + j * {i}",
+            "        j = j + 1",
+            "    return total",
+            "",
+            f"let value{i} = count{i}({iterations})",
+            f"print(value{i})",
+            "",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    code = generate_code(functions, iterations)
+
+    def compile_code():
+        compiler.compile_string(code, mangle_names=False)
+
+    def check_code():
+        compiler.check_string(code, mangle_names=False)
+
+    print(f"{functions} functions, {iterations} loop iterations each")
+    print(f"compile:    {min(timeit.repeat(compile_code, number=1, repeat=3)) * 1000:.0f} ms")
+    print(f"check only: {min(timeit.repeat(check_code, number=1, repeat=3)) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
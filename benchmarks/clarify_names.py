@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Measure classification of identifiers by the clarifier on identifier-heavy code.
+
+Compares the reserved-name index with trying every name enum's constructor in turn (which raises ValueError for
+every enum an identifier is not in) and times clarification of a whole generated program.
+
+Run from the repository root: python3 benchmarks/clarify_names.py [number of statement groups]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler import clarification, nodes, parsers, visitors  # noqa: E402
+from compiler.context import Context  # noqa: E402
+
+
+def generate_code(groups: int) -> str:
+    lines = []
+    for i in range(groups):
+        lines.extend([
+            f"let first{i}: I32 = second{i} + third{i} * fourth{i} - fifth{i}",
+            f"if first{i} == second{i} and third{i} != fourth{i}:",
+            f"    print(point{i}.x + point{i}.y + self{i})",
+            f"var flag{i}: Bool = True",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def classify_by_enum_constructors(identifier: str):
+    for cls in clarification.NAME_ENUMS:
+        try:
+            return cls(identifier)
+        except ValueError:
+            continue
+    return None
+
+
+def collect_identifiers(ast) -> list:
+    return [node.member for node in visitors.walk(ast) if isinstance(node, nodes.Name)]
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ast = parsers.Parser().parse(generate_code(groups))
+    identifiers = collect_identifiers(ast)
+
+    def by_index():
+        for identifier in identifiers:
+            clarification.RESERVED_NAMES.get(identifier)
+
+    def by_constructors():
+        for identifier in identifiers:
+            classify_by_enum_constructors(identifier)
+
+    print(f"{len(identifiers)} identifiers")
+    print(f"reserved-name index:    {min(timeit.repeat(by_index, number=1, repeat=5)) * 1000:.1f} ms")
+    print(f"enum constructors:      {min(timeit.repeat(by_constructors, number=1, repeat=5)) * 1000:.1f} ms")
+
+    def clarify():
+        list(clarification.Clarifier(Context([], "main", mangle_names=True)).clarify_ast(ast))
+
+    print(f"clarify whole program:  {min(timeit.repeat(clarify, number=1, repeat=5)) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
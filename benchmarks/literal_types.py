@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Measure type checking of literal-heavy code.
+
+Compares subtype checks of builtin types by list membership (how unify_builtin_types checked them) with the bit
+test of the precomputed builtin type lattice, times selection of int types for values and compiles a whole
+generated program made mostly of integer and float literals.
+
+Run from the repository root: python3 benchmarks/literal_types.py [number of statement groups]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiler  # noqa: E402
+from compiler import nodes, type_checking  # noqa: E402
+
+
+def generate_code(groups: int) -> str:
+    lines = []
+    for i in range(groups):
+        lines.extend([
+            f"let small{i}: I64 = {i % 100} + {i % 7} * {i % 13} - {i % 5}",
+            f"let big{i} = {i * 70000} + {i * 300}",
+            f"let unsigned{i}: U32 = {i % 250 + 70000}",
+            f"let vector{i}: [I32] = [{i}, {i + 1}, {i * 2}, {i * 1000}]",
+            f"let float{i}: F64 = {i}.25",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pairs = [(subtype, supertype) for subtype in nodes.BuiltinType for supertype in nodes.BuiltinType
+             if subtype.value in nodes.BUILTIN_SUPERTYPES]
+    values = [sign * 3 ** power for power in range(42) for sign in (1, -1)]
+
+    def by_lists():
+        for subtype, supertype in pairs:
+            supertype.value in subtype.get_builtin_supertypes()
+
+    def by_bits():
+        for subtype, supertype in pairs:
+            subtype.is_builtin_subtype(supertype)
+
+    def possible_int_types():
+        for value in values:
+            type_checking.get_possible_int_types_based_on_value(value)
+
+    print(f"{len(pairs)} builtin type pairs, {len(values)} int values")
+    print(f"subtype checks by lists:  {min(timeit.repeat(by_lists, number=100, repeat=5)) * 10:.2f} ms")
+    print(f"subtype checks by bits:   {min(timeit.repeat(by_bits, number=100, repeat=5)) * 10:.2f} ms")
+    print(f"possible int types:       {min(timeit.repeat(possible_int_types, number=100, repeat=5)) * 10:.3f} ms")
+
+    code = generate_code(groups)
+
+    def compile_code():
+        compiler.compile_string(code, mangle_names=False)
+
+    print(f"compile {groups * 5} declarations: {min(timeit.repeat(compile_code, number=1, repeat=3)) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Measure analysis of function bodies in worker processes.
+
+Compiles a generated program made of many independent top-level functions (every third of them calls the one
+declared before it) with analysis in the main process only and with bodies analyzed in worker processes, and checks
+that both give the same output. The speedup depends on the number of CPUs.
+
+Run from the repository root: python3 benchmarks/parallel_analysis.py [number of functions]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiler  # noqa: E402
+from compiler import analysis  # noqa: E402
+
+
+def generate_code(functions: int) -> str:
+    lines = ["struct Point:", "    x: I32", "    y: I32", ""]
+    for i in range(functions):
+        lines.extend([
+            f"fun f{i}(a: I32, p: Point) -> I32:",
+            "    var values: [I32] = []",
+            "    values.append(a)",
+            f"    let q = Point(p.x, {i})",
+            f"    let words = [\"a\", \"b{i}\"]",
+            f"    let pairs = [\"k{i}\": [1, 2, {i}]]",
+            f"    return f{i - 1}(a, q)" if i % 3 == 1 else "    return q.y",
+            "",
+        ])
+    lines.append("print(f0(1, Point(1, 2)))")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    code = generate_code(functions)
+    outputs = {}
+    print(f"{functions} functions, {os.cpu_count()} CPUs")
+    for label, threshold in (("main process only", 10 ** 9), ("worker processes", 1)):
+        analysis.PARALLEL_ANALYSIS_THRESHOLD = threshold
+
+        def compile_code():
+            outputs[label] = compiler.compile_string(code, mangle_names=False)
+
+        print(f"{label}: {min(timeit.repeat(compile_code, number=1, repeat=3)) * 1000:.0f} ms")
+    print("same output" if len(set(outputs.values())) == 1 else "DIFFERENT OUTPUT")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Measure parsing imported modules in worker processes, to choose compiler.PARALLEL_PARSING_THRESHOLD.
+
+Parses generated modules in the main process and in a pool of two workers (the smallest pool compiler._parse_modules
+starts), and measures the cost of a pool round trip with nothing to parse. With two workers the pool saves half of
+the parsing time and costs the round trip and sending the ASTs back, so it pays off above the printed size.
+
+Run from the repository root: python3 benchmarks/parallel_parsing.py [functions per module]
+
+"""
+import os
+import sys
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiler  # noqa: E402
+
+
+def generate_module(index: int, functions: int) -> str:
+    lines = []
+    for i in range(functions):
+        lines.extend([
+            f"fun f{index}x{i}(a: I32) -> I32:",
+            "    var values: [I32] = []",
+            "    values.append(a)",
+            f"    let words = [\"a\", \"b{i}\"]",
+            "    return a + 1",
+            "",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def parse_in_pool(modules):
+    with ProcessPoolExecutor(2) as executor:
+        return list(executor.map(compiler._parse_module, modules))
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=5))
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    modules = [generate_module(index, functions) for index in range(2)]
+    size = sum(map(len, modules))
+    print(f"2 modules, {size} characters, {os.cpu_count()} CPUs")
+    sequential = best(lambda: [compiler._parse_module(module) for module in modules])
+    pooled = best(lambda: parse_in_pool(modules))
+    round_trip = best(lambda: parse_in_pool(["let a = 1\n", "let b = 2\n"]))
+    print(f"main process only: {sequential * 1000:.0f} ms")
+    print(f"worker processes:  {pooled * 1000:.0f} ms")
+    print(f"empty round trip:  {round_trip * 1000:.0f} ms")
+    # Everything the pool adds on one CPU beyond the round trip is sending the ASTs back.
+    transfer = max(pooled - sequential - round_trip, 0) / sequential
+    if transfer < 0.5:
+        break_even = round_trip / (0.5 - transfer) / sequential * size
+        print(f"pays off with two CPUs above about {break_even:.0f} characters")
+    else:
+        print("sending the ASTs back costs more than two workers save")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import cmd
+import os
 import sys
 import traceback
 import typing as t
 import subprocess
 import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 from . import (
     nodes,
@@ -15,12 +17,18 @@ from . import (
     clarification,
     repl_evaluation,
     analysis,
+    ast_cache,
+    analysis_cache,
 )
-from .utils import get_hash
+from .utils import get_hash, module_hash
 from .context import Context
 
 
 DEBUG = False
+# Imported modules are parsed in worker processes only if there are at least two CPUs and the modules found at once
+# have at least that many characters. Starting the workers and sending the ASTs back cost about as much as parsing
+# that much code (see benchmarks/parallel_parsing.py).
+PARALLEL_PARSING_THRESHOLD = 16000
 
 
 def compile_file(file_path: str) -> str:
@@ -39,18 +47,90 @@ def _handle_angel_error(exception: errors.AngelError) -> t.NoReturn:
         sys.exit(1)
 
 
+def _parse_module(string: str) -> nodes.AST:
+    return parsers.Parser().parse(string)
+
+
+def _parse_modules(strings: t.List[str]) -> t.List[nodes.AST]:
+    """Parse independent modules, in a process pool if they are large enough. Results are in the same order as
+    strings."""
+    workers = min(os.cpu_count() or 1, len(strings))
+    if workers < 2 or sum(map(len, strings)) < PARALLEL_PARSING_THRESHOLD:
+        return [_parse_module(string) for string in strings]
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(_parse_module, strings))
+
+
+def _load_modules(string: str, context: Context, clarifier: clarification.Clarifier) -> t.List[t.Iterable[nodes.Node]]:
+    """Return clarified ASTs of the modules the code imports (directly or not) and of the code itself, every module
+    before the modules that import it.
+
+    Imports are found in the parsed ASTs (or taken from the AST cache) before anything is clarified, so the result
+    does not depend on the cache. Every module is clarified with its own hash as context.main_hash. The code itself
+    is clarified lazily and, unless it imports modules, parsed lazily too.
+
+    """
+    main_hash = context.main_hash
+    # Module (None for the code itself) -> whether its AST is cached (clarified), its AST and the modules it imports.
+    asts: t.Dict[t.Optional[str], t.Tuple[bool, t.Iterable[nodes.Node], t.List[str]]] = {}
+    cached = ast_cache.load(string, context)
+    if cached is not None:
+        asts[None] = (True, *cached)
+    elif "#" in string:
+        parsed = parsers.Parser().parse(string)
+        asts[None] = (False, parsed, parsers.imported_modules(parsed))
+    else:
+        asts[None] = (False, parsers.Parser().iter_parse(string), [])
+    # Modules imported by the modules found last are found together, the ones that are not cached are parsed at once.
+    found = asts[None][2]
+    while found:
+        not_cached = []
+        for module in found:
+            context.main_hash = module_hash(module, context)
+            cached = ast_cache.load(context.imported_lines[module], context)
+            if cached is None:
+                not_cached.append(module)
+            else:
+                asts[module] = (True, *cached)
+        parsed_asts = _parse_modules([context.imported_lines[module] for module in not_cached])
+        for module, parsed in zip(not_cached, parsed_asts):
+            asts[module] = (False, parsed, parsers.imported_modules(parsed))
+        found = list(dict.fromkeys(
+            imported for module in found for imported in asts[module][2] if imported not in asts
+        ))
+
+    # Modules after the modules they import.
+    order: t.List[t.Optional[str]] = []
+    visited: t.Set[t.Optional[str]] = set()
+
+    def visit(module: t.Optional[str]) -> None:
+        visited.add(module)
+        for imported in asts[module][2]:
+            if imported not in visited:
+                visit(imported)
+        order.append(module)
+
+    visit(None)
+    result: t.List[t.Iterable[nodes.Node]] = []
+    for module in order:
+        is_cached, ast, imports = asts[module]
+        if module is None:
+            context.main_hash, content = main_hash, string
+        else:
+            context.main_hash, content = context.module_hashs[module], context.imported_lines[module]
+        if not is_cached:
+            ast = ast_cache.clarify(content, context, clarifier, ast, imports)
+        # Modules are clarified now, while main_hash is their hash.
+        result.append(ast if module is None else list(ast))
+    return result
+
+
 def _run_frontend(string: str, compilation_context: Context, env: t.Optional[environment.Environment] = None) -> t.Iterable[nodes.Node]:
-    parser = parsers.Parser()
+    # Every stage is lazy: a statement of the code is analyzed as soon as it is parsed (see _load_modules).
     clarifier = clarification.Clarifier(compilation_context)
     analyzer = analysis.Analyzer(compilation_context, env=env)
-    clarified_ast: t.Iterable[nodes.Node] = clarifier.clarify_ast(parser.parse(string))
-    for module_name, module_content in compilation_context.imported_lines.items():
-        module_hash = compilation_context.module_hashs[module_name]
-        compilation_context.main_hash = module_hash
-        clarified_ast = itertools.chain(
-            clarifier.clarify_ast(parser.parse(module_content)), clarified_ast
-        )
-    yield from analyzer.analyze_ast(clarified_ast)
+    asts = _load_modules(string, compilation_context, clarifier)
+    yield from analyzer.analyze_ast(itertools.chain.from_iterable(asts))
 
 
 def compile_string(string: str, mangle_names: bool = True) -> str:
@@ -68,6 +148,16 @@ def compile_string(string: str, mangle_names: bool = True) -> str:
         return generators.generate_cpp(cpp_ast)
 
 
+def check_string(string: str, mangle_names: bool = True) -> None:
+    """Check Angel code represented by `string` for errors, without estimating values at compile time."""
+    compilation_context = Context(string.split("\n"), get_hash(string), mangle_names, check_only=True)
+    try:
+        for _ in _run_frontend(string, compilation_context):
+            pass
+    except errors.AngelError as e:
+        _handle_angel_error(e)
+
+
 def angel_repl_eval(string: str, env: environment.Environment) -> t.Any:
     """Evaluate Angel code represented by `string` and returns the result."""
     lines = string.split("\n")
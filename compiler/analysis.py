@@ -1,21 +1,93 @@
+import os
 import re
 
-from typing import Optional, Union, Dict, List, Tuple, Iterable, cast
-from itertools import zip_longest
+from typing import Optional, Union, Dict, List, Tuple, Iterable, Iterator, Container, Hashable, cast
+from itertools import repeat, zip_longest
+from concurrent.futures import ProcessPoolExecutor
 
 from . import (
-    nodes, estimation, type_checking, environment, errors, estimation_nodes as enodes, environment_entries as entries
+    nodes, estimation, type_checking, environment, errors, analysis_cache, parallel_analysis,
+    estimation_nodes as enodes, environment_entries as entries
 )
 from .enums import DeclType
 from .context import Context
 from .utils import submangle, dispatch, NODES, ASSIGNMENTS
+from .visitors import Dispatcher, Visitor
 from .testutils import CompilerStageTestCase
 
 
 CAMEL_CASE_REGEX = re.compile("[_]?[a-z][a-zA-Z0-9]*")
+# Bodies of consecutive top-level functions are analyzed in worker processes only if at least that many of them can
+# be analyzed at once (see Analyzer._analyze_functions).
+PARALLEL_ANALYSIS_THRESHOLD = 64
 
+# Function declaration, checked arguments, checked return type and the environment saved after adding the function.
+FunctionJob = Tuple[nodes.FunctionDeclaration, List[nodes.Argument], nodes.Type, environment.Scope]
 
-class Analyzer(CompilerStageTestCase):
+
+def _analyze_function_bodies(context: Context, jobs: List[FunctionJob]) -> bytes:
+    """Analyze bodies of functions in a worker process. Bodies that have errors are None."""
+    analyzer = Analyzer(context, environment.Environment())
+    bodies: List[Optional[nodes.AST]] = []
+    for declaration, arguments, return_type, saved in jobs:
+        try:
+            bodies.append(analyzer._analyze_saved_function_body(declaration, arguments, return_type, saved))
+        except Exception:
+            # The main process analyzes the body again and reports the error.
+            bodies.append(None)
+    return parallel_analysis.dump_results(bodies, context.template_types, [job[3] for job in jobs])
+
+
+class Analyzer(Visitor, CompilerStageTestCase):
+    node_dispatcher = Dispatcher({
+        nodes.Decl: '_analyze_declaration',
+        nodes.FunctionDeclaration: '_analyze_function_declaration',
+        nodes.StructDeclaration: '_analyze_struct_declaration',
+        nodes.ExtensionDeclaration: '_analyze_extension_declaration',
+        nodes.AlgebraicDeclaration: '_analyze_algebraic_declaration',
+        nodes.InterfaceDeclaration: '_analyze_interface_declaration',
+        nodes.FieldDeclaration: '_analyze_field_declaration',
+        nodes.MethodDeclaration: '_analyze_method_declaration',
+        nodes.InitDeclaration: '_analyze_init_declaration',
+
+        nodes.Assignment: '_analyze_assignment',
+        nodes.If: '_analyze_if_statement',
+        nodes.While: '_analyze_while_statement',
+        nodes.For: '_analyze_for_statement',
+        nodes.Return: '_analyze_return',
+        nodes.Break: '_analyze_break',
+        nodes.FunctionCall: '_analyze_function_call',
+        nodes.InitCall: '_analyze_init_call',
+        nodes.MethodCall: '_analyze_method_call',
+    })
+
+    _assignment_dispatcher = Dispatcher({
+        nodes.Name: '_check_name_reassignment',
+        nodes.Field: '_check_field_reassignment',
+        nodes.Subscript: '_check_subscript_reassignment',
+    })
+
+    _change_type_dispatcher = Dispatcher({
+        nodes.Name: '_change_type_of_name',
+        nodes.Field: '_change_type_of_field',
+        nodes.Subscript: '_change_type_of_subscript',
+    })
+
+    _check_interface_implementation_dispatcher = Dispatcher({
+        entries.StructEntry: '_check_struct_interface_implementation',
+    })
+
+    _builtin_function_dispatcher = Dispatcher({
+        nodes.BuiltinFunc.print.value: '_analyze_print_function_call',
+    })
+
+    _apply_clause_to_env_dispatcher_binary_expression = Dispatcher({
+        nodes.Operator.is_.value: '_apply_is_check_to_env',
+
+        # TODO: apply to estimated_value
+        nodes.Operator.lt.value: lambda self, _: None,
+        nodes.Operator.gt.value: lambda self, _: None,
+    })
 
     def __init__(self, context: Context, env: Optional[environment.Environment] = None):
         super().__init__()
@@ -25,71 +97,252 @@ class Analyzer(CompilerStageTestCase):
         self.line = 0
 
         self._function_return_types: List[nodes.Type] = []
+        # (id(struct entry), interface) -> the struct entry, for interfaces the struct is checked to implement.
+        self._checked_interface_implementations: Dict[Tuple[int, Hashable], entries.Entry] = {}
+        # Name -> entry of a top-level declaration whose code uses only its own names, interfaces and other
+        # self-contained declarations (see _is_self_contained).
+        self._self_contained: Dict[str, entries.Entry] = {}
+        # Analyzed functions are reused only for whole programs, an environment passed in can hold declarations the
+        # cache does not know about.
+        self._cache = analysis_cache.get_cache() if env is None else None
+        # Name -> key of the top-level declaration (see analysis_cache).
+        self._declaration_keys: Dict[str, str] = {}
 
         self._type_checker = type_checking.TypeChecker(self.context, self.env)
         self._estimator = estimation.Estimator(self.context, self.env)
         self._type_checker.estimator = self._estimator
 
-        self._node_dispatcher = {
-            nodes.Decl: self._analyze_declaration,
-            nodes.FunctionDeclaration: self._analyze_function_declaration,
-            nodes.StructDeclaration: self._analyze_struct_declaration,
-            nodes.ExtensionDeclaration: self._analyze_extension_declaration,
-            nodes.AlgebraicDeclaration: self._analyze_algebraic_declaration,
-            nodes.InterfaceDeclaration: self._analyze_interface_declaration,
-            nodes.FieldDeclaration: self._analyze_field_declaration,
-            nodes.MethodDeclaration: self._analyze_method_declaration,
-            nodes.InitDeclaration: self._analyze_init_declaration,
-
-            nodes.Assignment: self._analyze_assignment,
-            nodes.If: self._analyze_if_statement,
-            nodes.While: self._analyze_while_statement,
-            nodes.For: self._analyze_for_statement,
-            nodes.Return: self._analyze_return,
-            nodes.Break: self._analyze_break,
-            nodes.FunctionCall: self._analyze_function_call,
-            nodes.InitCall: self._analyze_init_call,
-            nodes.MethodCall: self._analyze_method_call,
-        }
+    def analyze_ast(self, ast: Iterable[nodes.Node]) -> Iterable[nodes.Node]:
+        """Analyze top-level statements one by one. Runs of consecutive function declarations are collected first,
+        long ones are analyzed by _analyze_functions.
 
-        self._assignment_dispatcher = {
-            nodes.Name: self._check_name_reassignment,
-            nodes.Field: self._check_field_reassignment,
-            nodes.Subscript: self._check_subscript_reassignment,
-        }
+        If the analysis cache is enabled, functions whose analysis would not change are taken from it and the
+        analyzed ones are stored in it.
 
-        self._change_type_dispatcher = {
-            nodes.Name: self._change_type_of_name,
-            nodes.Field: self._change_type_of_field,
-            nodes.Subscript: self._change_type_of_subscript,
-        }
+        """
+        statements = iter(ast)
+        functions: List[nodes.FunctionDeclaration] = []
+        # Content hashes and dependencies of the collected functions (if the cache is enabled).
+        cache_records: List[Tuple[str, analysis_cache.Dependencies]] = []
+        while True:
+            try:
+                node = next(statements, None)
+            except Exception:
+                # Errors of the collected functions come first.
+                yield from self._analyze_function_run(functions, cache_records)
+                raise
+            if isinstance(node, nodes.FunctionDeclaration):
+                if self._cache is not None:
+                    content, dependencies = self._update_declaration_keys(node)
+                    cached = self._cache.load(content, dependencies, node.line, self.context)
+                    if cached is not None:
+                        yield from self._analyze_function_run(functions, cache_records)
+                        functions, cache_records = [], []
+                        yield self._load_function(cached)
+                        continue
+                    cache_records.append((content, dependencies))
+                functions.append(node)
+                continue
+            yield from self._analyze_function_run(functions, cache_records)
+            functions, cache_records = [], []
+            if node is None:
+                return
+            if self._cache is not None:
+                self._update_declaration_keys(node)
+            yield self.analyze_node(node)
+            self._update_self_contained(node)
 
-        self._check_interface_implementation_dispatcher = {
-            entries.StructEntry: self._check_struct_interface_implementation
-        }
+    def analyze_node(self, node: nodes.Node) -> nodes.Node:
+        self.line = node.line
+        return self.visit(node)
 
-        self._builtin_function_dispatcher = {
-            nodes.BuiltinFunc.print.value: self._analyze_print_function_call,
-        }
+    def analyze_body(self, ast: Iterable[nodes.Node]) -> List[nodes.Node]:
+        """Use this function instead of analyze_ast to avoid methods or fields not adding to the environment."""
+        return [self.analyze_node(node) for node in ast]
+
+    def _analyze_function_run(
+        self, functions: List[nodes.FunctionDeclaration], cache_records: List[Tuple[str, analysis_cache.Dependencies]]
+    ) -> Iterator[nodes.Node]:
+        # Functions of a run cannot reach template types of each other, only ones of earlier statements.
+        existing_template_types = len(self.context.template_types)
+        if len(functions) < PARALLEL_ANALYSIS_THRESHOLD:
+            analyzed = self._analyze_functions_sequentially(functions)
+        else:
+            analyzed = self._analyze_functions(functions)
+        for index, node in enumerate(analyzed):
+            if self._cache is not None:
+                content, dependencies = cache_records[index]
+                self._cache.store(content, dependencies, node, self.context, existing_template_types)
+            yield node
+
+    def _analyze_functions_sequentially(self, functions: List[nodes.FunctionDeclaration]) -> Iterator[nodes.Node]:
+        for function in functions:
+            yield self.analyze_node(function)
+            self._update_self_contained(function)
+
+    def _analyze_functions(self, functions: List[nodes.FunctionDeclaration]) -> Iterator[nodes.Node]:
+        """Analyze consecutive function declarations, using worker processes for their bodies.
+
+        Functions are added to the environment in order and every body is analyzed in the environment saved after
+        its function was added, so the results and the first error are the same as of analyzing the functions one
+        by one. Analysis of the body of a self-contained function (see _is_self_contained) depends only on the
+        bodies of the functions it names, so such bodies are collected and analyzed level by level: a body is
+        analyzed after the bodies of the collected functions it names. A function that is not self-contained is
+        analyzed after all collected ones.
+
+        One pool of worker processes serves all levels. With one CPU the functions are analyzed in the main process,
+        starting workers would only add to the time.
 
-        self._apply_clause_to_env_dispatcher_binary_expression = {
-            nodes.Operator.is_.value: self._apply_is_check_to_env,
+        """
+        workers = min(os.cpu_count() or 1, len(functions))
+        if workers < 2:
+            yield from self._analyze_functions_sequentially(functions)
+            return
+        with ProcessPoolExecutor(workers) as executor:
+            yield from self._collect_functions(functions, executor)
+
+    def _collect_functions(
+        self, functions: List[nodes.FunctionDeclaration], executor: ProcessPoolExecutor
+    ) -> Iterator[nodes.Node]:
+        pending: List[FunctionJob] = []
+        # Name of a collected function -> its level.
+        levels: Dict[str, int] = {}
+        for declaration in functions:
+            if declaration.name.member in levels:
+                # Collected functions are looked up by names.
+                yield from self._analyze_collected_functions(pending, levels, executor)
+                pending, levels = [], {}
+            self.line = declaration.line
+            try:
+                arguments, return_type = self._add_function(declaration)
+            except Exception:
+                yield from self._analyze_collected_functions(pending, levels, executor)
+                raise
+            job = (declaration, arguments, return_type, self.env.save())
+            names = parallel_analysis.referenced_names(declaration)
+            if not self._is_self_contained(names, self.env[declaration.name.member], levels):
+                yield from self._analyze_collected_functions(pending, levels, executor)
+                pending, levels = [], {}
+                yield self._analyze_collected_function(job, self._analyze_saved_function_body(*job))
+                self._self_contained.pop(declaration.name.member, None)
+                continue
+            pending.append(job)
+            levels[declaration.name.member] = max((levels[name] + 1 for name in names if name in levels), default=0)
+        yield from self._analyze_collected_functions(pending, levels, executor)
+
+    def _analyze_collected_functions(
+        self, jobs: List[FunctionJob], levels: Dict[str, int], executor: ProcessPoolExecutor
+    ) -> Iterator[nodes.Node]:
+        bodies: Dict[int, nodes.AST] = {}
+        failures: Dict[int, Exception] = {}
+        for level in range(max(levels.values(), default=-1) + 1):
+            indices = [index for index, job in enumerate(jobs) if levels[job[0].name.member] == level]
+            level_jobs = [jobs[index] for index in indices]
+            if len(level_jobs) < PARALLEL_ANALYSIS_THRESHOLD:
+                results: List[Optional[nodes.AST]] = [None] * len(level_jobs)
+            else:
+                results = self._analyze_function_bodies_in_workers(level_jobs, executor)
+            for index, job, body in zip(indices, level_jobs, results):
+                if body is None:
+                    try:
+                        body = self._analyze_saved_function_body(*job)
+                    except Exception as e:
+                        # Errors of the functions declared before come first.
+                        failures[index] = e
+                        continue
+                self.env.update_function_body(job[0].name, body)
+                bodies[index] = body
+        for index, job in enumerate(jobs):
+            if index in failures:
+                raise failures[index]
+            entry = self.env[job[0].name.member]
+            assert entry is not None
+            self._self_contained[job[0].name.member] = entry
+            yield self._analyze_collected_function(job, bodies[index])
+
+    def _analyze_collected_function(self, job: FunctionJob, body: nodes.AST) -> nodes.FunctionDeclaration:
+        declaration, arguments, return_type, _ = job
+        self.env.update_function_body(declaration.name, body)
+        return nodes.FunctionDeclaration(
+            declaration.line, declaration.name, declaration.parameters, arguments, return_type,
+            declaration.where_clause, body
+        )
 
-            # TODO: apply to estimated_value
-            nodes.Operator.lt.value: lambda _: None,
-            nodes.Operator.gt.value: lambda _: None,
-        }
+    def _analyze_function_bodies_in_workers(
+        self, jobs: List[FunctionJob], executor: ProcessPoolExecutor
+    ) -> List[Optional[nodes.AST]]:
+        workers = min(os.cpu_count() or 1, len(jobs))
+        chunks = [jobs[i * len(jobs) // workers:(i + 1) * len(jobs) // workers] for i in range(workers)]
+        # A fresh context: the template types and caches of the workers are their own.
+        context = Context(
+            self.context.lines, self.context.main_hash, self.context.mangle_names, dict(self.context.module_hashs),
+            dict(self.context.imported_lines), check_only=self.context.check_only
+        )
+        results = list(executor.map(_analyze_function_bodies, repeat(context), chunks))
+        bodies: List[Optional[nodes.AST]] = []
+        for chunk, data in zip(chunks, results):
+            bodies.extend(parallel_analysis.load_results(data, self.context.template_types, [job[3] for job in chunk]))
+        return bodies
 
-    def analyze_ast(self, ast: Iterable[nodes.Node]) -> Iterable[nodes.Node]:
-        yield from (self.analyze_node(node) for node in ast)
+    def _is_self_contained(
+        self, names: Iterable[str], entry: Optional[entries.Entry], collected: Container[str] = ()
+    ) -> bool:
+        """Whether all names in a declaration are its own or name the declaration itself (the entry), an interface,
+        a self-contained declaration or a collected function (see _analyze_functions).
 
-    def analyze_node(self, node: nodes.Node) -> nodes.Node:
-        self.line = node.line
-        return dispatch(self._node_dispatcher, type(node), node)
+        Analysis of self-contained code (including its estimation) neither reads nor changes variables, constants or
+        bodies of functions that are not self-contained.
 
-    def analyze_body(self, ast: Iterable[nodes.Node]) -> List[nodes.Node]:
-        """Use this function instead of analyze_ast to avoid methods or fields not adding to the environment."""
-        return list(self.analyze_ast(ast))
+        """
+        for name in names:
+            found = self.env[name]
+            if found is None or found is entry or isinstance(found, entries.InterfaceEntry) or name in collected:
+                continue
+            if self._self_contained.get(name) is not found:
+                return False
+        return True
+
+    def _update_declaration_keys(self, node: nodes.Node) -> Tuple[str, analysis_cache.Dependencies]:
+        """Compute the key of the top-level statement (see analysis_cache), return its hash and dependencies."""
+        content = analysis_cache.content_hash(node, self.context)
+        dependencies = analysis_cache.get_dependencies(node, self._declaration_keys, self.context)
+        key = analysis_cache.declaration_key(content, dependencies)
+        if isinstance(node, (
+            nodes.Decl, nodes.FunctionDeclaration, nodes.StructDeclaration, nodes.AlgebraicDeclaration,
+            nodes.InterfaceDeclaration, nodes.ExtensionDeclaration
+        )):
+            if isinstance(node.name, nodes.Name):
+                # The key of an extension depends on the key of the struct it extends.
+                self._declaration_keys[node.name.member] = key
+        else:
+            # Other statements can change values of the declarations they name.
+            for name in parallel_analysis.referenced_names(node):
+                if name in self._declaration_keys:
+                    self._declaration_keys[name] = key
+        return content, dependencies
+
+    def _load_function(self, declaration: nodes.FunctionDeclaration) -> nodes.FunctionDeclaration:
+        """Add the function analyzed before (taken from the analysis cache) to the environment."""
+        self.line = declaration.line
+        self.env.add_function(
+            declaration.line, declaration.name, declaration.parameters, declaration.arguments, declaration.return_type,
+            declaration.where_clause
+        )
+        self.env.update_function_body(declaration.name, declaration.body)
+        self._update_self_contained(declaration)
+        return declaration
+
+    def _update_self_contained(self, node: nodes.Node) -> None:
+        if not isinstance(node, (
+            nodes.FunctionDeclaration, nodes.StructDeclaration, nodes.AlgebraicDeclaration, nodes.ExtensionDeclaration
+        )) or not isinstance(node.name, nodes.Name):
+            return
+        entry = self.env[node.name.member]
+        if not self._is_self_contained(parallel_analysis.referenced_names(node), entry):
+            self._self_contained.pop(node.name.member, None)
+        elif not isinstance(node, nodes.ExtensionDeclaration):
+            assert entry is not None
+            self._self_contained[node.name.member] = entry
 
     def _analyze_declaration(self, node: nodes.Decl) -> nodes.Decl:
         """
@@ -100,14 +353,18 @@ class Analyzer(CompilerStageTestCase):
             - If the declaration has a value, the value is checked to be valid.
             - If the declaration has both a type and a value, the type of value is checked to be a subtype of the declaration type.
 
-        After all checks were successfully passed, the value, if present, is estimated based on current environment.
+        After all checks were successfully passed, the value, if present, is estimated based on current environment
+        (unless the code is only checked, see Context.check_only).
         In the end, the name is added to the environment.
         """
         self._check_naming_camel_case(node.name)
 
         if node.value:
             type_ = self._infer_type(node.value, supertype=node.type)
-            estimated = self._estimate_value(node.value)
+            if self.context.check_only:
+                estimated = enodes.DynamicValue(type_)
+            else:
+                estimated = self._estimate_value(node.value)
         else:
             assert node.type
             type_ = self._check_type(node.type)
@@ -121,11 +378,40 @@ class Analyzer(CompilerStageTestCase):
             raise errors.AngelNamingError(name, str(CAMEL_CASE_REGEX), self._get_code())
 
     def _analyze_function_declaration(self, declaration: nodes.FunctionDeclaration) -> nodes.FunctionDeclaration:
+        arguments, return_type = self._add_function(declaration)
+        body = self._analyze_function_body(declaration, arguments, return_type)
+        self.env.update_function_body(declaration.name, body)
+        return nodes.FunctionDeclaration(
+            declaration.line, declaration.name, declaration.parameters, arguments, return_type,
+            declaration.where_clause, body
+        )
+
+    def _add_function(self, declaration: nodes.FunctionDeclaration) -> Tuple[List[nodes.Argument], nodes.Type]:
         arguments = [nodes.Argument(arg.name, self._check_type(arg.type)) for arg in declaration.arguments]
         return_type = self._check_type(declaration.return_type)
         self.env.add_function(
             declaration.line, declaration.name, declaration.parameters, arguments, return_type, declaration.where_clause
         )
+        return arguments, return_type
+
+    def _analyze_saved_function_body(
+        self, declaration: nodes.FunctionDeclaration, arguments: List[nodes.Argument], return_type: nodes.Type,
+        saved: environment.Scope
+    ) -> nodes.AST:
+        """Analyze the body of the function in the environment saved after the function was added."""
+        env = self.env
+        return_types = len(self._function_return_types)
+        self.env = environment.Environment(saved)
+        self.line = declaration.line
+        try:
+            return self._analyze_function_body(declaration, arguments, return_type)
+        finally:
+            self.env = env
+            del self._function_return_types[return_types:]
+
+    def _analyze_function_body(
+        self, declaration: nodes.FunctionDeclaration, arguments: List[nodes.Argument], return_type: nodes.Type
+    ) -> nodes.AST:
         # TODO: backup env, because apply_clause can modify variables
         self.env.inc_nesting()
         self.env.add_parameters(declaration.line, declaration.parameters)
@@ -142,11 +428,7 @@ class Analyzer(CompilerStageTestCase):
         body = self.analyze_body(declaration.body)
         self._function_return_types.pop()
         self.env.dec_nesting()
-        self.env.update_function_body(declaration.name, body)
-        return nodes.FunctionDeclaration(
-            declaration.line, declaration.name, declaration.parameters, arguments, return_type,
-            declaration.where_clause, body
-        )
+        return body
 
     def _analyze_struct_methods(self, methods: nodes.DeclaredMethods) -> nodes.DeclaredMethods:
         return nodes.DeclaredMethods(
@@ -182,6 +464,7 @@ class Analyzer(CompilerStageTestCase):
         entry = self.env.get(declaration.name)
         assert isinstance(entry, entries.StructEntry)
         entry.implemented_interfaces += declaration.interfaces
+        self._forget_interface_implementations(entry)
         self.env.inc_nesting(declaration.name)
         if declaration.where_clause:
             self.env.add_where_clause(declaration.where_clause)
@@ -304,7 +587,7 @@ class Analyzer(CompilerStageTestCase):
         else:
             right = statement.right
         self._change_type(statement.left, self._infer_type(right, supertype=self._infer_type(statement.left)))
-        dispatch(self._assignment_dispatcher, type(statement.left), statement.left)
+        dispatch(self._assignment_dispatcher, type(statement.left), self, statement.left)
         return nodes.Assignment(statement.line, statement.left, nodes.Operator.eq, right)
 
     def _analyze_conditional(self, condition: nodes.Expression, body: nodes.AST) -> Tuple[nodes.Expression, nodes.AST]:
@@ -355,7 +638,7 @@ class Analyzer(CompilerStageTestCase):
 
     def _analyze_builtin_function_call(self, function_call: nodes.FunctionCall) -> nodes.FunctionCall:
         assert isinstance(function_call.function_path, nodes.BuiltinFunc)
-        return dispatch(self._builtin_function_dispatcher, function_call.function_path.value, function_call)
+        return dispatch(self._builtin_function_dispatcher, function_call.function_path.value, self, function_call)
 
     def _analyze_print_function_call(self, function_call: nodes.FunctionCall) -> nodes.FunctionCall:
         self._infer_type(function_call)
@@ -390,6 +673,9 @@ class Analyzer(CompilerStageTestCase):
         else:
             entry = self.env.get(name)
         for interface in interfaces:
+            key = (id(entry), nodes.type_key(interface))
+            if key in self._checked_interface_implementations:
+                continue
             if isinstance(interface, nodes.GenericType):
                 # TODO: support builtin interfaces
                 assert isinstance(interface.name, nodes.Name)
@@ -399,7 +685,16 @@ class Analyzer(CompilerStageTestCase):
             else:
                 interface_entry = self.env.get(interface)
 
-            dispatch(self._check_interface_implementation_dispatcher, type(entry), entry, interface_entry)
+            dispatch(self._check_interface_implementation_dispatcher, type(entry), self, entry, interface_entry)
+            if key[1] is not nodes.NOT_INTERNABLE:
+                self._checked_interface_implementations[key] = entry
+
+    def _forget_interface_implementations(self, entry: entries.StructEntry) -> None:
+        """Forget results of interface implementation and where clause checks that the struct can change."""
+        self._checked_interface_implementations = {
+            key: checked for key, checked in self._checked_interface_implementations.items() if checked is not entry
+        }
+        self.context.where_clause_results.clear()
 
     def _check_struct_interface_implementation(
         self, struct_entry: entries.StructEntry, interface_entry: entries.InterfaceEntry
@@ -555,7 +850,7 @@ class Analyzer(CompilerStageTestCase):
         return result.type
 
     def _change_type(self, left: nodes.AssignmentLeft, typ: nodes.Type):
-        return dispatch(self._change_type_dispatcher, type(left), left, typ)
+        return dispatch(self._change_type_dispatcher, type(left), self, left, typ)
 
     def _estimate_value(self, value: nodes.Expression) -> enodes.Expression:
         self._estimator.update_context(self.env, self._get_code())
@@ -588,7 +883,7 @@ class Analyzer(CompilerStageTestCase):
 
     def _apply_clause_to_env(self, clause: nodes.Expression):
         assert isinstance(clause, nodes.BinaryExpression)
-        return dispatch(self._apply_clause_to_env_dispatcher_binary_expression, clause.operator.value, clause)
+        return dispatch(self._apply_clause_to_env_dispatcher_binary_expression, clause.operator.value, self, clause)
 
     def _apply_is_check_to_env(self, clause: nodes.BinaryExpression):
         assert isinstance(clause.left, nodes.Name)
@@ -598,5 +893,5 @@ class Analyzer(CompilerStageTestCase):
         entry.implemented_interfaces.append(clause.right)
 
     def test(self):
-        self.check_completeness(NODES, self._node_dispatcher)
+        self.check_completeness(NODES, self.node_dispatcher)
         self.check_completeness(ASSIGNMENTS, (self._assignment_dispatcher, self._change_type_dispatcher))
@@ -0,0 +1,230 @@
+"""On-disk cache of analyzed top-level functions, for incremental re-analysis (see Analyzer.analyze_ast).
+
+Every top-level declaration gets a key: the hash of its content (without line numbers and with names mangled with
+the main hash made independent of it) and of the keys of the declarations it reads, that is of the earlier top-level
+declarations named in it. Top-level statements that are not declarations change the keys of the declarations they
+name, because they can change their values. So the key of a declaration changes when the declaration changes or
+when any declaration it depends on (directly or not) does.
+
+An analyzed function is stored under the hash of its content, together with the keys of the declarations it read.
+It is reused while those keys are the same, otherwise the function is analyzed again and the entry is replaced.
+Entries are stored in a directory named after the compiler version and the builtins, like entries of ast_cache.
+The cache is disabled until enable() is called.
+
+"""
+import hashlib
+import io
+import os
+import pickle
+import sys
+import typing as t
+
+from . import nodes
+from .ast_cache import CacheStats, KEY_LENGTH, compiler_version
+from .context import Context
+from .environment import BUILTINS_PATH, Scope
+from .parallel_analysis import referenced_names
+from .parsers import shift_lines
+from .templates import TemplateTypes
+from .utils import get_hash
+from .visitors import is_ast_object
+
+
+# Keys of the declarations a declaration reads, by their names.
+Dependencies = t.Dict[str, str]
+
+
+class NotCacheable(Exception):
+    """The analyzed node refers to environments or to template types of earlier statements, which are not stored."""
+
+
+class _DeclarationPickler(pickle.Pickler):
+    """Pickle a node with names mangled with the main hash saved without it.
+
+    If first_line is given, lines of nodes are saved relative to it (the result is only good for hashing). If
+    template_types is given, template types are saved renumbered from 0 in the order they are met, one number for
+    template types unified with each other (see roots). Template types unified with one of existing_roots are not
+    saved (NotCacheable is raised).
+
+    """
+
+    def __init__(
+        self, file: t.BinaryIO, context: Context, first_line: t.Optional[int] = None,
+        template_types: t.Optional[TemplateTypes] = None, existing_roots: t.AbstractSet[int] = frozenset()
+    ):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.mangled_prefix = mangled_prefix(context)
+        self.first_line = first_line
+        # Without the memo equal nodes are pickled the same whether they share objects or not.
+        self.fast = first_line is not None
+        self.template_types = template_types
+        self.existing_roots = existing_roots
+        # Representative template type -> its number.
+        self.roots: t.Dict[int, int] = {}
+        self.root_list: t.List[int] = []
+
+    def persistent_id(self, obj: t.Any) -> t.Optional[str]:
+        if isinstance(obj, str):
+            if self.mangled_prefix is not None and obj.startswith(self.mangled_prefix):
+                return obj[len(self.mangled_prefix):]
+            return None
+        if isinstance(obj, Scope):
+            raise NotCacheable
+        return None
+
+    def reducer_override(self, obj: t.Any) -> t.Any:
+        if isinstance(obj, nodes.TemplateType) and self.template_types is not None:
+            root = self.template_types.find(obj.id)
+            if root in self.existing_roots:
+                raise NotCacheable
+            if root not in self.roots:
+                self.roots[root] = len(self.root_list)
+                self.root_list.append(root)
+            return nodes.TemplateType, (self.roots[root],)
+        if self.first_line is not None and is_ast_object(obj):
+            field_names = nodes.node_fields(type(obj))
+            if "line" in field_names:
+                values = tuple(getattr(obj, name) for name in field_names)
+                return type(obj), tuple(
+                    value - self.first_line if name == "line" else value for name, value in zip(field_names, values)
+                )
+        return NotImplemented
+
+
+class _DeclarationUnpickler(pickle.Unpickler):
+    def __init__(self, file: t.BinaryIO, context: Context, offset: int):
+        super().__init__(file)
+        self.mangled_prefix = f"angel_{context.main_hash}_"
+        self.offset = offset
+
+    def persistent_load(self, pid: t.Any) -> str:
+        return sys.intern(self.mangled_prefix + pid)
+
+    def find_class(self, module: str, name: str) -> t.Any:
+        if module == nodes.__name__ and name == nodes.TemplateType.__name__:
+            return self.template_type
+        return super().find_class(module, name)
+
+    def template_type(self, id_: int) -> nodes.TemplateType:
+        return nodes.TemplateType(id_ + self.offset)
+
+
+def mangled_prefix(context: Context) -> t.Optional[str]:
+    """Return the prefix of names mangled with the main hash (see utils.mangle), None if names are not mangled."""
+    return f"angel_{context.main_hash}_" if context.mangle_names else None
+
+
+def content_hash(node: nodes.Node, context: Context) -> str:
+    """Return hash of the clarified node that does not depend on its line and on the main hash."""
+    file = io.BytesIO()
+    _DeclarationPickler(file, context, first_line=node.line).dump((context.mangle_names, context.check_only, node))
+    return hashlib.md5(file.getvalue()).hexdigest()[:KEY_LENGTH]
+
+
+def declaration_key(content: str, dependencies: Dependencies) -> str:
+    return get_hash("\n".join([content] + [f"{name} {key}" for name, key in sorted(dependencies.items())]), KEY_LENGTH)
+
+
+def get_dependencies(node: t.Any, keys: t.Dict[str, str], context: Context) -> Dependencies:
+    """Return keys of the declarations the node names (declarations not in keys are not top-level ones).
+
+    The main hash is left out of the names, like out of the content hash.
+
+    """
+    prefix = mangled_prefix(context)
+    dependencies = {}
+    for name in referenced_names(node):
+        if name in keys:
+            if prefix is not None and name.startswith(prefix):
+                dependencies["angel__" + name[len(prefix):]] = keys[name]
+            else:
+                dependencies[name] = keys[name]
+    return dependencies
+
+
+class AnalysisCache:
+    def __init__(self, directory: str):
+        with open(BUILTINS_PATH, encoding="utf-8") as file:
+            builtins_hash = get_hash(file.read(), KEY_LENGTH)
+        self.directory = os.path.join(directory, compiler_version(), f"analysis-{builtins_hash}")
+        self.stats = CacheStats()
+
+    def path(self, content: str) -> str:
+        return os.path.join(self.directory, content + ".pickle")
+
+    def load(
+        self, content: str, dependencies: Dependencies, line: int, context: Context
+    ) -> t.Optional[nodes.FunctionDeclaration]:
+        """Return the analyzed function with the content hash declared at line, or None if it has to be analyzed.
+
+        Template types of the function are added to context.template_types.
+
+        """
+        try:
+            with open(self.path(content), "rb") as file:
+                stored_dependencies, stored_line, template_types_count, data = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.stats.misses += 1
+            return None
+        if stored_dependencies != dependencies:
+            self.stats.misses += 1
+            return None
+        template_types = context.template_types
+        offset = len(template_types)
+        unpickler = _DeclarationUnpickler(io.BytesIO(data), context, offset)
+        node = unpickler.load()
+        for _ in range(template_types_count):
+            type_ = unpickler.load()
+            id_ = template_types.new()
+            if type_ is not None:
+                template_types.resolve(id_, type_)
+        shift_lines(node, line - stored_line)
+        self.stats.hits += 1
+        return node
+
+    def store(
+        self, content: str, dependencies: Dependencies, node: nodes.FunctionDeclaration, context: Context,
+        existing_template_types: int
+    ) -> None:
+        """Store the analyzed function unless it refers to environments or to template types created before its
+        analysis (the first existing_template_types ones).
+
+        Template types of earlier statements (like the element type of a global `var v = []`) can be resolved by the
+        analysis of the function, which is not repeated when it is loaded.
+
+        """
+        template_types = context.template_types
+        existing_roots = {template_types.find(id_) for id_ in range(existing_template_types)}
+        file = io.BytesIO()
+        pickler = _DeclarationPickler(file, context, template_types=template_types, existing_roots=existing_roots)
+        try:
+            pickler.dump(node)
+            # Resolved types of template types can contain more template types, root_list grows while iterated.
+            for root in pickler.root_list:
+                pickler.dump(context.template_types.types[root])
+        except NotCacheable:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(content)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as entry_file:
+            pickle.dump((dependencies, node.line, len(pickler.root_list), file.getvalue()), entry_file)
+        os.replace(tmp_path, path)
+
+
+_cache: t.Optional[AnalysisCache] = None
+
+
+def enable(directory: str) -> AnalysisCache:
+    global _cache
+    _cache = AnalysisCache(directory)
+    return _cache
+
+
+def disable() -> None:
+    global _cache
+    _cache = None
+
+
+def get_cache() -> t.Optional[AnalysisCache]:
+    return _cache
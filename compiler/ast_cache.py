@@ -0,0 +1,145 @@
+"""On-disk cache of parsed and clarified ASTs.
+
+Entries are keyed by the hash of the code and of the context clarification depends on. They are stored in a
+directory named after the compiler version (hash of the compiler sources), so changing the compiler invalidates
+the whole cache. The cache is disabled until enable() is called.
+
+"""
+import os
+import pickle
+import typing as t
+from dataclasses import dataclass
+from functools import lru_cache
+
+from . import nodes, parsers, clarification
+from .context import Context
+from .utils import get_hash, read_module
+
+
+# Bump when the format of entries changes.
+CACHE_FORMAT = 1
+KEY_LENGTH = 32
+
+
+@lru_cache(maxsize=None)
+def compiler_version() -> str:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sources = [str(CACHE_FORMAT)]
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".py"):
+            with open(os.path.join(directory, file_name), encoding="utf-8") as file:
+                sources.append(file.read())
+    return get_hash("\n".join(sources), KEY_LENGTH)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class ASTCache:
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, compiler_version())
+        self.stats = CacheStats()
+
+    def path(self, string: str, context: Context) -> str:
+        key = get_hash(f"{context.mangle_names}\n{context.main_hash}\n{string}", KEY_LENGTH)
+        return os.path.join(self.directory, key + ".pickle")
+
+    def load(self, string: str, context: Context) -> t.Optional[t.Tuple[nodes.AST, t.List[str]]]:
+        """Return clarified AST of the code and the modules it imports, or None if it is not cached.
+
+        The AST is reused only while the modules it imports (mangled names contain their hashes) are unchanged. The
+        context is left as it is, the modules are added to it by the caller, the same way as on a miss.
+
+        """
+        try:
+            with open(self.path(string, context), "rb") as file:
+                module_hashs, pickled_nodes = pickle.load(file)
+            unchanged = all(get_hash(read_module(module)) == hash_ for module, hash_ in module_hashs.items())
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.stats.misses += 1
+            return None
+        if not unchanged:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return [pickle.loads(pickled_node) for pickled_node in pickled_nodes], list(module_hashs)
+
+    def store(
+        self, string: str, context: Context, ast: t.Iterable[nodes.Node], module_hashs: t.Dict[str, str]
+    ) -> t.Iterator[nodes.Node]:
+        """Pass nodes of the clarified AST through, storing them in the cache when the AST is exhausted.
+
+        module_hashs are hashes of the modules the code imports.
+
+        """
+        path = self.path(string, context)
+
+        def store_nodes() -> t.Iterator[nodes.Node]:
+            # Nodes are pickled before they are yielded, because later stages modify them in place.
+            pickled_nodes = []
+            for node in ast:
+                pickled_nodes.append(pickle.dumps(node))
+                yield node
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                pickle.dump((module_hashs, pickled_nodes), file)
+            os.replace(tmp_path, path)
+
+        return store_nodes()
+
+
+_cache: t.Optional[ASTCache] = None
+
+
+def enable(directory: str) -> ASTCache:
+    global _cache
+    _cache = ASTCache(directory)
+    return _cache
+
+
+def disable() -> None:
+    global _cache
+    _cache = None
+
+
+def get_cache() -> t.Optional[ASTCache]:
+    return _cache
+
+
+def load(string: str, context: Context) -> t.Optional[t.Tuple[nodes.AST, t.List[str]]]:
+    if _cache is None:
+        return None
+    return _cache.load(string, context)
+
+
+def clarify(
+    string: str, context: Context, clarifier: clarification.Clarifier, ast: t.Iterable[nodes.Node],
+    modules: t.Iterable[str] = ()
+) -> t.Iterable[nodes.Node]:
+    """Clarify AST parsed from the code that imports the modules, storing the result if the cache is enabled.
+
+    The modules must already be in the context (see utils.module_hash).
+
+    """
+    clarified_ast = clarifier.clarify_ast(ast)
+    if _cache is None:
+        return clarified_ast
+    return _cache.store(string, context, clarified_ast, {module: context.module_hashs[module] for module in modules})
+
+
+def parse_and_clarify(
+    string: str, context: Context, clarifier: clarification.Clarifier
+) -> t.Iterable[nodes.Node]:
+    """Return clarified AST of the code, skipping parsing and clarification if the cache has it.
+
+    Only for code that imports no modules (like the builtins), compiler._run_frontend handles imports.
+
+    """
+    cached = load(string, context)
+    if cached is not None:
+        return cached[0]
+    return clarify(string, context, clarifier, parsers.Parser().iter_parse(string))
@@ -1,63 +1,58 @@
 import enum
-from typing import Iterable
+from typing import Dict, Iterable
 
 from . import nodes
 from .utils import submangle, mangle
 from .context import Context
+from .visitors import Dispatcher, Transformer
 
 
-class Clarifier:
-    """Provides in-place node context by traversing the AST and replacing node objects with more specific ones."""
+NAME_ENUMS = (nodes.BuiltinType, nodes.BuiltinFunc, nodes.BoolLiteral, nodes.SpecialName, nodes.SpecialMethods)
+
+# Identifier -> enum member it stands for, every other identifier is a user name and gets mangled.
+# When enums share a value, the one earlier in NAME_ENUMS wins.
+RESERVED_NAMES: Dict[str, enum.Enum] = {
+    member.value: member for name_enum in reversed(NAME_ENUMS) for member in name_enum
+}
 
-    def __init__(self, context: Context):
-        self.context = context
-        self._clarify_node_dispatcher = {
-            nodes.Name: self._clarify_name,
-            nodes.Field: self._clarify_field,
-            nodes.FunctionCall: self._clarify_function_call,
-            nodes.FieldDeclaration: self._clarify_field_declaration,
-            nodes.MethodDeclaration: self._clarify_method_declaration,
-            nodes.AlgebraicDeclaration: self._clarify_algebraic_declaration,
-
-            (list, tuple): lambda node: type(node)(self.clarify_node(element) for element in node),
-            (str, int, enum.Enum): lambda node: node,
-        }
-        self._name_enums = (
-            nodes.BuiltinType, nodes.BuiltinFunc, nodes.BoolLiteral, nodes.SpecialName, nodes.SpecialMethods
-        )
 
-    def clarify_ast(self, ast: nodes.AST) -> Iterable[nodes.Node]:
-        yield from (self.clarify_node(node) for node in ast)
+class Clarifier(Transformer):
+    """Provides node context by traversing the AST and replacing node objects with more specific ones.
 
-    def clarify_node(self, node):
-        if node is None:
-            return None
+    Nodes without anything to clarify in them are not copied, so the result shares them with the input AST.
 
-        for types, handler in self._clarify_node_dispatcher.items():
-            if isinstance(node, types):
-                return handler(node)
+    """
+
+    node_dispatcher = Dispatcher({
+        nodes.Name: '_clarify_name',
+        nodes.Field: '_clarify_field',
+        nodes.FunctionCall: '_clarify_function_call',
+        nodes.FieldDeclaration: '_clarify_field_declaration',
+        nodes.MethodDeclaration: '_clarify_method_declaration',
+        nodes.AlgebraicDeclaration: '_clarify_algebraic_declaration',
+    })
+
+    def __init__(self, context: Context):
+        self.context = context
 
-        return type(node)(*(self.clarify_node(value) for value in vars(node).values()))
+    def clarify_ast(self, ast: Iterable[nodes.Node]) -> Iterable[nodes.Node]:
+        yield from (self.visit(node) for node in ast)
 
     def _clarify_name(self, node: nodes.Name):
-        for cls in self._name_enums:
-            try:
-                result = cls(node.member)
-            except ValueError:
-                continue
-            else:
-                return result
+        reserved = RESERVED_NAMES.get(node.member)
+        if reserved is not None:
+            return reserved
         return mangle(node, self.context)
 
     def _clarify_field(self, node: nodes.Field):
-        base = self.clarify_node(node.base)
+        base = self.visit(node.base)
         if isinstance(base, nodes.BuiltinType) and base.value == nodes.BuiltinType.optional.value:
             return nodes.OptionalTypeConstructor(node.field.member)
         return nodes.Field(node.line, base, submangle(node.field, self.context))
 
     def _clarify_function_call(self, node: nodes.FunctionCall):
-        function_path = self.clarify_node(node.function_path)
-        arguments = self.clarify_node(node.arguments)
+        function_path = self.visit(node.function_path)
+        arguments = self.visit(node.arguments)
         if isinstance(function_path, nodes.OptionalTypeConstructor):
             # TODO: replace assert with meaningful error handling and user-friendly message
             assert len(arguments) == 1
@@ -68,13 +63,13 @@ class Clarifier:
 
     def _clarify_field_declaration(self, node: nodes.FieldDeclaration):
         return nodes.FieldDeclaration(
-            node.line, submangle(node.name, self.context), self.clarify_node(node.type), self.clarify_node(node.value)
+            node.line, submangle(node.name, self.context), self.visit(node.type), self.visit(node.value)
         )
 
     def _clarify_method_declaration(self, node: nodes.MethodDeclaration):
         return nodes.MethodDeclaration(
-            node.line, submangle(node.name, self.context), self.clarify_node(node.parameters),
-            self.clarify_node(node.arguments), self.clarify_node(node.return_type), self.clarify_node(node.body)
+            node.line, submangle(node.name, self.context), self.visit(node.parameters),
+            self.visit(node.arguments), self.visit(node.return_type), self.visit(node.body)
         )
 
     def _clarify_algebraic_declaration(self, node: nodes.AlgebraicDeclaration):
@@ -83,12 +78,12 @@ class Clarifier:
             if isinstance(statement, nodes.StructDeclaration):
                 statement = nodes.StructDeclaration(
                     statement.line, submangle(statement.name, self.context),
-                    self.clarify_node(statement.parameters), self.clarify_node(statement.interfaces),
-                    self.clarify_node(statement.fields), self.clarify_node(statement.init_declarations),
-                    self.clarify_node(statement.methods),
+                    self.visit(statement.parameters), self.visit(statement.interfaces),
+                    self.visit(statement.fields), self.visit(statement.init_declarations),
+                    self.visit(statement.methods),
                 )
             body.append(statement)
         return nodes.AlgebraicDeclaration(
-            node.line, self.clarify_node(node.name), self.clarify_node(node.parameters), body,
-            self.clarify_node(node.methods)
+            node.line, self.visit(node.name), self.visit(node.parameters), body,
+            self.visit(node.methods)
         )
@@ -1,7 +1,7 @@
 import typing as t
 from dataclasses import dataclass, field
 
-from . import nodes
+from .templates import TemplateTypes
 
 
 @dataclass
@@ -11,4 +11,14 @@ class Context:
     mangle_names: bool
     module_hashs: t.Dict[str, str] = field(default_factory=dict)
     imported_lines: t.Dict[str, str] = field(default_factory=dict)
-    template_types: t.List[t.Optional[nodes.Type]] = field(default_factory=list)
+    # Only check the code: values are not estimated at compile time (declarations get DynamicValue) and the code is
+    # not translated.
+    check_only: bool = False
+    template_types: TemplateTypes = field(default_factory=TemplateTypes)
+    # id(expression) -> (expression, its type), filled by TypeChecker.infer_type.
+    inferred_types: t.Dict[int, t.Tuple[t.Any, t.Any]] = field(default_factory=dict)
+    # ('is' clause with the mapping applied) -> whether it holds, filled by TypeChecker.eval_where_clause. Cleared
+    # when an extension adds interfaces to a struct.
+    where_clause_results: t.Dict[t.Tuple[t.Any, t.Any], bool] = field(default_factory=dict)
+    # (module, main hash, member) -> interned mangled member, filled by utils.mangle and utils.submangle.
+    mangled_members: t.Dict[t.Tuple[t.Optional[str], t.Optional[str], str], str] = field(default_factory=dict)
@@ -1,4 +1,5 @@
 import typing as t
+from itertools import count
 
 from . import nodes, environment_entries as entries, estimation_nodes as enodes, errors
 from .enums import DeclType
@@ -6,35 +7,82 @@ from .constants import SELF_NAME
 from .utils import dispatch
 
 
-def copy_environment(to_copy):
-    result = Environment()
-    result.where_clauses = list(to_copy.where_clauses)
-    result.space = []
-    result.nesting_level = -1
-    for scope in to_copy.space:
-        # Entries are the same
-        result_scope = dict(scope)
-        result.space.append(result_scope)
-        result.nesting_level += 1
-    return result
+BUILTINS_PATH = "stdlib/builtins/main.angel"
+# Orders bindings and saves of all environments (saved scopes are shared between them).
+CLOCK = count(1)
+
+
+class Scope:
+    """Names declared at one nesting level, a link in an immutable chain of scopes.
+
+    bindings maps every name bound in the scope to its (clock value, entry) bindings, oldest first. A live scope
+    (cutoff is None) is read at the latest bindings. A saved scope shares bindings with the live scope it was saved
+    from but ignores bindings made after its cutoff, so saving an environment copies no dicts and the saved one does
+    not change when the live one does. A live scope keeps the cutoff of its latest save in last_save: a binding made
+    after it is seen by no saved scope and is replaced in place when the name is bound again.
+
+    """
+
+    __slots__ = ("bindings", "parent", "cutoff", "last_save")
+
+    def __init__(
+        self, bindings: t.Dict[str, t.List[t.Tuple[int, entries.Entry]]], parent: t.Optional["Scope"] = None,
+        cutoff: t.Optional[int] = None
+    ):
+        self.bindings = bindings
+        self.parent = parent
+        self.cutoff = cutoff
+        self.last_save = 0
+
+    def __repr__(self) -> str:
+        return f"Scope({list(self.bindings)}, cutoff={self.cutoff})"
+
+
+def entry_before(bindings: t.List[t.Tuple[int, entries.Entry]], cutoff: t.Optional[int]) -> t.Optional[entries.Entry]:
+    """Return the latest entry bound before cutoff (the latest one if cutoff is None)."""
+    if cutoff is None:
+        return bindings[-1][1]
+    for clock, entry in reversed(bindings):
+        if clock < cutoff:
+            return entry
+    return None
+
+
+def save_scope(scope: t.Optional[Scope], cutoff: int) -> t.Optional[Scope]:
+    if scope is None or scope.cutoff is not None:
+        # Saved scopes never change.
+        return scope
+    scope.last_save = cutoff
+    return Scope(scope.bindings, save_scope(scope.parent, cutoff), cutoff)
 
 
 class Environment:
 
-    def __init__(self, space: t.Optional[t.List[t.Dict[str, entries.Entry]]] = None, load_builtins: bool = False):
+    def __init__(self, saved: t.Optional[Scope] = None, load_builtins: bool = False):
+        """Create an empty environment or a new scope on top of the saved environment (see Environment.save)."""
         self._load_node_dispatcher: t.Dict[type, t.Callable[[nodes.Node], None]] = {
             nodes.InterfaceDeclaration: self._load_interface,
             nodes.FunctionDeclaration: self._load_function,
         }
 
-        self.space = space or [{}]
-        if space:
-            self.nesting_level = len(space) - 1
-        else:
-            self.nesting_level = 0
+        self.scope = Scope({}, saved)
+        self.nesting_level = 0
+        while saved is not None:
+            self.nesting_level += 1
+            saved = saved.parent
+        self._saved: t.Optional[Scope] = None
+        # Name -> (bindings, cutoff) of the scope the name was found in by the last lookup. Valid until the name is
+        # bound again or the scope it was found in is left, so repeated lookups skip walking the scopes.
+        self._resolved: t.Dict[str, t.Tuple[t.List[t.Tuple[int, entries.Entry]], t.Optional[int]]] = {}
 
         self.parents: t.List[nodes.Name] = []
         self.where_clauses: t.List[nodes.Expression] = []
+        # (parameter, ids of where clauses) -> (the where clauses, data they require from the parameter), filled by
+        # get_required_data_from_where_clauses. Cleared when an interface is declared or changed.
+        self._required_data: t.Dict[t.Tuple[str, t.Tuple[int, ...]], t.Tuple[
+            t.List[nodes.Expression],
+            t.Tuple[nodes.Interfaces, t.Dict[str, entries.Entry], t.Dict[str, entries.FunctionEntry]]
+        ]] = {}
         self.code = errors.Code()
 
         if load_builtins:
@@ -42,14 +90,47 @@ class Environment:
 
     def __getitem__(self, key) -> t.Optional[entries.Entry]:
         """Get entry. Return None if not found."""
-        nesting_level = self.nesting_level
-        while nesting_level >= 0:
-            entry = self.space[nesting_level].get(key)
-            if entry is not None:
-                return entry
-            nesting_level -= 1
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            bindings, cutoff = resolved
+            return bindings[-1][1] if cutoff is None else entry_before(bindings, cutoff)
+        scope: t.Optional[Scope] = self.scope
+        while scope is not None:
+            bindings = scope.bindings.get(key)
+            if bindings is not None:
+                entry = entry_before(bindings, scope.cutoff)
+                if entry is not None:
+                    self._resolved[key] = (bindings, scope.cutoff)
+                    return entry
+            scope = scope.parent
         return None
 
+    def __copy__(self) -> "Environment":
+        result = object.__new__(Environment)
+        result.__dict__.update(self.__dict__)
+        result._resolved = {}
+        return result
+
+    def bind(self, key: str, entry: entries.Entry) -> None:
+        """Bind key to entry in the current scope."""
+        bindings = self.scope.bindings.get(key)
+        if bindings is None:
+            self.scope.bindings[key] = [(next(CLOCK), entry)]
+        elif bindings[-1][0] > self.scope.last_save:
+            # No saved scope can see the latest binding.
+            bindings[-1] = (next(CLOCK), entry)
+        else:
+            bindings.append((next(CLOCK), entry))
+        self._saved = None
+        self._resolved.pop(key, None)
+
+    def save(self) -> Scope:
+        """Return the current state of the environment, which later changes of the environment do not affect."""
+        if self._saved is None:
+            self._saved = save_scope(self.scope, next(CLOCK))
+        assert self._saved is not None
+        return self._saved
+
     def get(self, key: t.Union[nodes.Name, nodes.BuiltinType]) -> entries.Entry:
         """Get entry of name. Raise NameError if name is not found."""
         if isinstance(key, nodes.BuiltinType):
@@ -91,28 +172,29 @@ class Environment:
             "estimated_value": estimated_value
         }
         parameters.update(kwarguments)
-        self.space[self.nesting_level][parameters["name"].member] = entries.DeclEntry(**parameters)      # type: ignore
+        self.bind(parameters["name"].member, entries.DeclEntry(**parameters))      # type: ignore
 
     def add_arguments(self, line: int, arguments: t.List[nodes.Argument]) -> None:
         for arg in arguments:
             value = enodes.DynamicValue(arg.type)
-            self.space[self.nesting_level][arg.name.member] = entries.DeclEntry(
+            self.bind(arg.name.member, entries.DeclEntry(
                 line, DeclType.constant, arg.name, arg.type, value=None, estimated_value=value
-            )
+            ))
 
     def add_function(
         self, line: int, name: t.Union[nodes.Name, nodes.BuiltinFunc], parameters: nodes.Parameters, arguments: t.List[nodes.Argument],
         return_type: nodes.Type, where_clause: t.Optional[nodes.Expression]
     ) -> None:
-        space_copy = copy_environment(self).space
+        saved = self.save()
         clauses = list(self.where_clauses)
         if where_clause:
             clauses.append(where_clause)
         name_string = name.member if isinstance(name, nodes.Name) else name.value
         # TODO: BuiltinFunc name should be BuiltinFunc in object
-        self.space[self.nesting_level][name_string] = entries.FunctionEntry(
-            line, nodes.Name(name_string), parameters, arguments, return_type, body=[], where_clauses=clauses, saved_environment=space_copy
-        )
+        self.bind(name_string, entries.FunctionEntry(
+            line, nodes.Name(name_string), parameters, arguments, return_type, body=[], where_clauses=clauses,
+            saved_environment=saved
+        ))
 
     # TODO: add parameters to method declarations
     def add_method(
@@ -120,20 +202,24 @@ class Environment:
         arguments: t.List[nodes.Argument], return_type: nodes.Type
     ) -> None:
         entry = self._get_parent_type_entry()
-        space_copy = copy_environment(self).space
+        saved = self.save()
         if isinstance(name, nodes.SpecialMethods):
             key = name.value
             name = nodes.Name(key)
         else:
             key = name.member
+        if isinstance(entry, entries.InterfaceEntry):
+            self._required_data.clear()
         entry.methods[key] = entries.FunctionEntry(
             line, name, [], arguments, return_type, body=[], where_clauses=list(self.where_clauses),
-            saved_environment=space_copy
+            saved_environment=saved
         )
 
     def add_field(self, line: int, name: nodes.Name, type_: nodes.Type) -> None:
         entry = self._get_parent_type_entry()
         assert isinstance(entry, (entries.StructEntry, entries.InterfaceEntry))
+        if isinstance(entry, entries.InterfaceEntry):
+            self._required_data.clear()
         entry.fields[name.member] = entries.DeclEntry(
             line, DeclType.variable, name, type_, value=None, estimated_value=enodes.DynamicValue(type_)
         )
@@ -146,6 +232,7 @@ class Environment:
         entry = self._get_parent_type_entry()
         assert isinstance(entry, entries.StructEntry)
         entry.init_declarations[','.join(arg.to_code() for arg in arguments)] = entries.InitEntry(line, arguments, body=[])
+        entry.init_index.clear()
 
     def _get_parent_type_entry(self) -> t.Union[entries.StructEntry, entries.AlgebraicEntry, entries.InterfaceEntry]:
         assert self.parents
@@ -171,9 +258,9 @@ class Environment:
         if self.parents:
             self.add_algebraic_constructor(line, name, parameters)
         else:
-            self.space[self.nesting_level][name.member] = entries.StructEntry(
+            self.bind(name.member, entries.StructEntry(
                 line, name, parameters, interfaces, fields={}, init_declarations={}, methods={}
-            )
+            ))
 
     def add_algebraic_constructor(self, line: int, name: nodes.Name, parameters: nodes.Parameters) -> None:
         assert self.parents
@@ -184,9 +271,7 @@ class Environment:
         )
 
     def add_algebraic(self, line: int, name: nodes.Name, parameters: nodes.Parameters) -> None:
-        self.space[self.nesting_level][name.member] = entries.AlgebraicEntry(
-            line, name, parameters, constructors={}, methods={}
-        )
+        self.bind(name.member, entries.AlgebraicEntry(line, name, parameters, constructors={}, methods={}))
 
     def add_interface(
         self, line: int, name: t.Union[nodes.BuiltinType, nodes.Name], parameters: nodes.Parameters,
@@ -214,20 +299,19 @@ class Environment:
             inherited_methods.update(interface_entry.inherited_methods)
 
         name_string = name.member if isinstance(name, nodes.Name) else name.value
-        self.space[self.nesting_level][name_string] = entries.InterfaceEntry(
+        self._required_data.clear()
+        self.bind(name_string, entries.InterfaceEntry(
             line, name, parameters, implemented_interfaces=implemented_interfaces, fields={}, methods={},
             inherited_fields=inherited_fields, inherited_methods=inherited_methods
-        )
+        ))
 
     def add_parameters(self, line: int, parameters: nodes.Parameters) -> None:
         for parameter in parameters:
             interfaces, fields, methods = self.get_required_data_from_where_clauses(parameter)
-            self.space[self.nesting_level][parameter.member] = entries.ParameterEntry(
-                line, parameter, interfaces, fields, methods
-            )
+            self.bind(parameter.member, entries.ParameterEntry(line, parameter, interfaces, fields, methods))
 
     def update_function_body(self, name: nodes.Name, body: nodes.AST) -> None:
-        entry = self.space[self.nesting_level][name.member]
+        entry = self.scope.bindings[name.member][-1][1]
         assert isinstance(entry, entries.FunctionEntry)
         entry.body = body
 
@@ -249,13 +333,19 @@ class Environment:
 
     def inc_nesting(self, parent: t.Optional[nodes.Name] = None) -> None:
         self.nesting_level += 1
-        self.space.append({})
+        self.scope = Scope({}, self.scope)
+        self._saved = None
         if parent:
             self.parents.append(parent)
 
     def dec_nesting(self, parent: t.Optional[nodes.Name] = None) -> None:
-        del self.space[self.nesting_level]
+        assert self.scope.parent is not None and self.scope.parent.cutoff is None, "Saved scopes are read-only"
+        # Only names bound in the left scope can be resolved to it.
+        for key in self.scope.bindings:
+            self._resolved.pop(key, None)
+        self.scope = self.scope.parent
         self.nesting_level -= 1
+        self._saved = None
         if parent:
             self.parents.pop()
 
@@ -302,15 +392,21 @@ class Environment:
     def get_required_data_from_where_clauses(
         self, name: nodes.Name
     ) -> t.Tuple[nodes.Interfaces, t.Dict[str, entries.Entry], t.Dict[str, entries.FunctionEntry]]:
-        interfaces: nodes.Interfaces = []
-        fields: t.Dict[str, entries.Entry] = {}
-        methods: t.Dict[str, entries.FunctionEntry] = {}
-        for clause in self.where_clauses:
-            sub_interfaces, sub_fields, sub_methods = self._get_required_data_from_clause(name, clause)
-            interfaces.extend(sub_interfaces)
-            fields.update(sub_fields)
-            methods.update(sub_methods)
-        return interfaces, fields, methods
+        key = (name.member, tuple(id(clause) for clause in self.where_clauses))
+        cached = self._required_data.get(key)
+        if cached is None:
+            interfaces: nodes.Interfaces = []
+            fields: t.Dict[str, entries.Entry] = {}
+            methods: t.Dict[str, entries.FunctionEntry] = {}
+            for clause in self.where_clauses:
+                sub_interfaces, sub_fields, sub_methods = self._get_required_data_from_clause(name, clause)
+                interfaces.extend(sub_interfaces)
+                fields.update(sub_fields)
+                methods.update(sub_methods)
+            cached = self._required_data[key] = (list(self.where_clauses), (interfaces, fields, methods))
+        interfaces, fields, methods = cached[1]
+        # Parameter entries change their data (see Analyzer._apply_is_check_to_env), so they get copies.
+        return list(interfaces), dict(fields), dict(methods)
 
     def _load_interface(self, node: nodes.Node):
         assert isinstance(node, nodes.InterfaceDeclaration)
@@ -338,10 +434,10 @@ class Environment:
         )
 
     def load_builtins(self):
-        from . import parsers, clarification, context
-        with open("stdlib/builtins/main.angel", "r") as file:
+        from . import ast_cache, clarification, context
+        with open(BUILTINS_PATH, "r") as file:
             contents = file.read()
-        parser = parsers.Parser()
-        clarifier = clarification.Clarifier(context.Context(contents.splitlines(), main_hash="", mangle_names=False))
-        for node in clarifier.clarify_ast(parser.parse(contents)):
+        builtins_context = context.Context(contents.splitlines(), main_hash="", mangle_names=False)
+        clarifier = clarification.Clarifier(builtins_context)
+        for node in ast_cache.parse_and_clarify(contents, builtins_context, clarifier):
             dispatch(self._load_node_dispatcher, type(node), node)
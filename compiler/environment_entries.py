@@ -19,7 +19,8 @@ class FunctionEntry(Entry):
     return_type: nodes.Type
     body: nodes.AST
     where_clauses: t.List[nodes.Expression] = field(default_factory=list)
-    saved_environment: t.List[t.Dict[str, Entry]] = field(default_factory=list)
+    # environment.Scope (saved by Environment.save), Any because of circular imports
+    saved_environment: t.Any = None
 
     def to_estimated_function(self) -> Function:
         return Function(
@@ -39,6 +40,43 @@ class InitEntry(Entry):
     body: nodes.AST
 
 
+# Head of the type of a literal argument (see literal_head): a builtin type or the class of a vector or dict type.
+ArgumentHead = t.Optional[t.Union[nodes.BuiltinType, type]]
+
+
+def literal_head(value: t.Optional[nodes.Expression]) -> ArgumentHead:
+    """Return the head of the type of a literal without inferring the type, or None for other expressions."""
+    if isinstance(value, nodes.StringLiteral):
+        return nodes.BuiltinType.string
+    elif isinstance(value, nodes.CharLiteral):
+        return nodes.BuiltinType.char
+    elif isinstance(value, nodes.BoolLiteral):
+        return nodes.BuiltinType.bool
+    elif isinstance(value, nodes.VectorLiteral):
+        return nodes.VectorType
+    elif isinstance(value, nodes.DictLiteral):
+        return nodes.DictType
+    return None
+
+
+def may_unify_head(head: ArgumentHead, type_: nodes.Type) -> bool:
+    """Whether a value with the head may be of the type. False only if unification of them always fails."""
+    if head is None:
+        return True
+    if isinstance(type_, nodes.BuiltinType):
+        if type_ is nodes.BuiltinType.self_:
+            return True
+        if isinstance(head, nodes.BuiltinType):
+            try:
+                return head.is_builtin_subtype(type_)
+            except KeyError:
+                return True
+        return type_ is nodes.BuiltinType.convertible_to_string
+    if isinstance(type_, (nodes.VectorType, nodes.DictType)):
+        return head is type(type_)
+    return True
+
+
 @dataclass
 class StructEntry(Entry):
     name: nodes.Name
@@ -47,10 +85,34 @@ class StructEntry(Entry):
     fields: t.Dict[str, Entry]
     init_declarations: t.Dict[str, InitEntry]
     methods: t.Dict[str, FunctionEntry]
+    # (number of arguments, head of the first argument) -> init declarations that may match a call with them,
+    # filled by plausible_init_declarations. Cleared when an init declaration is added.
+    init_index: t.Dict[t.Tuple[int, ArgumentHead], t.List[InitEntry]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
 
     def implements_interface(self, interface: nodes.Interface) -> bool:
         return interface in self.implemented_interfaces
 
+    def plausible_init_declarations(self, arguments: t.List[nodes.Expression]) -> t.List[InitEntry]:
+        """Return init declarations that may match a call with the arguments, in the order of declaration.
+
+        The others either take fewer arguments, have no default values for arguments that are not passed or take a
+        first argument of a type that the literal passed as the first argument cannot have.
+
+        """
+        head = literal_head(arguments[0]) if arguments else None
+        key = (len(arguments), head)
+        plausible = self.init_index.get(key)
+        if plausible is None:
+            plausible = self.init_index[key] = [
+                init_entry for init_entry in self.init_declarations.values()
+                if len(arguments) <= len(init_entry.arguments)
+                and all(arg.value is not None for arg in init_entry.arguments[len(arguments):])
+                and (not init_entry.arguments or may_unify_head(head, init_entry.arguments[0].type))
+            ]
+        return plausible
+
 
 @dataclass
 class AlgebraicEntry(Entry):
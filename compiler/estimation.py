@@ -10,6 +10,7 @@ from itertools import zip_longest
 from . import estimation_nodes as enodes, nodes, environment, errors, type_checking, environment_entries as entries
 from .enums import DeclType
 from .utils import submangle, dispatch, NODES, EXPRESSIONS, ASSIGNMENTS, apply_mapping
+from .visitors import Dispatcher, Visitor
 from .constants import (
     builtin_funcs, private_builtin_funcs, string_fields, vector_fields, dict_fields, SELF_NAME, SPEC_LINE
 )
@@ -24,7 +25,157 @@ EstimatedObjects = namedtuple(
 EstimatedFields = t.Dict[str, t.Union[t.Callable[..., enodes.Expression], enodes.Expression]]
 
 
-class Evaluator(unittest.TestCase):
+class Evaluator(Visitor, unittest.TestCase):
+    expression_dispatcher = Dispatcher({
+        nodes.Name: 'estimate_name',
+        nodes.SpecialName: 'estimate_special_name',
+        nodes.Field: 'estimate_field',
+        nodes.Subscript: 'estimate_subscript',
+        nodes.BinaryExpression: 'estimate_binary_expression',
+        nodes.Cast: 'estimate_cast',
+        nodes.Ref: 'estimate_ref',
+        nodes.Parentheses: lambda self, expr: self.estimate_expression(expr.value),
+        nodes.FunctionCall: 'estimate_function_call',
+        nodes.MethodCall: 'estimate_method_call',
+        nodes.BuiltinFunc: lambda self, func: self.estimated_objs.builtin_funcs[func.value],
+        nodes.PrivateBuiltinFunc: lambda self, func: self.estimated_objs.private_builtin_funcs[func.value],
+        nodes.Decl: 'estimate_decl',
+        nodes.NamedArgument: lambda self, argument: self.estimate_expression(argument.value),
+
+        nodes.OptionalSomeCall: 'estimate_optional_some_call',
+        nodes.OptionalSomeValue: 'estimate_optional_some_value',
+        nodes.OptionalTypeConstructor: 'estimate_optional_constructor',
+
+        nodes.IntegerLiteral: 'estimate_integer_literal',
+        nodes.DecimalLiteral: 'estimate_decimal_literal',
+        nodes.StringLiteral: 'estimate_string_literal',
+        nodes.CharLiteral: 'estimate_char_literal',
+        nodes.BoolLiteral: 'estimate_bool_literal',
+        nodes.VectorLiteral: 'estimate_vector_literal',
+        nodes.DictLiteral: 'estimate_dict_literal',
+    })
+
+    _add_dispatcher = Dispatcher({
+        (enodes.DynamicValue, enodes.DynamicValue): 'estimate_add_dyn_values',
+        (enodes.Int, enodes.Int): 'estimate_add_ints',
+        (enodes.String, enodes.String): 'estimate_add_strings',
+        (enodes.Vector, enodes.Vector): 'estimate_add_vectors',
+        (enodes.Instance, enodes.Instance): lambda self, *arguments: self.estimate_arithmetic_operation_instances(
+            nodes.SpecialMethods.add, *arguments
+        ),
+        (enodes.DynamicValue, enodes.String): 'estimate_add_dyn_value_and_string',
+    })
+
+    _sub_dispatcher = Dispatcher({
+        (enodes.Int, enodes.Int): 'estimate_sub_ints',
+        (enodes.Instance, enodes.Instance): lambda self, *arguments: self.estimate_arithmetic_operation_instances(
+            nodes.SpecialMethods.sub, *arguments
+        ),
+    })
+
+    _mul_dispatcher = Dispatcher({
+        (enodes.Int, enodes.Int): 'estimate_mul_ints',
+        (enodes.Instance, enodes.Instance): lambda self, *arguments: self.estimate_arithmetic_operation_instances(
+            nodes.SpecialMethods.mul, *arguments
+        ),
+    })
+
+    _div_dispatcher = Dispatcher({
+        (enodes.Int, enodes.Int): 'estimate_div_ints',
+        (enodes.Instance, enodes.Instance): lambda self, *arguments: self.estimate_arithmetic_operation_instances(
+            nodes.SpecialMethods.div, *arguments
+        ),
+    })
+
+    _eq_dispatcher = Dispatcher({
+        (enodes.Int, enodes.Int): lambda self, x, y, xe, ye: enodes.Bool(xe.value == ye.value),
+        (enodes.String, enodes.String): lambda self, x, y, xe, ye: enodes.Bool(xe.value == ye.value),
+        (enodes.Char, enodes.Char): lambda self, x, y, xe, ye: enodes.Bool(xe.value == ye.value),
+        (enodes.Bool, enodes.Bool): lambda self, x, y, xe, ye: enodes.Bool(xe.value == ye.value),
+        (enodes.OptionalConstructor, enodes.OptionalConstructor):
+            lambda self, x, y, xe, ye: enodes.Bool(xe.value == ye.value),
+        (enodes.Instance, enodes.Instance): 'estimate_eq_instances',
+
+        (enodes.OptionalSomeCall, enodes.OptionalConstructor): lambda self, x, y, xe, ye: enodes.Bool(False),
+    })
+
+    _lt_dispatcher = Dispatcher({
+        (enodes.Int, enodes.Int): lambda self, x, y, xe, ye: enodes.Bool(xe.value < ye.value),
+    })
+
+    _gt_dispatcher = Dispatcher({
+        (enodes.Int, enodes.Int): lambda self, x, y, xe, ye: enodes.Bool(xe.value > ye.value),
+    })
+
+    binary_operator_dispatcher = Dispatcher({
+        nodes.Operator.add.value: lambda self, x, y, xe, ye: dispatch(
+            self._add_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+        nodes.Operator.sub.value: lambda self, x, y, xe, ye: dispatch(
+            self._sub_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+        nodes.Operator.mul.value: lambda self, x, y, xe, ye: dispatch(
+            self._mul_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+        nodes.Operator.div.value: lambda self, x, y, xe, ye: dispatch(
+            self._div_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+
+        nodes.Operator.eq_eq.value: lambda self, x, y, xe, ye: dispatch(
+            self._eq_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+        nodes.Operator.lt.value: lambda self, x, y, xe, ye: dispatch(
+            self._lt_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+        nodes.Operator.gt.value: lambda self, x, y, xe, ye: dispatch(
+            self._gt_dispatcher, (type(xe), type(ye)), self, x, y, xe, ye
+        ),
+
+        nodes.Operator.and_.value: 'estimate_binary_expression_and',
+        nodes.Operator.or_.value: 'estimate_binary_expression_or',
+    })
+
+    estimate_field_dispatcher = Dispatcher({
+        enodes.String: lambda self, base, f: self.estimate_builtin_field(self.estimated_objs.string_fields, base, f),
+        enodes.Vector: lambda self, base, f: self.estimate_builtin_field(self.estimated_objs.vector_fields, base, f),
+        enodes.Dict: lambda self, base, f: self.estimate_builtin_field(self.estimated_objs.dict_fields, base, f),
+        enodes.Instance: 'estimate_instance_field',
+        enodes.Algebraic: 'estimate_algebraic_field',
+        enodes.AlgebraicConstructorInstance: 'estimate_algebraic_constructor_instance_field',
+        enodes.Ref: 'estimate_ref_field',
+        enodes.DynamicValue: 'estimate_dyn_field',
+    })
+
+    assignment_dispatcher = Dispatcher({
+        nodes.Name: 'estimate_name_assignment',
+        nodes.Field: 'estimate_field_assignment',
+        nodes.Subscript: 'estimate_subscript_assignment',
+    })
+
+    node_dispatcher = Dispatcher({
+        nodes.Decl: 'estimate_decl',
+        nodes.FunctionDeclaration: 'estimate_function_declaration',
+        nodes.FieldDeclaration: 'estimate_field_declaration',
+        nodes.InitDeclaration: 'estimate_init_declaration',
+        nodes.MethodDeclaration: 'estimate_method_declaration',
+        nodes.StructDeclaration: 'estimate_struct_declaration',
+        nodes.ExtensionDeclaration: 'estimate_extension_declaration',
+        nodes.AlgebraicDeclaration: 'estimate_algebraic_declaration',
+        nodes.InterfaceDeclaration: 'estimate_interface_declaration',
+        nodes.FunctionCall: 'estimate_expression',
+        nodes.InitCall: 'estimate_init_call',
+        nodes.MethodCall: 'estimate_expression',
+
+        nodes.Return: 'estimate_return',
+        nodes.Break: 'estimate_break',
+        nodes.Assignment: lambda self, statement: dispatch(
+            self.assignment_dispatcher, type(statement.left), self, statement.left, statement.right
+        ),
+        nodes.While: 'estimate_while_statement',
+        nodes.For: 'estimate_for_statement',
+        nodes.If: 'estimate_if_statement',
+    })
+
     def __init__(
         self, estimated_objs: EstimatedObjects, context: Context, env: environment.Environment
     ) -> None:
@@ -38,157 +189,8 @@ class Evaluator(unittest.TestCase):
 
         self.estimated_objs = estimated_objs
 
-        self.expression_dispatcher = {
-            nodes.Name: self.estimate_name,
-            nodes.SpecialName: self.estimate_special_name,
-            nodes.Field: self.estimate_field,
-            nodes.Subscript: self.estimate_subscript,
-            nodes.BinaryExpression: self.estimate_binary_expression,
-            nodes.Cast: self.estimate_cast,
-            nodes.Ref: self.estimate_ref,
-            nodes.Parentheses: lambda expr: self.estimate_expression(expr.value),
-            nodes.FunctionCall: self.estimate_function_call,
-            nodes.MethodCall: self.estimate_method_call,
-            nodes.BuiltinFunc: lambda func: self.estimated_objs.builtin_funcs[func.value],
-            nodes.PrivateBuiltinFunc: lambda func: self.estimated_objs.private_builtin_funcs[func.value],
-            nodes.Decl: self.estimate_decl,
-            nodes.NamedArgument: lambda argument: self.estimate_expression(argument.value),
-
-            nodes.OptionalSomeCall: self.estimate_optional_some_call,
-            nodes.OptionalSomeValue: self.estimate_optional_some_value,
-            nodes.OptionalTypeConstructor: self.estimate_optional_constructor,
-
-            nodes.IntegerLiteral: self.estimate_integer_literal,
-            nodes.DecimalLiteral: self.estimate_decimal_literal,
-            nodes.StringLiteral: self.estimate_string_literal,
-            nodes.CharLiteral: self.estimate_char_literal,
-            nodes.BoolLiteral: self.estimate_bool_literal,
-            nodes.VectorLiteral: self.estimate_vector_literal,
-            nodes.DictLiteral: self.estimate_dict_literal,
-        }
-
-        add_dispatcher = {
-            (enodes.DynamicValue, enodes.DynamicValue): self.estimate_add_dyn_values,
-            (enodes.Int, enodes.Int): self.estimate_add_ints,
-            (enodes.String, enodes.String): self.estimate_add_strings,
-            (enodes.Vector, enodes.Vector): self.estimate_add_vectors,
-            (enodes.Instance, enodes.Instance): partial(
-                self.estimate_arithmetic_operation_instances, nodes.SpecialMethods.add
-            ),
-            (enodes.DynamicValue, enodes.String): self.estimate_add_dyn_value_and_string,
-        }
-
-        sub_dispatcher = {
-            (enodes.Int, enodes.Int): self.estimate_sub_ints,
-            (enodes.Instance, enodes.Instance): partial(
-                self.estimate_arithmetic_operation_instances, nodes.SpecialMethods.sub
-            ),
-        }
-
-        mul_dispatcher = {
-            (enodes.Int, enodes.Int): self.estimate_mul_ints,
-            (enodes.Instance, enodes.Instance): partial(
-                self.estimate_arithmetic_operation_instances, nodes.SpecialMethods.mul
-            ),
-        }
-
-        div_dispatcher = {
-            (enodes.Int, enodes.Int): self.estimate_div_ints,
-            (enodes.Instance, enodes.Instance): partial(
-                self.estimate_arithmetic_operation_instances, nodes.SpecialMethods.div
-            ),
-        }
-
-        eq_dispatcher: t.Dict[t.Tuple[type, type], t.Callable] = {
-            (enodes.Int, enodes.Int): lambda x, y, xe, ye: enodes.Bool(xe.value == ye.value),
-            (enodes.String, enodes.String): lambda x, y, xe, ye: enodes.Bool(xe.value == ye.value),
-            (enodes.Char, enodes.Char): lambda x, y, xe, ye: enodes.Bool(xe.value == ye.value),
-            (enodes.Bool, enodes.Bool): lambda x, y, xe, ye: enodes.Bool(xe.value == ye.value),
-            (enodes.OptionalConstructor, enodes.OptionalConstructor): lambda x, y, xe, ye: enodes.Bool(xe.value == ye.value),
-            (enodes.Instance, enodes.Instance): self.estimate_eq_instances,
-
-            (enodes.OptionalSomeCall, enodes.OptionalConstructor): lambda x, y, xe, ye: enodes.Bool(False),
-        }
-
-        lt_dispatcher = {
-            (enodes.Int, enodes.Int): lambda x, y, xe, ye: enodes.Bool(xe.value < ye.value),
-        }
-
-        gt_dispatcher = {
-            (enodes.Int, enodes.Int): lambda x, y, xe, ye: enodes.Bool(xe.value > ye.value),
-        }
-
-        self.binary_operator_dispatcher = {
-            nodes.Operator.add.value: lambda x, y, xe, ye: dispatch(
-                add_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-            nodes.Operator.sub.value: lambda x, y, xe, ye: dispatch(
-                sub_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-            nodes.Operator.mul.value: lambda x, y, xe, ye: dispatch(
-                mul_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-            nodes.Operator.div.value: lambda x, y, xe, ye: dispatch(
-                div_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-
-            nodes.Operator.eq_eq.value: lambda x, y, xe, ye: dispatch(
-                eq_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-            nodes.Operator.lt.value: lambda x, y, xe, ye: dispatch(
-                lt_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-            nodes.Operator.gt.value: lambda x, y, xe, ye: dispatch(
-                gt_dispatcher, (type(xe), type(ye)), x, y, xe, ye
-            ),
-
-            nodes.Operator.and_.value: self.estimate_binary_expression_and,
-            nodes.Operator.or_.value: self.estimate_binary_expression_or,
-        }
-
-        self.estimate_field_dispatcher = {
-            enodes.String: lambda base, f: self.estimate_builtin_field(self.estimated_objs.string_fields, base, f),
-            enodes.Vector: lambda base, f: self.estimate_builtin_field(self.estimated_objs.vector_fields, base, f),
-            enodes.Dict: lambda base, f: self.estimate_builtin_field(self.estimated_objs.dict_fields, base, f),
-            enodes.Instance: self.estimate_instance_field,
-            enodes.Algebraic: self.estimate_algebraic_field,
-            enodes.AlgebraicConstructorInstance: self.estimate_algebraic_constructor_instance_field,
-            enodes.Ref: self.estimate_ref_field,
-            enodes.DynamicValue: self.estimate_dyn_field,
-        }
-
-        self.assignment_dispatcher = {
-            nodes.Name: self.estimate_name_assignment,
-            nodes.Field: self.estimate_field_assignment,
-            nodes.Subscript: self.estimate_subscript_assignment,
-        }
-
-        self.node_dispatcher = {
-            nodes.Decl: self.estimate_decl,
-            nodes.FunctionDeclaration: self.estimate_function_declaration,
-            nodes.FieldDeclaration: self.estimate_field_declaration,
-            nodes.InitDeclaration: self.estimate_init_declaration,
-            nodes.MethodDeclaration: self.estimate_method_declaration,
-            nodes.StructDeclaration: self.estimate_struct_declaration,
-            nodes.ExtensionDeclaration: self.estimate_extension_declaration,
-            nodes.AlgebraicDeclaration: self.estimate_algebraic_declaration,
-            nodes.InterfaceDeclaration: self.estimate_interface_declaration,
-            nodes.FunctionCall: self.estimate_expression,
-            nodes.InitCall: self.estimate_init_call,
-            nodes.MethodCall: self.estimate_expression,
-
-            nodes.Return: self.estimate_return,
-            nodes.Break: self.estimate_break,
-            nodes.Assignment: lambda statement: dispatch(
-                self.assignment_dispatcher, type(statement.left), statement.left, statement.right
-            ),
-            nodes.While: self.estimate_while_statement,
-            nodes.For: self.estimate_for_statement,
-            nodes.If: self.estimate_if_statement,
-        }
-
     def estimate_node(self, node: nodes.Node) -> t.Optional[enodes.Expression]:
-        return dispatch(self.node_dispatcher, type(node), node)
+        return self.visit(node)
 
     def estimate_ast(self, ast: Iterable[nodes.Node]) -> t.Optional[enodes.Expression]:
         result = None
@@ -423,7 +425,7 @@ class Evaluator(unittest.TestCase):
         self, x: nodes.Expression, y: nodes.Expression, xe: enodes.Int, ye: enodes.Int
     ) -> enodes.Int:
         value = xe.value + ye.value
-        new_type = self.infer_type(nodes.IntegerLiteral(str(value)))
+        new_type = self.int_type(value)
         assert isinstance(new_type, nodes.BuiltinType)
         return enodes.Int(value, new_type)
 
@@ -464,7 +466,7 @@ class Evaluator(unittest.TestCase):
         self, x: nodes.Expression, y: nodes.Expression, xe: enodes.Int, ye: enodes.Int
     ) -> enodes.Int:
         value = xe.value - ye.value
-        new_type = self.infer_type(nodes.IntegerLiteral(str(value)))
+        new_type = self.int_type(value)
         assert isinstance(new_type, nodes.BuiltinType)
         return enodes.Int(value, new_type)
 
@@ -472,7 +474,7 @@ class Evaluator(unittest.TestCase):
         self, x: nodes.Expression, y: nodes.Expression, xe: enodes.Int, ye: enodes.Int
     ) -> enodes.Int:
         value = xe.value * ye.value
-        new_type = self.infer_type(nodes.IntegerLiteral(str(value)))
+        new_type = self.int_type(value)
         assert isinstance(new_type, nodes.BuiltinType)
         return enodes.Int(value, new_type)
 
@@ -482,13 +484,13 @@ class Evaluator(unittest.TestCase):
         if ye.value == 0:
             raise errors.AngelDivByZero
         value = int(Decimal(xe.value) / Decimal(ye.value))
-        new_type = self.infer_type(nodes.IntegerLiteral(str(value)))
+        new_type = self.int_type(value)
         assert isinstance(new_type, nodes.BuiltinType)
         # TODO: move to enodes.Float(value, new_type)
         return enodes.Int(int(value), new_type)
 
     def estimate_expression(self, expression: nodes.Expression) -> enodes.Expression:
-        return dispatch(self.expression_dispatcher, type(expression), expression)
+        return dispatch(self.expression_dispatcher, type(expression), self, expression)
 
     def estimate_name(self, name: nodes.Name) -> enodes.Expression:
         if name.module:
@@ -561,7 +563,7 @@ class Evaluator(unittest.TestCase):
 
     def estimate_field(self, field: nodes.Field) -> enodes.Expression:
         base = self.estimate_expression(field.base)
-        return dispatch(self.estimate_field_dispatcher, type(base), base, field.field)
+        return dispatch(self.estimate_field_dispatcher, type(base), self, base, field.field)
 
     def estimate_subscript(self, subscript: nodes.Subscript) -> enodes.Expression:
         base = self.estimate_expression(subscript.base)
@@ -622,7 +624,6 @@ class Evaluator(unittest.TestCase):
     ) -> enodes.Instance:
         estimated_arguments = [self.estimate_expression(argument) for argument in arguments]
         matched = True
-        expected_major = []
         if algebraic:
             struct_entry: entries.Entry = self.env.get_algebraic(
                 nodes.AlgebraicType(algebraic, [], constructor=struct.name)
@@ -631,7 +632,7 @@ class Evaluator(unittest.TestCase):
             struct_entry = self.env.get(struct.name)
         assert isinstance(struct_entry, entries.StructEntry)
 
-        for init_entry in init_declarations:
+        for init_entry in struct_entry.plausible_init_declarations(arguments):
             struct_mapping: t.Dict[str, nodes.Type] = {}
             for param in struct_entry.parameters:
                 struct_mapping[param.member] = self.type_checker.create_template_type()
@@ -652,7 +653,6 @@ class Evaluator(unittest.TestCase):
                     arg_type = self.type_checker.replace_template_types(arg_type)
             if not matched:
                 matched = True
-                expected_major.append([arg.type for arg in init_entry.arguments])
                 continue
             self.env.inc_nesting()
             self.env.add_declaration(
@@ -679,7 +679,8 @@ class Evaluator(unittest.TestCase):
             self.env.dec_nesting()
             return self_value
         expected = " or ".join(
-            ("(" + ", ".join(type_.to_code() for type_ in type_list) + ")" for type_list in expected_major)
+            "(" + ", ".join(arg.type.to_code() for arg in init_entry.arguments) + ")"
+            for init_entry in init_declarations
         )
         raise errors.AngelWrongArguments(expected, self.code, arguments)
 
@@ -758,7 +759,7 @@ class Evaluator(unittest.TestCase):
             if isinstance(expression.left, nodes.BuiltinType):
                 if not isinstance(expression.right, nodes.BuiltinType):
                     return enodes.Bool(False)
-                if expression.right.value in expression.left.get_builtin_supertypes():
+                if expression.left.is_builtin_subtype(expression.right):
                     return enodes.Bool(True)
                 return enodes.Bool(False)
             if expression.right == nodes.BuiltinType.object_:
@@ -774,27 +775,28 @@ class Evaluator(unittest.TestCase):
         right = self.estimate_expression(expression.right)
         if expression.operator.value == nodes.Operator.neq.value:
             result = dispatch(
-                self.binary_operator_dispatcher, nodes.Operator.eq_eq.value, expression.left,
+                self.binary_operator_dispatcher, nodes.Operator.eq_eq.value, self, expression.left,
                 expression.right, left, right
             )
             assert isinstance(result, enodes.Bool)
             return enodes.Bool(not result.value)
         elif expression.operator.value == nodes.Operator.lt_eq.value:
             result = dispatch(
-                self.binary_operator_dispatcher, nodes.Operator.gt.value, expression.left, expression.right,
+                self.binary_operator_dispatcher, nodes.Operator.gt.value, self, expression.left, expression.right,
                 left, right
             )
             assert isinstance(result, enodes.Bool)
             return enodes.Bool(not result.value)
         elif expression.operator.value == nodes.Operator.gt_eq.value:
             result = dispatch(
-                self.binary_operator_dispatcher, nodes.Operator.lt.value, expression.left, expression.right,
+                self.binary_operator_dispatcher, nodes.Operator.lt.value, self, expression.left, expression.right,
                 left, right
             )
             assert isinstance(result, enodes.Bool)
             return enodes.Bool(not result.value)
         return dispatch(
-            self.binary_operator_dispatcher, expression.operator.value, expression.left, expression.right, left, right
+            self.binary_operator_dispatcher, expression.operator.value, self, expression.left, expression.right,
+            left, right
         )
 
     def estimate_ref(self, ref: nodes.Ref) -> enodes.Expression:
@@ -878,6 +880,14 @@ class Evaluator(unittest.TestCase):
             dict_type.key_type, dict_type.value_type
         )
 
+    def int_type(self, value: int) -> nodes.Type:
+        """Return type of an integer literal with the value without building and inferring the literal."""
+        possible_types = type_checking.get_possible_int_types_based_on_value(value)
+        if not possible_types:
+            # Let the type checker report the value that does not fit in any type.
+            return self.infer_type(nodes.IntegerLiteral(str(value)))
+        return possible_types[0]
+
     def infer_type(self, expression: nodes.Expression, supertype: t.Optional[nodes.Type] = None) -> nodes.Type:
         self.type_checker.update_context(self.env, self.code)
         result = self.type_checker.infer_type(expression, supertype)
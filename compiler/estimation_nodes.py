@@ -127,14 +127,14 @@ class Function(Expression):
     return_type: nodes.Type
     where_clauses: t.List[nodes.Expression]
     specification: t.Union[t.Callable[..., Expression], nodes.AST]
-    # Actually, saved_environment dict values are environment entries, but we use Any because of circular imports
-    saved_environment: t.List[t.Dict[str, t.Any]]
+    # Actually, saved_environment is environment.Scope, but we use Any because of circular imports
+    saved_environment: t.Any
 
     def __init__(
         self, name: t.Union[nodes.Name, str], parameters: nodes.Parameters,
         arguments: nodes.Arguments, return_type: nodes.Type, where_clauses: t.List[nodes.Expression],
         specification: t.Union[t.Callable[..., Expression], nodes.AST],
-        saved_environment: t.Optional[t.List[t.Dict[str, t.Any]]] = None
+        saved_environment: t.Any = None
     ):
         if isinstance(name, str):
             self.name = nodes.Name(name)
@@ -146,7 +146,7 @@ class Function(Expression):
         self.return_type = return_type
         self.where_clauses = where_clauses
         self.specification = specification
-        self.saved_environment = saved_environment or []
+        self.saved_environment = saved_environment
 
     def to_code(self) -> str:
         return f"Function(({', '.join(arg.to_code() for arg in self.arguments)}) -> {self.return_type.to_code()})"
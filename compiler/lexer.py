@@ -0,0 +1,179 @@
+import re
+import typing as t
+from array import array
+from bisect import bisect_left, bisect_right
+from enum import IntEnum
+
+from .nodes import INDENTATION
+
+
+IDENTIFIER_REGEX = re.compile("[_]?[_]?[a-zA-Z][a-zA-Z0-9]*(?:__)?")
+INTEGER_REGEX = re.compile("[0-9]+")
+WHITESPACE_REGEX = re.compile(r"\s+")
+LINE_COMMENT = "//"
+
+
+class TokenKind(IntEnum):
+    name = 1
+    integer = 2
+    char = 3
+    string = 4
+    operator = 5
+    eof = 6
+    # Zero-width tokens before the first token of a line indented deeper (one per level) or shallower than the
+    # previous one. A level is nodes.INDENTATION, lines with only whitespace and comments do not count.
+    indent = 7
+    dedent = 8
+
+
+LAYOUT = (TokenKind.indent, TokenKind.dedent)
+
+
+class Tokens:
+    """Compact token array.
+
+    Tokens are stored column-wise in typed arrays: kind, start offset and end offset. Token text is never copied, it
+    is code[offsets[i]:ends[i]]. Layout tokens (indent and dedent) sit at the offset of the token they precede.
+
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.kinds = array('b')
+        self.offsets = array('q')
+        self.ends = array('q')
+        # Indices of layout tokens and the indentation level after each of them (indent tokens minus dedent tokens).
+        self.layout = array('q')
+        self.layout_levels = array('h')
+        self.level = 0
+        # Offset of a name or an integer literal -> its index, used by the parser to consume them in O(1).
+        self.starts: t.Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def append(self, kind: TokenKind, offset: int, end: int) -> None:
+        if kind in (TokenKind.name, TokenKind.integer):
+            self.starts[offset] = len(self.kinds)
+        self.kinds.append(kind)
+        self.offsets.append(offset)
+        self.ends.append(end)
+
+    def append_layout(self, kind: TokenKind, offset: int) -> None:
+        self.level += 1 if kind == TokenKind.indent else -1
+        self.layout.append(len(self.kinds))
+        self.layout_levels.append(self.level)
+        self.append(kind, offset, offset)
+
+    def kind(self, idx: int) -> TokenKind:
+        return TokenKind(self.kinds[idx])
+
+    def text(self, idx: int) -> str:
+        return self.code[self.offsets[idx]:self.ends[idx]]
+
+    def end_of(self, offset: int, kind: TokenKind) -> t.Optional[int]:
+        """Return the end offset of the token of the given kind that starts exactly at offset."""
+        idx = self.starts.get(offset)
+        if idx is None or self.kinds[idx] != kind:
+            return None
+        return self.ends[idx]
+
+    def line_level(self, idx: int) -> int:
+        """Return the indentation level of the line of the token (or of the layout tokens preceding it)."""
+        while self.kinds[idx] in LAYOUT:
+            idx += 1
+        position = bisect_right(self.layout, idx)
+        return self.layout_levels[position - 1] if position else 0
+
+    def skip_trivia(self, offset: int) -> t.Optional[int]:
+        """Return index of the first token that starts at offset or after it, if offset is between tokens.
+
+        Returns None when offset points inside a token (e.g. in the middle of an identifier).
+
+        """
+        idx = bisect_left(self.offsets, offset)
+        if idx == len(self.kinds):
+            # Offset is past the tokenized part of the code.
+            return None
+        if idx > 0 and self.ends[idx - 1] > offset:
+            return None
+        return idx
+
+
+def line_starts(code: str) -> t.List[int]:
+    """Return offsets of the first characters of all lines."""
+    result = [0]
+    idx = code.find("\n")
+    while idx != -1:
+        result.append(idx + 1)
+        idx = code.find("\n", idx + 1)
+    return result
+
+
+def indentation_level(code: str, line_start: int) -> int:
+    """Return the number of nodes.INDENTATION the line starts with."""
+    level = 0
+    while code.startswith(INDENTATION, line_start + level * len(INDENTATION)):
+        level += 1
+    return level
+
+
+def tokenize(code: str, start: int = 0, end: t.Optional[int] = None) -> Tokens:
+    """Split code (or code[start:end]) into tokens. Whitespace and line comments are skipped.
+
+    code[start:end] must start at the beginning of a line that is not indented.
+
+    """
+    tokens = Tokens(code)
+    length = len(code) if end is None else end
+    idx = start
+    line_start: t.Optional[int] = start
+
+    while idx < length:
+        char = code[idx]
+        if char.isspace():
+            end = WHITESPACE_REGEX.match(code, idx, length).end()
+            newline = code.rfind("\n", idx, end)
+            if newline != -1:
+                line_start = newline + 1
+            idx = end
+            continue
+        elif code.startswith(LINE_COMMENT, idx):
+            end = code.find("\n", idx, length)
+            idx = length if end == -1 else end
+            continue
+
+        if line_start is not None:
+            level = indentation_level(code, line_start)
+            while tokens.level < level:
+                tokens.append_layout(TokenKind.indent, idx)
+            while tokens.level > level:
+                tokens.append_layout(TokenKind.dedent, idx)
+            line_start = None
+
+        match = IDENTIFIER_REGEX.match(code, idx, length)
+        if match is not None:
+            tokens.append(TokenKind.name, idx, match.end())
+            idx = match.end()
+            continue
+        match = INTEGER_REGEX.match(code, idx, length)
+        if match is not None:
+            tokens.append(TokenKind.integer, idx, match.end())
+            idx = match.end()
+            continue
+        if char == "'" and idx + 2 < length and code[idx + 2] == "'":
+            tokens.append(TokenKind.char, idx, idx + 3)
+            idx += 3
+        elif char == '"':
+            end = code.find('"', idx + 1, length)
+            end = length if end == -1 else end + 1
+            tokens.append(TokenKind.string, idx, end)
+            idx = end
+        else:
+            tokens.append(TokenKind.operator, idx, idx + 1)
+            idx += 1
+
+    while tokens.level > 0:
+        tokens.append_layout(TokenKind.dedent, idx)
+    tokens.append(TokenKind.eof, idx, idx)
+    return tokens
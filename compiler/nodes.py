@@ -1,7 +1,9 @@
 import enum
 import typing as t
+import weakref
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, is_dataclass
+from functools import lru_cache
 
 from .enums import DeclType
 
@@ -9,6 +11,32 @@ from .enums import DeclType
 INDENTATION = " " * 4
 
 
+def slots(cls):
+    """Recreate the dataclass with __slots__ instead of per instance __dict__.
+
+    Same as dataclass(slots=True), which is available only since Python 3.10.
+    Fields declared by base classes are not declared again.
+
+    """
+    inherited = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(getattr(base, "__slots__", ()))
+    field_names = [class_field.name for class_field in fields(cls)]
+    namespace = dict(cls.__dict__)
+    for name in field_names + ["__dict__", "__weakref__"]:
+        namespace.pop(name, None)
+    namespace["__slots__"] = tuple(name for name in field_names if name not in inherited)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@lru_cache(maxsize=None)
+def node_fields(cls: type) -> t.Tuple[str, ...]:
+    """Return names of the node attributes in the order the node constructor takes them."""
+    if is_dataclass(cls):
+        return tuple(class_field.name for class_field in fields(cls) if class_field.init)
+    return cls.__slots__
+
+
 # TODO: replace all if something: str; else: "" with this function
 def opt_to_str(opt, func) -> str:
     if opt:
@@ -16,6 +44,7 @@ def opt_to_str(opt, func) -> str:
     return ""
 
 
+@slots
 @dataclass
 class Position:
     column: int = 1
@@ -37,13 +66,99 @@ class Position:
 class Type:
     """Base class for types."""
 
+    __slots__ = ()
+
     def to_code(self, indentation_level: int = 0) -> str:
         return ""
 
 
+class InternedTypeMeta(type):
+    """Metaclass of hash-consed types: constructing a type equal to an already built one returns that one."""
+
+    def __call__(cls, *args, **kwargs):
+        instance = super().__call__(*args, **kwargs)
+        instance._interned = False
+        key = type_key(instance)
+        if key is NOT_INTERNABLE:
+            return instance
+        canonical = INTERNED_TYPES.get(key)
+        if canonical is None:
+            instance._interned = True
+            canonical = INTERNED_TYPES[key] = instance
+        return canonical
+
+
+class InternedType(Type, metaclass=InternedTypeMeta):
+    """Base class for types built from other types (vectors, dicts, generics, ...).
+
+    Structurally equal instances are the same object, so they are compared and hashed by identity. An instance
+    that contains something without a structural key (e.g. a FunctionType, which holds where clauses and a saved
+    environment) is not interned: it is compared field by field and is unhashable, like a plain dataclass.
+    Instances must not be mutated after construction. The interned instances are held weakly, a type no longer used
+    anywhere is dropped from INTERNED_TYPES.
+
+    """
+
+    __slots__ = ("_interned", "__weakref__")
+    _interned: bool
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        assert isinstance(other, InternedType)
+        if self._interned or other._interned:
+            return False
+        return all(getattr(self, name) == getattr(other, name) for name in node_fields(type(self)))
+
+    def __hash__(self) -> int:
+        if not self._interned:
+            raise TypeError(f"unhashable type: '{type(self).__name__}'")
+        return object.__hash__(self)
+
+    def __reduce__(self):
+        # Copies and unpickled instances are built by the constructor, so they are interned too.
+        return type(self), tuple(getattr(self, name) for name in node_fields(type(self)))
+
+
+# Structural key -> the interned type with this key, while the type is alive.
+INTERNED_TYPES: "weakref.WeakValueDictionary[t.Hashable, InternedType]" = weakref.WeakValueDictionary()
+NOT_INTERNABLE = object()
+
+
+def type_key(value: t.Any) -> t.Any:
+    """Return a hashable key that is equal for equal types, or NOT_INTERNABLE."""
+    if isinstance(value, InternedType):
+        if value._interned:
+            return value
+        components = [type_key(getattr(value, name)) for name in node_fields(type(value))]
+        if any(component is NOT_INTERNABLE for component in components):
+            return NOT_INTERNABLE
+        return (type(value), *components)
+    elif isinstance(value, Name):
+        # The same fields Name.__eq__ compares.
+        return Name, value.member, value.module
+    elif isinstance(value, list):
+        elements = [type_key(element) for element in value]
+        if any(element is NOT_INTERNABLE for element in elements):
+            return NOT_INTERNABLE
+        return list, tuple(elements)
+    elif isinstance(value, dict):
+        items = [(name, type_key(element)) for name, element in value.items()]
+        if any(element is NOT_INTERNABLE for _, element in items):
+            return NOT_INTERNABLE
+        return dict, frozenset(items)
+    elif value is None or isinstance(value, (BuiltinType, str, int)):
+        return value
+    return NOT_INTERNABLE
+
+
 class Expression:
     """Base class for expressions."""
 
+    __slots__ = ()
+
     def to_code(self, indentation_level: int = 0) -> str:
         return ""
 
@@ -51,7 +166,10 @@ class Expression:
 class AssignmentLeft(Expression):
     """Kind of expression that can be used for assignment."""
 
+    __slots__ = ()
+
 
+@slots
 @dataclass
 class Node:
     """Base class for statements."""
@@ -65,16 +183,18 @@ class Node:
 AST = t.List[Node]
 
 
-@dataclass
-class VectorType(Type):
+@slots
+@dataclass(eq=False)
+class VectorType(InternedType):
     subtype: Type
 
     def to_code(self, indentation_level: int = 0) -> str:
         return f"[{self.subtype.to_code()}]"
 
 
-@dataclass
-class DictType(Type):
+@slots
+@dataclass(eq=False)
+class DictType(InternedType):
     key_type: Type
     value_type: Type
 
@@ -82,30 +202,34 @@ class DictType(Type):
         return f"[{self.key_type.to_code()}: {self.value_type.to_code()}]"
 
 
-@dataclass
-class OptionalType(Type):
+@slots
+@dataclass(eq=False)
+class OptionalType(InternedType):
     inner_type: Type
 
     def to_code(self, indentation_level: int = 0) -> str:
         return f"{self.inner_type.to_code()}?"
 
 
-@dataclass
-class TemplateType(Type):
+@slots
+@dataclass(eq=False)
+class TemplateType(InternedType):
     id: int
 
     def to_code(self, indentation_level: int = 0) -> str:
         return f"T<{self.id}>"
 
 
-@dataclass
-class RefType(Type):
+@slots
+@dataclass(eq=False)
+class RefType(InternedType):
     value_type: Type
 
     def to_code(self, indentation_level: int = 0) -> str:
         return f"ref {self.value_type.to_code()}"
 
 
+@slots
 @dataclass
 class Name(Type, AssignmentLeft):
     member: str
@@ -127,6 +251,7 @@ class Name(Type, AssignmentLeft):
         return False
 
 
+@slots
 @dataclass
 class Field(AssignmentLeft):
     line: int
@@ -138,6 +263,7 @@ class Field(AssignmentLeft):
         return f"{self.base.to_code()}.{self.field.to_code()}"
 
 
+@slots
 @dataclass
 class Subscript(AssignmentLeft):
     line: int
@@ -149,6 +275,7 @@ class Subscript(AssignmentLeft):
         return f"{self.base.to_code()}[{self.index.to_code()}]"
 
 
+@slots
 @dataclass
 class Ref(Expression):
     value: Expression
@@ -158,6 +285,7 @@ class Ref(Expression):
         return f"ref {self.value.to_code()}"
 
 
+@slots
 @dataclass
 class Parentheses(Expression):
     value: Expression
@@ -167,6 +295,7 @@ class Parentheses(Expression):
         return f"({self.value.to_code()})"
 
 
+@slots
 @dataclass
 class OptionalSomeValue(Expression):
     value: Expression
@@ -175,6 +304,7 @@ class OptionalSomeValue(Expression):
         return f"{self.value.to_code()}!"
 
 
+@slots
 @dataclass
 class OptionalSomeCall(Expression):
     value: Expression
@@ -195,9 +325,9 @@ class BuiltinType(Type, enum.Enum):
     """How to add a builtin type:
     1. Add it as a member:
         type = "Type"
-    2. If it is an interface, add it to the list of interfaces (classmethod)
-    3. If it is a "Convertible" interface, add it to as_convertible_interface mapping
-    3. Add supertypes of this type to get_builtin_supertypes mapping
+    2. If it is an interface, add it to BUILTIN_INTERFACES
+    3. If it is a "Convertible" interface, add it to CONVERTIBLE_INTERFACES
+    3. Add supertypes of this type to BUILTIN_SUPERTYPES
     """
     i8 = "I8"
     i16 = "I16"
@@ -243,60 +373,49 @@ class BuiltinType(Type, enum.Enum):
     # These types are mentioned only in expressions.
     optional = "Optional"
 
+    # Set for all members when the lattice is built (see BUILTIN_SUPERTYPES).
+    _bit: int
+    _supertype_bits: t.Optional[int]
+
     @classmethod
     def finite_signed_int_types(cls) -> t.List[str]:
-        return [type_.value for type_ in (BuiltinType.i8, BuiltinType.i16, BuiltinType.i32, BuiltinType.i64)]
+        return FINITE_SIGNED_INT_TYPES
 
     @classmethod
     def finite_unsigned_int_types(cls) -> t.List[str]:
-        return [type_.value for type_ in (BuiltinType.u8, BuiltinType.u16, BuiltinType.u32, BuiltinType.u64)]
+        return FINITE_UNSIGNED_INT_TYPES
 
     @classmethod
     def finite_int_types(cls) -> t.List[str]:
-        return BuiltinType.finite_signed_int_types() + BuiltinType.finite_unsigned_int_types()
+        return FINITE_INT_TYPES
 
     @classmethod
     def finite_float_types(cls) -> t.List[str]:
-        return [BuiltinType.f32.value, BuiltinType.f64.value]
+        return FINITE_FLOAT_TYPES
 
     @classmethod
     def interfaces(cls) -> t.List[str]:
-        return [
-            BuiltinType.addable.value, BuiltinType.subtractable.value, BuiltinType.multipliable.value,
-            BuiltinType.divisible.value, BuiltinType.arithmetic_object.value, BuiltinType.object_.value,
-            BuiltinType.iterable.value, BuiltinType.eq.value,
-            BuiltinType.convertible_to_string.value, BuiltinType.convertible_to_i16.value
-        ]
+        return BUILTIN_INTERFACES
 
     @property
     def is_interface(self):
-        return self.value in self.interfaces()
+        return bool(self._bit & INTERFACE_BITS)
 
     @property
     def is_finite_int_type(self):
-        return self.value in self.finite_int_types()
+        return bool(self._bit & FINITE_INT_BITS)
 
     @property
     def is_finite_float_type(self):
-        return self.value in self.finite_float_types()
+        return bool(self._bit & FINITE_FLOAT_BITS)
 
     @property
     def is_finite(self):
-        return self.is_finite_int_type or self.is_finite_float_type
+        return bool(self._bit & (FINITE_INT_BITS | FINITE_FLOAT_BITS))
 
     @property
     def as_convertible_interface(self):
-        return {
-            BuiltinType.string.value: BuiltinType.convertible_to_string,
-            BuiltinType.i8.value: BuiltinType.convertible_to_i8,
-            BuiltinType.i16.value: BuiltinType.convertible_to_i16,
-            BuiltinType.i32.value: BuiltinType.convertible_to_i32,
-            BuiltinType.i64.value: BuiltinType.convertible_to_i64,
-            BuiltinType.u8.value: BuiltinType.convertible_to_u8,
-            BuiltinType.u16.value: BuiltinType.convertible_to_u16,
-            BuiltinType.u32.value: BuiltinType.convertible_to_u32,
-            BuiltinType.u64.value: BuiltinType.convertible_to_u64,
-        }[self.value]
+        return CONVERTIBLE_INTERFACES[self._value_]
 
     def get_range(self) -> str:
         assert self.is_finite
@@ -322,95 +441,150 @@ class BuiltinType(Type, enum.Enum):
         }[self.value]
 
     def get_builtin_supertypes(self) -> t.List[str]:
-        return {
-            BuiltinType.i8.value: [
-                BuiltinType.i8.value, BuiltinType.i16.value, BuiltinType.i32.value, BuiltinType.i64.value,
-                BuiltinType.convertible_to_string.value, BuiltinType.convertible_to_i8.value,
-                BuiltinType.convertible_to_i16.value, BuiltinType.convertible_to_i32.value,
-                BuiltinType.convertible_to_i64.value,
-                BuiltinType.object_.value, BuiltinType.eq.value
-            ],
-            BuiltinType.i16.value: [
-                BuiltinType.i16.value, BuiltinType.i32.value, BuiltinType.i64.value,
-                BuiltinType.convertible_to_string.value,
-                BuiltinType.convertible_to_i16.value, BuiltinType.convertible_to_i32.value,
-                BuiltinType.convertible_to_i64.value,
-                BuiltinType.object_.value, BuiltinType.eq.value
-            ],
-            BuiltinType.i32.value: [
-                BuiltinType.i32.value, BuiltinType.i64.value, BuiltinType.convertible_to_string.value,
-                BuiltinType.convertible_to_i32.value, BuiltinType.convertible_to_i64.value,
-                BuiltinType.object_.value, BuiltinType.eq.value
-            ],
-            BuiltinType.i64.value: [
-                BuiltinType.i64.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
-                BuiltinType.eq.value, BuiltinType.convertible_to_i64.value,
-            ],
-
-            BuiltinType.int_.value: [
-                BuiltinType.int_.value, BuiltinType.convertible_to_string.value,
-                BuiltinType.object_.value,
-            ],
-
-            BuiltinType.u8.value: [
-                BuiltinType.u8.value, BuiltinType.u16.value, BuiltinType.u32.value, BuiltinType.u64.value,
-                BuiltinType.convertible_to_string.value, BuiltinType.convertible_to_i16.value,
-                BuiltinType.convertible_to_i32.value, BuiltinType.convertible_to_i64.value,
-                BuiltinType.convertible_to_u8.value, BuiltinType.convertible_to_u16.value,
-                BuiltinType.convertible_to_u32.value, BuiltinType.convertible_to_u64.value,
-                BuiltinType.object_.value, BuiltinType.eq.value
-            ],
-            BuiltinType.u16.value: [
-                BuiltinType.u16.value, BuiltinType.u32.value, BuiltinType.u64.value,
-                BuiltinType.convertible_to_string.value, BuiltinType.object_.value, BuiltinType.eq.value,
-                BuiltinType.convertible_to_i32.value, BuiltinType.convertible_to_i64.value,
-                BuiltinType.convertible_to_u16.value,
-                BuiltinType.convertible_to_u32.value, BuiltinType.convertible_to_u64.value,
-            ],
-            BuiltinType.u32.value: [
-                BuiltinType.u32.value, BuiltinType.u64.value, BuiltinType.convertible_to_string.value,
-                BuiltinType.object_.value, BuiltinType.eq.value,
-                BuiltinType.convertible_to_i64.value, BuiltinType.convertible_to_u32.value,
-                BuiltinType.convertible_to_u64.value,
-            ],
-            BuiltinType.u64.value: [
-                BuiltinType.u64.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
-                BuiltinType.eq.value, BuiltinType.convertible_to_u64.value
-            ],
-
-            BuiltinType.f32.value: [
-                BuiltinType.f32.value, BuiltinType.f64.value, BuiltinType.convertible_to_string.value,
-                BuiltinType.object_.value, BuiltinType.eq.value
-            ],
-            BuiltinType.f64.value: [
-                BuiltinType.f64.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
-                BuiltinType.eq.value
-            ],
-
-            BuiltinType.string.value: [
-                BuiltinType.string.value, BuiltinType.convertible_to_string.value,
-                BuiltinType.object_.value, BuiltinType.eq.value
-            ],
-            BuiltinType.bool.value: [
-                BuiltinType.bool.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
-                BuiltinType.eq.value
-            ],
-            BuiltinType.char.value: [
-                BuiltinType.char.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
-                BuiltinType.eq.value
-            ],
-            BuiltinType.void.value: [BuiltinType.void.value],
-            BuiltinType.arithmetic_object.value: [
-                BuiltinType.addable.value, BuiltinType.subtractable.value, BuiltinType.multipliable.value,
-                BuiltinType.divisible.value, BuiltinType.object_.value
-            ],
-            BuiltinType.eq.value: [BuiltinType.object_.value]
-        }[self.value]
+        return BUILTIN_SUPERTYPES[self._value_]
+
+    def is_builtin_subtype(self, supertype: "BuiltinType") -> bool:
+        """Same as supertype.value in self.get_builtin_supertypes(), but a single bit test."""
+        supertype_bits = self._supertype_bits
+        if supertype_bits is None:
+            raise KeyError(self._value_)
+        return bool(supertype_bits & supertype._bit)
 
     def to_code(self, indentation_level: int = 0) -> str:
         return self.value
 
 
+# The builtin type lattice, computed once. Every builtin type has a bit (BuiltinType._bit) and the types that have
+# builtin supertypes also have the mask of the bits of all of them (BuiltinType._supertype_bits), so checks for
+# subtypes and kinds of builtin types are bit operations.
+BUILTIN_SUPERTYPES: t.Dict[str, t.List[str]] = {
+    BuiltinType.i8.value: [
+        BuiltinType.i8.value, BuiltinType.i16.value, BuiltinType.i32.value, BuiltinType.i64.value,
+        BuiltinType.convertible_to_string.value, BuiltinType.convertible_to_i8.value,
+        BuiltinType.convertible_to_i16.value, BuiltinType.convertible_to_i32.value,
+        BuiltinType.convertible_to_i64.value,
+        BuiltinType.object_.value, BuiltinType.eq.value
+    ],
+    BuiltinType.i16.value: [
+        BuiltinType.i16.value, BuiltinType.i32.value, BuiltinType.i64.value,
+        BuiltinType.convertible_to_string.value,
+        BuiltinType.convertible_to_i16.value, BuiltinType.convertible_to_i32.value,
+        BuiltinType.convertible_to_i64.value,
+        BuiltinType.object_.value, BuiltinType.eq.value
+    ],
+    BuiltinType.i32.value: [
+        BuiltinType.i32.value, BuiltinType.i64.value, BuiltinType.convertible_to_string.value,
+        BuiltinType.convertible_to_i32.value, BuiltinType.convertible_to_i64.value,
+        BuiltinType.object_.value, BuiltinType.eq.value
+    ],
+    BuiltinType.i64.value: [
+        BuiltinType.i64.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
+        BuiltinType.eq.value, BuiltinType.convertible_to_i64.value,
+    ],
+
+    BuiltinType.int_.value: [
+        BuiltinType.int_.value, BuiltinType.convertible_to_string.value,
+        BuiltinType.object_.value,
+    ],
+
+    BuiltinType.u8.value: [
+        BuiltinType.u8.value, BuiltinType.u16.value, BuiltinType.u32.value, BuiltinType.u64.value,
+        BuiltinType.convertible_to_string.value, BuiltinType.convertible_to_i16.value,
+        BuiltinType.convertible_to_i32.value, BuiltinType.convertible_to_i64.value,
+        BuiltinType.convertible_to_u8.value, BuiltinType.convertible_to_u16.value,
+        BuiltinType.convertible_to_u32.value, BuiltinType.convertible_to_u64.value,
+        BuiltinType.object_.value, BuiltinType.eq.value
+    ],
+    BuiltinType.u16.value: [
+        BuiltinType.u16.value, BuiltinType.u32.value, BuiltinType.u64.value,
+        BuiltinType.convertible_to_string.value, BuiltinType.object_.value, BuiltinType.eq.value,
+        BuiltinType.convertible_to_i32.value, BuiltinType.convertible_to_i64.value,
+        BuiltinType.convertible_to_u16.value,
+        BuiltinType.convertible_to_u32.value, BuiltinType.convertible_to_u64.value,
+    ],
+    BuiltinType.u32.value: [
+        BuiltinType.u32.value, BuiltinType.u64.value, BuiltinType.convertible_to_string.value,
+        BuiltinType.object_.value, BuiltinType.eq.value,
+        BuiltinType.convertible_to_i64.value, BuiltinType.convertible_to_u32.value,
+        BuiltinType.convertible_to_u64.value,
+    ],
+    BuiltinType.u64.value: [
+        BuiltinType.u64.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
+        BuiltinType.eq.value, BuiltinType.convertible_to_u64.value
+    ],
+
+    BuiltinType.f32.value: [
+        BuiltinType.f32.value, BuiltinType.f64.value, BuiltinType.convertible_to_string.value,
+        BuiltinType.object_.value, BuiltinType.eq.value
+    ],
+    BuiltinType.f64.value: [
+        BuiltinType.f64.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
+        BuiltinType.eq.value
+    ],
+
+    BuiltinType.string.value: [
+        BuiltinType.string.value, BuiltinType.convertible_to_string.value,
+        BuiltinType.object_.value, BuiltinType.eq.value
+    ],
+    BuiltinType.bool.value: [
+        BuiltinType.bool.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
+        BuiltinType.eq.value
+    ],
+    BuiltinType.char.value: [
+        BuiltinType.char.value, BuiltinType.convertible_to_string.value, BuiltinType.object_.value,
+        BuiltinType.eq.value
+    ],
+    BuiltinType.void.value: [BuiltinType.void.value],
+    BuiltinType.arithmetic_object.value: [
+        BuiltinType.addable.value, BuiltinType.subtractable.value, BuiltinType.multipliable.value,
+        BuiltinType.divisible.value, BuiltinType.object_.value
+    ],
+    BuiltinType.eq.value: [BuiltinType.object_.value]
+}
+FINITE_SIGNED_INT_TYPES = [type_.value for type_ in (BuiltinType.i8, BuiltinType.i16, BuiltinType.i32, BuiltinType.i64)]
+FINITE_UNSIGNED_INT_TYPES = [
+    type_.value for type_ in (BuiltinType.u8, BuiltinType.u16, BuiltinType.u32, BuiltinType.u64)
+]
+FINITE_INT_TYPES = FINITE_SIGNED_INT_TYPES + FINITE_UNSIGNED_INT_TYPES
+FINITE_FLOAT_TYPES = [BuiltinType.f32.value, BuiltinType.f64.value]
+BUILTIN_INTERFACES = [
+    BuiltinType.addable.value, BuiltinType.subtractable.value, BuiltinType.multipliable.value,
+    BuiltinType.divisible.value, BuiltinType.arithmetic_object.value, BuiltinType.object_.value,
+    BuiltinType.iterable.value, BuiltinType.eq.value,
+    BuiltinType.convertible_to_string.value, BuiltinType.convertible_to_i16.value
+]
+CONVERTIBLE_INTERFACES = {
+    BuiltinType.string.value: BuiltinType.convertible_to_string,
+    BuiltinType.i8.value: BuiltinType.convertible_to_i8,
+    BuiltinType.i16.value: BuiltinType.convertible_to_i16,
+    BuiltinType.i32.value: BuiltinType.convertible_to_i32,
+    BuiltinType.i64.value: BuiltinType.convertible_to_i64,
+    BuiltinType.u8.value: BuiltinType.convertible_to_u8,
+    BuiltinType.u16.value: BuiltinType.convertible_to_u16,
+    BuiltinType.u32.value: BuiltinType.convertible_to_u32,
+    BuiltinType.u64.value: BuiltinType.convertible_to_u64,
+}
+
+for _index, _builtin_type in enumerate(BuiltinType):
+    _builtin_type._bit = 1 << _index
+
+
+def builtin_type_bits(values: t.Iterable[str]) -> int:
+    bits = 0
+    for value in values:
+        bits |= BuiltinType(value)._bit
+    return bits
+
+
+for _builtin_type in BuiltinType:
+    _supertypes = BUILTIN_SUPERTYPES.get(_builtin_type.value)
+    _builtin_type._supertype_bits = None if _supertypes is None else builtin_type_bits(_supertypes)
+INTERFACE_BITS = builtin_type_bits(BUILTIN_INTERFACES)
+FINITE_INT_BITS = builtin_type_bits(FINITE_INT_TYPES)
+FINITE_FLOAT_BITS = builtin_type_bits(FINITE_FLOAT_TYPES)
+del _index, _builtin_type, _supertypes
+
+
 class BuiltinFunc(Expression, enum.Enum):
     print = "print"
     read = "read"
@@ -497,6 +671,7 @@ class SpecialMethods(enum.Enum):
         }[operator.value]
 
 
+@slots
 @dataclass
 class BinaryExpression(Expression):
     left: Expression
@@ -508,6 +683,7 @@ class BinaryExpression(Expression):
         return f"{self.left.to_code()} {self.operator.value} {self.right.to_code()}"
 
 
+@slots
 @dataclass
 class Cast(Expression):
     value: Expression
@@ -518,6 +694,7 @@ class Cast(Expression):
         return f"({self.to_type.to_code()})({self.value.to_code()})"
 
 
+@slots
 @dataclass
 class NamedArgument(Expression):
     name: AssignmentLeft
@@ -536,6 +713,7 @@ class BoolLiteral(Expression, enum.Enum):
         return self.value
 
 
+@slots
 @dataclass
 class IntegerLiteral(Expression):
     value: str
@@ -545,6 +723,7 @@ class IntegerLiteral(Expression):
         return self.value
 
 
+@slots
 @dataclass
 class DecimalLiteral(Expression):
     value: str
@@ -553,6 +732,7 @@ class DecimalLiteral(Expression):
         return self.value
 
 
+@slots
 @dataclass
 class StringLiteral(Expression):
     value: str
@@ -561,6 +741,7 @@ class StringLiteral(Expression):
         return '"' + self.value + '"'
 
 
+@slots
 @dataclass
 class CharLiteral(Expression):
     value: str
@@ -569,6 +750,7 @@ class CharLiteral(Expression):
         return "'" + self.value + "'"
 
 
+@slots
 @dataclass
 class VectorLiteral(Expression):
     elements: t.List[Expression]
@@ -579,9 +761,10 @@ class VectorLiteral(Expression):
 
 
 class DictLiteral(Expression):
+    __slots__ = ("keys", "values", "annotation")
     keys: t.List[Expression]
     values: t.List[Expression]
-    annotation: t.Optional[Type] = None
+    annotation: t.Optional[Type]
 
     def __init__(self, keys, values, annotation=None):
         self.keys = keys
@@ -595,6 +778,7 @@ class DictLiteral(Expression):
         return "[" + ', '.join(element for element in inner) + "]"
 
 
+@slots
 @dataclass
 class InitCall(Node):
     arguments: t.List[Expression]
@@ -604,6 +788,7 @@ class InitCall(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class FunctionCall(Node, Expression):
     function_path: Expression
@@ -615,6 +800,7 @@ class FunctionCall(Node, Expression):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class MethodCall(Node, Expression):
     line: int
@@ -633,12 +819,14 @@ class MethodCall(Node, Expression):
         self.method = method
         self.arguments = arguments
         self.instance_type = instance_type
+        self.is_algebraic_method = is_algebraic_method
 
     def to_code(self, indentation_level: int = 0) -> str:
         method = self.method.to_code()
         return f"{self.instance_path.to_code()}.{method}({', '.join(arg.to_code() for arg in self.arguments)})"
 
 
+@slots
 @dataclass
 class Assignment(Node):
     left: AssignmentLeft
@@ -650,6 +838,7 @@ class Assignment(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class Decl(Node, Expression):
     decl_type: DeclType
@@ -681,12 +870,14 @@ class Decl(Node, Expression):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class Break(Node):
     def to_code(self, indentation_level: int = 0) -> str:
         return INDENTATION * indentation_level + "break"
 
 
+@slots
 @dataclass
 class For(Node):
     element: Name
@@ -700,6 +891,7 @@ class For(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class While(Node):
     condition: Expression
@@ -711,6 +903,7 @@ class While(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class If(Node):
     condition: Expression
@@ -738,6 +931,7 @@ class If(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class Return(Node):
     value: Expression
@@ -747,6 +941,7 @@ class Return(Node):
 
 
 class Argument:
+    __slots__ = ("name", "type", "value")
     name: Name
     type: Type
     value: t.Optional[Expression]
@@ -765,8 +960,9 @@ class Argument:
         return f"{self.name.to_code()}: {self.type.to_code()}"
 
 
-@dataclass
-class GenericType(Type):
+@slots
+@dataclass(eq=False)
+class GenericType(InternedType):
     name: t.Union[Name, BuiltinType]
     parameters: t.List[Type]
 
@@ -780,21 +976,24 @@ Interface = t.Union[Name, BuiltinType, GenericType]
 Interfaces = t.List[Interface]
 
 
+@slots
 @dataclass
 class FunctionType(Type):
     parameters: Parameters
     arguments: Arguments
     return_type: Type
     where_clauses: t.List[Expression] = field(default_factory=list)
-    saved_environment: t.List[t.Dict[str, t.Any]] = field(default_factory=list)
+    # environment.Scope (saved by Environment.save), Any because of circular imports
+    saved_environment: t.Any = None
     is_algebraic_method: bool = False
 
     def to_code(self, indentation_level: int = 0) -> str:
         return f"({', '.join(arg.to_code() for arg in self.arguments)}) -> {self.return_type.to_code()}"
 
 
-@dataclass
-class StructType(Type):
+@slots
+@dataclass(eq=False)
+class StructType(InternedType):
     name: Name
     parameters: t.List[Type]
 
@@ -802,8 +1001,9 @@ class StructType(Type):
         return f"StructType({self.name.to_code()}, parameters={[param.to_code() for param in self.parameters]})"
 
 
-@dataclass
-class AlgebraicType(Type):
+@slots
+@dataclass(eq=False)
+class AlgebraicType(InternedType):
     base: Name
     parameters: t.List[Type]
     constructor: t.Optional[Name] = None
@@ -860,6 +1060,7 @@ class DictFields(enum.Enum):
         }[self.value]
 
 
+@slots
 @dataclass
 class FunctionDeclaration(Node):
     name: Name
@@ -878,6 +1079,7 @@ class FunctionDeclaration(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class MethodDeclaration(Node):
     name: Name
@@ -900,6 +1102,7 @@ class MethodDeclaration(Node):
         return INDENTATION * indentation_level + code
 
 
+@slots
 @dataclass
 class FieldDeclaration(Node):
     name: Name
@@ -912,6 +1115,7 @@ class FieldDeclaration(Node):
         return f"{self.name.to_code()}: {self.type.to_code()}"
 
 
+@slots
 @dataclass
 class InitDeclaration(Node):
     arguments: Arguments
@@ -922,6 +1126,7 @@ class InitDeclaration(Node):
         return INDENTATION * indentation_level + f"init({', '.join(arg.to_code() for arg in self.arguments)}):\n{body}"
 
 
+@slots
 @dataclass
 class DeclaredFields:
     private: t.List[FieldDeclaration] = field(default_factory=list)
@@ -935,6 +1140,7 @@ class DeclaredFields:
         return '\n'.join(node.to_code(indentation_level) for node in self.all)
 
 
+@slots
 @dataclass
 class DeclaredMethods:
     private: t.List[MethodDeclaration] = field(default_factory=list)
@@ -954,6 +1160,7 @@ class DeclaredMethods:
         self.special += methods.special
 
 
+@slots
 @dataclass
 class StructDeclaration(Node):
     name: Name
@@ -985,6 +1192,7 @@ class StructDeclaration(Node):
         return INDENTATION * indentation_level + f"struct {self.name.to_code()}{parameters}{interfaces}:\n{body}"
 
 
+@slots
 @dataclass
 class ExtensionDeclaration(Node):
     name: Name
@@ -1019,6 +1227,7 @@ class ExtensionDeclaration(Node):
         )
 
 
+@slots
 @dataclass
 class AlgebraicDeclaration(Node):
     name: Name
@@ -1037,6 +1246,7 @@ class AlgebraicDeclaration(Node):
         return INDENTATION * indentation_level + f"algebraic {self.name.to_code()}{parameters}:\n{body}"
 
 
+@slots
 @dataclass
 class InterfaceDeclaration(Node):
     name: Name
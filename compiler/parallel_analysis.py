@@ -0,0 +1,104 @@
+"""Transfer of function bodies analyzed in worker processes back to the main process (see Analyzer.analyze_ast).
+
+A worker gets saved environments (see Environment.save) and returns the analyzed bodies together with the template
+types it created. Both go through pickle, so the worker refers to scopes of the saved environments it got by their
+numbers (see saved_scopes) and the main process puts its own scopes in their place: types in the bodies keep
+pointing to the environments of the main process. Template types of the worker are numbered from 0, they are
+renumbered to follow the template types of the main process while being unpickled.
+
+"""
+import io
+import pickle
+import typing as t
+
+from . import nodes, environment_entries as entries
+from .environment import Scope
+from .templates import TemplateTypes
+from .visitors import walk
+
+
+def referenced_names(node: t.Any) -> t.Set[str]:
+    """Return members of all names in the (clarified) node, including names of its own declarations."""
+    return {value.member for value in walk(node) if isinstance(value, nodes.Name)}
+
+
+def saved_scopes(saved: t.List[Scope]) -> t.List[Scope]:
+    """Return scopes reachable from the saved environments and from the entries bound in them, in a fixed order.
+
+    The order depends only on the structure of the environments, so it is the same for unpickled copies.
+
+    """
+    scopes: t.List[Scope] = []
+    seen: t.Set[int] = set()
+    stack: t.List[t.Any] = list(reversed(saved))
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        if isinstance(value, Scope):
+            seen.add(id(value))
+            scopes.append(value)
+            stack.append(value.parent)
+            stack.extend(entry for bindings in value.bindings.values() for _, entry in bindings)
+        elif isinstance(value, entries.Entry):
+            seen.add(id(value))
+            stack.extend(getattr(value, name) for name in nodes.node_fields(type(value)))
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, tuple):
+            stack.extend(value)
+    return scopes
+
+
+class _ResultPickler(pickle.Pickler):
+    def __init__(self, file: t.BinaryIO, scopes: t.List[Scope]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.scope_numbers = {id(scope): number for number, scope in enumerate(scopes)}
+
+    def persistent_id(self, obj: t.Any) -> t.Optional[int]:
+        if isinstance(obj, Scope):
+            return self.scope_numbers.get(id(obj))
+        return None
+
+
+class _ResultUnpickler(pickle.Unpickler):
+    def __init__(self, file: t.BinaryIO, scopes: t.List[Scope], offset: int):
+        super().__init__(file)
+        self.scopes = scopes
+        self.offset = offset
+
+    def persistent_load(self, pid: t.Any) -> Scope:
+        return self.scopes[pid]
+
+    def find_class(self, module: str, name: str) -> t.Any:
+        if module == nodes.__name__ and name == nodes.TemplateType.__name__:
+            return self.template_type
+        return super().find_class(module, name)
+
+    def template_type(self, id_: int) -> nodes.TemplateType:
+        return nodes.TemplateType(id_ + self.offset)
+
+
+def dump_results(bodies: t.List[t.Optional[nodes.AST]], template_types: TemplateTypes, saved: t.List[Scope]) -> bytes:
+    """Pickle bodies analyzed in a worker on top of the saved environments and the template types they use."""
+    file = io.BytesIO()
+    _ResultPickler(file, saved_scopes(saved)).dump(
+        (bodies, template_types.parents, template_types.sizes, template_types.types)
+    )
+    return file.getvalue()
+
+
+def load_results(
+    data: bytes, template_types: TemplateTypes, saved: t.List[Scope]
+) -> t.List[t.Optional[nodes.AST]]:
+    """Unpickle results of dump_results, adding their template types to template_types.
+
+    saved are the environments of the main process the worker got copies of, in the same order.
+
+    """
+    offset = len(template_types)
+    bodies, parents, sizes, types = _ResultUnpickler(io.BytesIO(data), saved_scopes(saved), offset).load()
+    template_types.parents.extend(parent + offset for parent in parents)
+    template_types.sizes.extend(sizes)
+    template_types.types.extend(types)
+    return bodies
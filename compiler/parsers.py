@@ -1,22 +1,28 @@
 import re
+import sys
 import typing as t
+from bisect import bisect_right
+from collections import Counter, OrderedDict
 from dataclasses import dataclass
-from itertools import zip_longest
+from functools import wraps
 
-from . import nodes, errors
+from . import nodes, errors, lexer
 from .enums import DeclType
+from .lexer import IDENTIFIER_REGEX, INTEGER_REGEX
+from .visitors import walk
 
 
-IDENTIFIER_REGEX = re.compile("[_]?[_]?[a-zA-Z][a-zA-Z0-9]*(?:__)?")
-INTEGER_REGEX = re.compile("[0-9]+")
+WHITESPACE_REGEX = re.compile(r"\s*")
+NON_WHITESPACE_REGEX = re.compile(r"\S")
+PACKRAT_CACHE_SIZE = 4096
 
 
+# The higher the priority, the tighter the operator binds. Operators with equal priority are left associative.
 OPERATOR_PRIORITY = {
-    nodes.Operator.add.value: 1,
-    nodes.Operator.sub.value: 1,
+    nodes.Operator.and_.value: 1,
+    nodes.Operator.or_.value: 1,
 
-    nodes.Operator.mul.value: 2,
-    nodes.Operator.div.value: 2,
+    nodes.Operator.is_.value: 2,
 
     nodes.Operator.eq_eq.value: 3,
     nodes.Operator.neq.value: 3,
@@ -25,83 +31,30 @@ OPERATOR_PRIORITY = {
     nodes.Operator.lt.value: 3,
     nodes.Operator.gt.value: 3,
 
-    nodes.Operator.and_.value: 2,
-    nodes.Operator.or_.value: 2,
+    nodes.Operator.add.value: 4,
+    nodes.Operator.sub.value: 4,
 
-    nodes.Operator.is_.value: 4,
+    nodes.Operator.mul.value: 5,
+    nodes.Operator.div.value: 5,
 }
+# Order matters: an operator must be tried before operators that are its prefixes ('<=' before '<').
+BINARY_OPERATORS = [
+    nodes.Operator.mul, nodes.Operator.div, nodes.Operator.sub, nodes.Operator.add
+] + nodes.Operator.comparison_operators() + nodes.Operator.higher_order_boolean_operators()
 
 
-def build_binary_expression(
-        left: nodes.Expression, operator: nodes.Operator, right: nodes.Expression
-) -> nodes.BinaryExpression:
-    op_priority = OPERATOR_PRIORITY[operator.value]
-    if isinstance(left, nodes.BinaryExpression) and isinstance(right, nodes.BinaryExpression):
-        # a + b, +, c + d
-        # a * b, +, c + d
-        # a + c, *, c ** d
-        left_priority = OPERATOR_PRIORITY[left.operator.value]
-        right_priority = OPERATOR_PRIORITY[right.operator.value]
-        if left_priority >= op_priority and right_priority > op_priority:
-            # (a * b) + (c * d)
-            # (a + b) + (c * d)
-            return nodes.BinaryExpression(left, operator, right)
-        elif left_priority >= op_priority >= right_priority:
-            # ((a + b) + c) + d
-            # ((a * b) + c) + d
-            # ((a ** b) * c) + d
-            return nodes.BinaryExpression(
-                nodes.BinaryExpression(left, operator, right.left), right.operator, right.right
-            )
-        elif left_priority < op_priority and right_priority == op_priority:
-            # a + ((b * c) * d)
-            return nodes.BinaryExpression(
-                left.left, left.operator, nodes.BinaryExpression(
-                    nodes.BinaryExpression(left.right, operator, right.left),
-                    right.operator, right.right
-                )
-            )
-        elif left_priority < op_priority < right_priority:
-            # a + (b * (c ** d))
-            return nodes.BinaryExpression(
-                left.left, left.operator, nodes.BinaryExpression(left.right, operator, right)
-            )
-        elif left_priority < op_priority and right_priority < op_priority:
-            # (a + (b * c)) + d
-            return nodes.BinaryExpression(
-                nodes.BinaryExpression(
-                    left.left, left.operator, nodes.BinaryExpression(left.right, operator, right.left)
-                ), right.operator, right.right
-            )
-        else:
-            assert 0, "UNKNOWN CASE"
-    elif isinstance(left, nodes.BinaryExpression):
-        left_priority = OPERATOR_PRIORITY[left.operator.value]
-        if left_priority < op_priority:
-            # a + (b * c)
-            return nodes.BinaryExpression(
-                left.left, left.operator, nodes.BinaryExpression(left.right, operator, right)
-            )
-        elif left_priority >= op_priority:
-            # (a + b) + c
-            return nodes.BinaryExpression(left, operator, right)
-        else:
-            assert 0, "UNKNOWN CASE"
-    elif isinstance(right, nodes.BinaryExpression):
-        right_priority = OPERATOR_PRIORITY[right.operator.value]
-        if op_priority < right_priority:
-            # a + (b * c)
-            return nodes.BinaryExpression(left, operator, right)
-        elif op_priority >= right_priority:
-            # (a + b) + c
-            return nodes.BinaryExpression(
-                nodes.BinaryExpression(left, operator, right.left),
-                right.operator, right.right
-            )
-        else:
-            assert 0, "UNKNOWN  CASE"
-    else:
-        return nodes.BinaryExpression(left, operator, right)
+def shift_lines(ast: t.Any, delta: int) -> None:
+    """Add delta to line of every node in the parsed (not yet clarified) AST, in place."""
+    if not delta:
+        return
+    for node in walk(ast):
+        if "line" in nodes.node_fields(type(node)):
+            node.line += delta
+
+
+def imported_modules(ast: t.Any) -> t.List[str]:
+    """Return names of the modules the parsed (not yet clarified) AST refers to (module#name), in source order."""
+    return list(dict.fromkeys(node.module for node in walk(ast) if isinstance(node, nodes.Name) and node.module))
 
 
 @dataclass
@@ -143,21 +96,57 @@ class NamedArgumentTrailer(Trailer):
     value: nodes.Expression
 
 
-@dataclass
-class State:
-    idx: int
-    position: nodes.Position
+# Parser state is just the offset in the code: lines and columns are computed from it on demand.
+State = int
+
+
+def packrat_rule(rule):
+    """Memoize result of the rule by the offset it started at, if the parser is in packrat mode.
+
+    Only rules that do not depend on anything but the offset (indentation level, statement parsers of the current
+    body) can be memoized.
+
+    """
+    @wraps(rule)
+    def wrapper(self: 'Parser'):
+        if not self.packrat:
+            return rule(self)
+        key = (rule.__name__, self.idx)
+        cached = self.packrat_cache.get(key)
+        if cached is not None:
+            self.packrat_cache.move_to_end(key)
+            self.packrat_hits[rule.__name__] += 1
+            result, self.idx = cached
+            return result
+        result = rule(self)
+        self.packrat_cache[key] = (result, self.idx)
+        if len(self.packrat_cache) > self.packrat_cache_size:
+            self.packrat_cache.popitem(last=False)
+        return result
+    return wrapper
 
 
 class Parser:
     code: str
     code_lines: t.List[str]
+    tokens: lexer.Tokens
+    line_starts: t.List[int]
     idx: int
     indentation_level: int
-    position: nodes.Position
     additional_statement_parsers: t.List[t.Callable[[], t.Optional[nodes.Node]]]
+    packrat_cache: t.Dict[t.Tuple[str, int], t.Tuple[t.Any, int]]
+
+    def __init__(self, packrat: bool = False, packrat_cache_size: int = PACKRAT_CACHE_SIZE):
+        """In packrat mode results of some rules are memoized, so backtracking does not re-parse the same code.
 
-    def __init__(self):
+        The cache holds at most packrat_cache_size results and is dropped after every top level statement.
+        packrat_hits counts cache hits per rule.
+
+        """
+        self.packrat = packrat
+        self.packrat_cache_size = packrat_cache_size
+        self.packrat_cache = OrderedDict()
+        self.packrat_hits: t.Counter[str] = Counter()
         self.base_body_parsers = [
             self.parse_constant_declaration, self.parse_variable_declaration,
             self.parse_while_statement, self.parse_for_statement, self.parse_if_statement,
@@ -165,33 +154,95 @@ class Parser:
         ]
 
     def parse(self, string: str) -> nodes.AST:
+        return list(self.iter_parse(string))
+
+    def iter_parse(self, string: str) -> t.Iterator[nodes.Node]:
+        """Parse code, yielding every top level statement as soon as it is parsed.
+
+        The parser must not be used for anything else until the iterator is exhausted.
+
+        """
         self.code = string
         self.code_lines = string.split("\n")
+        self.tokens = lexer.tokenize(string)
+        self.line_starts = lexer.line_starts(string)
         self.idx = 0
         self.indentation_level = 0
-        self.position = nodes.Position()
         self.additional_statement_parsers = []
+        self.packrat_cache.clear()
 
-        result = []
         self.spaces()
         node = self.parse_node()
         while node is not None:
-            result.append(node)
+            yield node
+            self.packrat_cache.clear()
             self.spaces()
             node = self.parse_node()
         if not self.is_eof():
             raise errors.AngelSyntaxError("expected a statement", self.get_code())
-        return result
+
+    def reparse(self, ast: nodes.AST, offset: int, removed_length: int, inserted_text: str) -> nodes.AST:
+        """Apply an edit to the code of the previous parse and re-parse only top level statements it touches.
+
+        ast must be the result of the previous parse (or reparse) call. Statements before the edit are reused as is,
+        statements after it have their lines shifted. Falls back to parsing the whole code when the re-parsed
+        statements spill over into the following ones.
+
+        """
+        old_code = self.code
+        code = old_code[:offset] + inserted_text + old_code[offset + removed_length:]
+        old_line_starts = lexer.line_starts(old_code)
+        starts = [old_line_starts[node.line - 1] for node in ast]
+        edit_end = offset + removed_length
+
+        first = bisect_right(starts, offset) - 1
+        if first >= 0 and not old_code[starts[first]:offset].strip():
+            # Edit at the beginning of a statement can as well continue the body of the previous one.
+            first -= 1
+        last = max(bisect_right(starts, edit_end) - 1, first)
+        region_start = starts[first] if first >= 0 else 0
+        if last + 1 < len(ast):
+            region_end = starts[last + 1] + len(inserted_text) - removed_length
+        else:
+            region_end = len(code)
+
+        self.code = code
+        self.code_lines = code.split("\n")
+        self.tokens = lexer.tokenize(code, region_start, region_end)
+        self.line_starts = lexer.line_starts(code)
+        self.idx = region_start
+        self.indentation_level = 0
+        self.additional_statement_parsers = []
+        self.packrat_cache.clear()
+
+        reparsed = []
+        self.spaces()
+        while self.idx < region_end:
+            node = self.parse_node()
+            if node is None:
+                raise errors.AngelSyntaxError("expected a statement", self.get_code())
+            reparsed.append(node)
+            self.packrat_cache.clear()
+            self.spaces()
+        spilled_over = self.idx != region_end or (
+            reparsed and isinstance(reparsed[-1], nodes.If) and code.startswith(("elif", "else"), region_end)
+        )
+        if spilled_over:
+            return self.parse(code)
+
+        rest = ast[last + 1:]
+        shift_lines(rest, inserted_text.count("\n") - old_code.count("\n", offset, edit_end))
+        return ast[:max(first, 0)] + reparsed + rest
 
     def parse_variable_declaration(self) -> t.Optional[nodes.Decl]:
-        line = self.position.line
+        line = self.line
         if not self.parse_keyword("var"):
             return None
         name, type_, value = self.parse_constant_and_variable_common()
         return nodes.Decl(line, DeclType.variable, name, type_, value)
 
     def parse_constant_declaration(self) -> t.Optional[nodes.Decl]:
-        line = self.position.line
+        line = self.line
         if not self.parse_keyword("let"):
             return None
         name, type_, value = self.parse_constant_and_variable_common()
@@ -243,7 +294,7 @@ class Parser:
 
     def parse_assignment(self) -> t.Optional[nodes.Assignment]:
         state = self.backup_state()
-        line = self.position.line
+        line = self.line
         left = self.parse_assignment_left()
         if left is None:
             return None
@@ -261,7 +312,7 @@ class Parser:
         return nodes.Assignment(line, left, operator, right)
 
     def parse_for_statement(self) -> t.Optional[nodes.For]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("for"):
             return None
         self.spaces()
@@ -289,7 +340,7 @@ class Parser:
         return body
 
     def parse_while_statement(self) -> t.Optional[nodes.While]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("while"):
             return None
         self.spaces()
@@ -308,7 +359,7 @@ class Parser:
         return condition, body
 
     def parse_if_statement(self) -> t.Optional[nodes.If]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("if"):
             return None
         condition, body = self._parse_conditional_common()
@@ -342,7 +393,7 @@ class Parser:
             return condition
 
     def parse_init_call(self) -> t.Optional[nodes.Node]:
-        line = self.position.line
+        line = self.line
         state = self.backup_state()
         if not self.parse_raw('init'):
             return None
@@ -354,7 +405,7 @@ class Parser:
         return nodes.InitCall(line, arguments)
 
     def parse_init_declaration(self) -> t.Optional[nodes.InitDeclaration]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("init"):
             return None
         arguments: t.Optional[nodes.Arguments] = self.parse_container(
@@ -371,7 +422,7 @@ class Parser:
         return nodes.InitDeclaration(line, arguments, body)
 
     def parse_function_declaration(self) -> t.Optional[nodes.FunctionDeclaration]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("fun"):
             return None
         self.spaces()
@@ -407,7 +458,7 @@ class Parser:
         return nodes.FunctionDeclaration(line, name, parameters, arguments, return_type, where_clause, body)
 
     def parse_return_statement(self) -> t.Optional[nodes.Return]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("return"):
             return None
         self.spaces()
@@ -417,13 +468,13 @@ class Parser:
         return nodes.Return(line, value)
 
     def parse_break(self) -> t.Optional[nodes.Break]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("break"):
             return None
         return nodes.Break(line)
 
     def parse_field_declaration(self) -> t.Optional[nodes.FieldDeclaration]:
-        line = self.position.line
+        line = self.line
         state = self.backup_state()
         name = self.parse_name()
         if name is None:
@@ -473,7 +524,7 @@ class Parser:
         return name, parameters, interfaces
 
     def parse_struct_declaration(self) -> t.Optional[nodes.StructDeclaration]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("struct"):
             return None
         name, parameters, interfaces = self._parse_struct_common()
@@ -491,7 +542,7 @@ class Parser:
         return self.make_struct_declaration(line, name, parameters, interfaces, body)
 
     def parse_extension_declaration(self) -> t.Optional[nodes.ExtensionDeclaration]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("extension"):
             return None
         name, parameters, interfaces = self._parse_struct_common()
@@ -527,7 +578,7 @@ class Parser:
         return body
 
     def parse_algebraic_declaration(self) -> t.Optional[nodes.AlgebraicDeclaration]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("algebraic"):
             return None
         self.spaces()
@@ -541,7 +592,7 @@ class Parser:
         return self.make_algebraic_declaration(line, name, parameters, body)
 
     def parse_interface_declaration(self) -> t.Optional[nodes.InterfaceDeclaration]:
-        line = self.position.line
+        line = self.line
         if not self.parse_raw("interface"):
             return None
         self.spaces()
@@ -666,22 +717,17 @@ class Parser:
         return result
 
     def parse_indentation(self) -> bool:
-        result = []
-        for char in self.code[self.idx:]:
-            if char == "\n":
-                result.append(char)
-                self.idx += 1
-                self.position.line += 1
-                self.position.column = 1
-            elif char.isspace():
-                result.append(char)
-                self.idx += 1
-                self.position.column += 1
-            else:
-                break
-
+        """Move to the next token, return whether its line is indented to at least the current indentation level."""
+        token_idx = self.tokens.skip_trivia(self.idx)
+        if token_idx is not None:
+            self.idx = self.tokens.offsets[token_idx]
+            return self.tokens.line_level(token_idx) >= self.indentation_level
+        start = self.idx
+        end = WHITESPACE_REGEX.match(self.code, start).end()
+        self.idx = end
         expected_indentation = nodes.INDENTATION * self.indentation_level
-        return ''.join(result).endswith(expected_indentation)
+        indentation_start = end - len(expected_indentation)
+        return indentation_start >= start and self.code.startswith(expected_indentation, indentation_start)
 
     def parse_argument(self) -> t.Optional[nodes.Argument]:
         name = self.parse_name()
@@ -695,6 +741,7 @@ class Parser:
             raise errors.AngelSyntaxError("expected type", self.get_code())
         return nodes.Argument(name, type_)
 
+    @packrat_rule
     def parse_assignment_left(self) -> t.Optional[nodes.AssignmentLeft]:
         state = self.backup_state()
         atom: t.Optional[nodes.Expression] = self.parse_name()
@@ -761,7 +808,7 @@ class Parser:
         return None
 
     def is_eof(self) -> bool:
-        return self.code[self.idx:] == ""
+        return self.idx >= len(self.code)
 
     def parse_parent_interface(self) -> t.Optional[nodes.Interface]:
         raw = self.parse_type()
@@ -770,6 +817,7 @@ class Parser:
         assert isinstance(raw, (nodes.Name, nodes.GenericType))
         return raw
 
+    @packrat_rule
     def parse_type(self) -> t.Optional[nodes.Type]:
         inner_type = self.parse_type_atom_with_prefixes()
         if inner_type is None:
@@ -788,10 +836,10 @@ class Parser:
 
     def parse_type_trailer(self) -> t.Optional[Trailer]:
         if self.parse_raw("?"):
-            return OptionalTypeTrailer(self.position.line)
+            return OptionalTypeTrailer(self.line)
         parameters = self.parse_container('<', '>', ',', element_parser=self.parse_type)
         if parameters:
-            return GenericTypeTrailer(self.position.line, parameters)
+            return GenericTypeTrailer(self.line, parameters)
         return None
 
     def parse_type_atom_with_prefixes(self) -> t.Optional[nodes.Type]:
@@ -828,51 +876,54 @@ class Parser:
             raise errors.AngelSyntaxError("expected ']'", self.get_code())
         return nodes.VectorType(subtype)
 
-    def parse_binary_expression(self, left_parser, operators, right_parser) -> t.Optional[nodes.Expression]:
-        left = left_parser()
-        if left is None:
-            return None
-        state = self.backup_state()
-        self.spaces()
-        got_op = None
-        for operator in operators:
-            if self.parse_raw(operator.value):
-                got_op = operator
-                break
-        if got_op is None:
-            self.restore_state(state)
-            return left
-        self.spaces()
-        right = right_parser()
-        if right is None:
-            raise errors.AngelSyntaxError("expected expression", self.get_code())
-        return build_binary_expression(left, got_op, right)
-
+    @packrat_rule
     def parse_expression(self) -> t.Optional[nodes.Expression]:
-        return self.parse_boolean_expression()
+        return self.parse_binary_expression()
 
-    def parse_boolean_expression(self) -> t.Optional[nodes.Expression]:
-        return self.parse_binary_expression(
-            self.parse_expression_comparison, nodes.Operator.higher_order_boolean_operators(),
-            self.parse_boolean_expression
-        )
+    def parse_binary_expression(self) -> t.Optional[nodes.Expression]:
+        """Parse operands separated by binary operators, respecting OPERATOR_PRIORITY.
 
-    def parse_expression_comparison(self) -> t.Optional[nodes.Expression]:
-        return self.parse_binary_expression(
-            self.parse_expression_subexpression, nodes.Operator.comparison_operators(), self.parse_expression_comparison
-        )
+        Operator precedence parsing with explicit stacks: every BinaryExpression is built once, as soon as both its
+        operands are known, and there is no recursion, so long chains do not hit the recursion limit.
 
-    def parse_expression_subexpression(self) -> t.Optional[nodes.Expression]:
-        return self.parse_binary_expression(
-            self.parse_expression_term, (nodes.Operator.sub, nodes.Operator.add), self.parse_expression_subexpression
-        )
+        """
+        operand = self.parse_expression_atom_with_trailers()
+        if operand is None:
+            return None
+        operands: t.List[nodes.Expression] = [operand]
+        operators: t.List[nodes.Operator] = []
 
-    def parse_expression_term(self) -> t.Optional[nodes.Expression]:
-        return self.parse_binary_expression(
-            self.parse_expression_atom_with_trailers, (nodes.Operator.mul, nodes.Operator.div),
-            self.parse_expression_term
-        )
+        def reduce() -> None:
+            right = operands.pop()
+            operands[-1] = nodes.BinaryExpression(operands[-1], operators.pop(), right)
 
+        while True:
+            state = self.backup_state()
+            self.spaces()
+            operator = self.parse_binary_operator()
+            if operator is None:
+                self.restore_state(state)
+                break
+            self.spaces()
+            operand = self.parse_expression_atom_with_trailers()
+            if operand is None:
+                raise errors.AngelSyntaxError("expected expression", self.get_code())
+            priority = OPERATOR_PRIORITY[operator.value]
+            while operators and OPERATOR_PRIORITY[operators[-1].value] >= priority:
+                reduce()
+            operators.append(operator)
+            operands.append(operand)
+        while operators:
+            reduce()
+        return operands[0]
+
+    def parse_binary_operator(self) -> t.Optional[nodes.Operator]:
+        for operator in BINARY_OPERATORS:
+            if self.parse_raw(operator.value):
+                return operator
+        return None
+
+    @packrat_rule
     def parse_expression_atom_with_trailers(self) -> t.Optional[nodes.Expression]:
         atom = self.parse_expression_atom_with_prefixes()
         if atom is None:
@@ -924,8 +975,9 @@ class Parser:
                 return result
         return None
 
+    @packrat_rule
     def parse_trailer(self) -> t.Optional[Trailer]:
-        line = self.position.line
+        line = self.line
         state = self.backup_state()
         arguments = self.parse_container(
             open_container="(", close_container=")", element_separator=",", element_parser=self.parse_expression)
@@ -1019,26 +1071,24 @@ class Parser:
         minuses = []
         while unary_operators and self.parse_raw("-"):
             minuses.append("-")
-        match = INTEGER_REGEX.match(self.code[self.idx:])
-        if match is None:
-            self.restore_state(state)
-            return None
-        match_length = len(match[0])
-        self.idx += match_length
-        self.position.column += match_length
-        return nodes.IntegerLiteral("".join(minuses) + match[0])
+        end = self.tokens.end_of(self.idx, lexer.TokenKind.integer)
+        if end is None:
+            match = INTEGER_REGEX.match(self.code, self.idx)
+            if match is None:
+                self.restore_state(state)
+                return None
+            end = match.end()
+        value = self.code[self.idx:end]
+        self.idx = end
+        return nodes.IntegerLiteral("".join(minuses) + value)
 
     def parse_char_literal(self) -> t.Optional[nodes.CharLiteral]:
         if not self.parse_raw("'"):
             return None
-        char = None
-        for c in self.code[self.idx:]:
-            char = c
-            self.idx += 1
-            self.position.column += 1
-            break
-        if char is None:
+        if self.is_eof():
             raise errors.AngelSyntaxError("expected exactly one character", self.get_code())
+        char = self.code[self.idx]
+        self.idx += 1
         if not self.parse_raw("'"):
             raise errors.AngelSyntaxError('expected "\'"', self.get_code())
         return nodes.CharLiteral(char)
@@ -1046,19 +1096,12 @@ class Parser:
     def parse_string_literal(self) -> t.Optional[nodes.StringLiteral]:
         if not self.parse_raw('"'):
             return None
-        result = []
-        end_quote_seen = False
-        for char in self.code[self.idx:]:
-            self.idx += 1
-            self.position.column += 1
-            if char == '"':
-                end_quote_seen = True
-                break
-            else:
-                result.append(char)
-        if end_quote_seen:
-            return nodes.StringLiteral("".join(result))
-        raise errors.AngelSyntaxError("expected '\"'", self.get_code())
+        end = self.code.find('"', self.idx)
+        if end == -1:
+            raise errors.AngelSyntaxError("expected '\"'", self.get_code())
+        value = self.code[self.idx:end]
+        self.idx = end + 1
+        return nodes.StringLiteral(value)
 
     def parse_name(self) -> t.Optional[nodes.Name]:
         identifier = self.parse_identifier()
@@ -1072,31 +1115,41 @@ class Parser:
         return None
 
     def parse_identifier(self) -> str:
-        match = IDENTIFIER_REGEX.match(self.code[self.idx:])
-        if match is None:
-            return ""
-        match_length = len(match[0])
-        self.idx += match_length
-        self.position.column += match_length
-        return match[0]
+        end = self.tokens.end_of(self.idx, lexer.TokenKind.name)
+        if end is None:
+            match = IDENTIFIER_REGEX.match(self.code, self.idx)
+            if match is None:
+                return ""
+            end = match.end()
+        # Interned, so equal identifiers are the same object and comparing them (e.g. in environment lookups) is cheap.
+        identifier = sys.intern(self.code[self.idx:end])
+        self.idx = end
+        return identifier
 
     def spaces(self) -> None:
+        if self.is_eof():
+            return
+        char = self.code[self.idx]
+        if not char.isspace() and char != "/":
+            return
+        token_idx = self.tokens.skip_trivia(self.idx)
+        if token_idx is not None:
+            # Jump over whitespace and comments straight to the next token.
+            self.idx = self.tokens.offsets[token_idx]
+            return
         prepared_for_line_comment = False
         in_line_comment = False
         state = self.backup_state()
-        for char in self.code[self.idx:]:
+        while not self.is_eof():
+            char = self.code[self.idx]
             if char == "\n":
                 in_line_comment = False
                 self.idx += 1
-                self.position.line += 1
-                self.position.column = 1
             elif char.isspace():
                 self.idx += 1
-                self.position.column += 1
             elif char == "/":
                 state = self.backup_state()
                 self.idx += 1
-                self.position.column += 1
                 if in_line_comment:
                     continue
                 if prepared_for_line_comment:
@@ -1106,7 +1159,6 @@ class Parser:
                     prepared_for_line_comment = True
             elif in_line_comment:
                 self.idx += 1
-                self.position.column += 1
             else:
                 if prepared_for_line_comment:
                     self.restore_state(state)
@@ -1121,36 +1173,44 @@ class Parser:
         return parsed_keyword_as_string
 
     def parse_raw(self, string: str) -> bool:
-        state = self.backup_state()
-        for expected, got in zip_longest(string, self.code[self.idx:]):
-            if expected is None:
-                break
-            elif got is None:
-                return False
-            elif expected != got:
-                return False
-            state.idx += 1
-            state.position.column += 1
-        self.restore_state(state)
+        if not self.code.startswith(string, self.idx):
+            return False
+        # Keywords match whole name tokens only: "for" is not the beginning of "format".
+        token_idx = self.tokens.starts.get(self.idx)
+        if token_idx is not None and self.tokens.ends[token_idx] > self.idx + len(string):
+            return False
+        self.idx += len(string)
         return True
 
     def next_char_isspace(self) -> bool:
         return self.code[self.idx].isspace()
 
     def next_nonspace_char_is(self, expected: str) -> bool:
-        for got in self.code[self.idx:]:
-            if not got.isspace():
-                return expected == got
-        return False
+        token_idx = self.tokens.skip_trivia(self.idx)
+        if token_idx is not None:
+            offset = self.tokens.offsets[token_idx]
+            return self.tokens.kinds[token_idx] != lexer.TokenKind.eof and self.code[offset] == expected
+        match = NON_WHITESPACE_REGEX.search(self.code, self.idx)
+        return match is not None and match[0] == expected
+
+    @property
+    def line(self) -> int:
+        """Number of the line the current offset is on (1-based)."""
+        return bisect_right(self.line_starts, self.idx)
+
+    @property
+    def position(self) -> nodes.Position:
+        line = self.line
+        return nodes.Position(self.idx - self.line_starts[line - 1] + 1, line)
 
     def backup_state(self) -> State:
-        return State(idx=self.idx, position=nodes.Position(self.position.column, self.position.line))
+        return self.idx
 
     def restore_state(self, state: State) -> None:
-        self.idx = state.idx
-        self.position = state.position
+        self.idx = state
 
     def get_code(self, line: t.Optional[int] = None, column: t.Optional[int] = None) -> errors.Code:
         if line is not None:
             return errors.Code(self.code_lines[line - 1], line, column)
-        return errors.Code(self.code_lines[self.position.line - 1], self.position.line, self.position.column)
+        position = self.position
+        return errors.Code(self.code_lines[position.line - 1], position.line, position.column)
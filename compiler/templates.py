@@ -0,0 +1,57 @@
+import typing as t
+
+from . import nodes
+
+
+class TemplateTypes:
+    """Template type variables of a type checker, kept in a union-find structure.
+
+    Variables unified with each other share one representative holding the type they are resolved to (None while
+    unresolved). Representatives are found with path compression and union by size, so reading, resolving and
+    unifying variables takes near-constant time.
+
+    """
+
+    def __init__(self) -> None:
+        self.parents: t.List[int] = []
+        self.sizes: t.List[int] = []
+        self.types: t.List[t.Optional[nodes.Type]] = []
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def __getitem__(self, id_: int) -> t.Optional[nodes.Type]:
+        """Return the type the variable is resolved to, or None."""
+        return self.types[self.find(id_)]
+
+    def new(self) -> int:
+        id_ = len(self.parents)
+        self.parents.append(id_)
+        self.sizes.append(1)
+        self.types.append(None)
+        return id_
+
+    def find(self, id_: int) -> int:
+        root = id_
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[id_] != root:
+            self.parents[id_], id_ = root, self.parents[id_]
+        return root
+
+    def resolve(self, id_: int, type_: nodes.Type) -> None:
+        root = self.find(id_)
+        assert self.types[root] is None, f"template type {id_} is already resolved"
+        self.types[root] = type_
+
+    def union(self, first: int, second: int) -> t.Optional[nodes.Type]:
+        """Make two variables one, keeping the type either of them is resolved to. Return that type."""
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return self.types[first]
+        if self.sizes[first] < self.sizes[second]:
+            first, second = second, first
+        self.parents[second] = first
+        self.sizes[first] += self.sizes[second]
+        self.types[first] = self.types[first] or self.types[second]
+        return self.types[first]
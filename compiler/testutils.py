@@ -1,3 +1,7 @@
+import os
+import tempfile
+import typing as t
+from contextlib import contextmanager
 from unittest import TestCase
 
 
@@ -10,3 +14,20 @@ class CompilerStageTestCase(TestCase):
             dispatchers = (dispatchers,)
         for dispatcher in dispatchers:
             self.assertEqual(expected_classes, set(subclass.__name__ for subclass in dispatcher.keys()))
+
+
+@contextmanager
+def modules_directory(modules: t.Dict[str, str]) -> t.Iterator[str]:
+    """Run in a temporary directory with the modules (name -> code) and the standard library, yield its path."""
+    stdlib = os.path.abspath("stdlib")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.symlink(stdlib, os.path.join(directory, "stdlib"))
+        for name, code in modules.items():
+            with open(os.path.join(directory, name + ".angel"), "w", encoding="utf-8") as file:
+                file.write(code)
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
@@ -4,6 +4,7 @@ import unittest
 
 from . import nodes, cpp_nodes, environment, library
 from .utils import compare_types, dispatch, TYPES, EXPRESSIONS, NODES
+from .visitors import Dispatcher, Visitor
 from .enums import DeclType
 from .context import Context
 
@@ -63,7 +64,7 @@ def has_default_constructor(init_declarations: t.List[nodes.InitDeclaration]) ->
     return False
 
 
-class Translator(unittest.TestCase):
+class Translator(Visitor, unittest.TestCase):
     top_nodes: cpp_nodes.AST
     top_nodes_end: cpp_nodes.AST
     main_function_body: cpp_nodes.AST
@@ -73,6 +74,121 @@ class Translator(unittest.TestCase):
     # Env-like objects that holds multiple precision variables.
     mp_variables: t.List[t.Dict[str, cpp_nodes.Id]] = [{}]
 
+    translate_builtin_function_dispatcher = Dispatcher({
+        nodes.BuiltinFunc.print.value: 'translate_print_function_call',
+        nodes.BuiltinFunc.read.value: 'translate_read_function_call',
+    })
+
+    builtin_type_method_call = Dispatcher({
+        nodes.BuiltinType.string.value: 'translate_string_type_method_call',
+    })
+
+    method_call_dispatcher = Dispatcher({
+        nodes.BuiltinType: lambda self, method_call: dispatch(
+            self.builtin_type_method_call, t.cast(nodes.BuiltinType, method_call.instance_type).value, self,
+            method_call
+        ),
+        nodes.Name: 'translate_method_call_name',
+        nodes.GenericType: 'translate_method_call_name',
+        nodes.VectorType: 'translate_vector_type_method_call',
+        nodes.DictType: lambda self, _: NotImplementedError,
+        nodes.OptionalType: lambda self, _: NotImplementedError,
+        nodes.FunctionType: lambda self, _: NotImplementedError,
+        nodes.TemplateType: lambda self, _: NotImplementedError,
+        nodes.StructType: lambda self, _: NotImplementedError,
+        nodes.AlgebraicType: 'translate_algebraic_type_method_call',
+        nodes.RefType: lambda self, _: NotImplementedError,
+    })
+
+    field_dispatcher = Dispatcher({
+        nodes.Name: 'translate_name_type_field',
+        nodes.BuiltinType: 'translate_builtin_type_field',
+        nodes.VectorType: 'translate_vector_type_field',
+        nodes.DictType: 'translate_dict_type_field',
+        nodes.OptionalType: lambda self, _: NotImplementedError,
+        nodes.FunctionType: lambda self, _: NotImplementedError,
+        nodes.TemplateType: lambda self, _: NotImplementedError,
+        nodes.StructType: lambda self, _: NotImplementedError,
+        nodes.GenericType: 'translate_generic_type_field',
+        nodes.AlgebraicType: 'translate_algebraic_type_field',
+        nodes.RefType: 'translate_ref_field',
+    })
+
+    subscript_dispatcher = Dispatcher({
+        nodes.Name: lambda self, _: NotImplementedError,
+        nodes.BuiltinType: 'translate_builtin_type_subscript',
+        nodes.VectorType: 'translate_collection_type_subscript',
+        nodes.DictType: 'translate_collection_type_subscript',
+        nodes.OptionalType: lambda self, _: NotImplementedError,
+        nodes.FunctionType: lambda self, _: NotImplementedError,
+        nodes.TemplateType: lambda self, _: NotImplementedError,
+        nodes.StructType: lambda self, _: NotImplementedError,
+        nodes.GenericType: lambda self, _: NotImplementedError,
+        nodes.AlgebraicType: lambda self, _: NotImplementedError,
+        nodes.RefType: lambda self, _: NotImplementedError,
+    })
+
+    node_dispatcher = Dispatcher({
+        nodes.Decl: 'translate_declaration',
+        nodes.FunctionDeclaration: 'translate_function_declaration',
+        nodes.StructDeclaration: 'translate_struct_declaration',
+        nodes.InterfaceDeclaration: 'translate_interface_declaration',
+        nodes.AlgebraicDeclaration: 'translate_algebraic_declaration',
+        nodes.FieldDeclaration: 'translate_field_declaration',
+        nodes.MethodDeclaration: 'translate_method_declaration',
+        nodes.InitDeclaration: 'translate_init_declaration',
+        nodes.Assignment: 'translate_assignment',
+        nodes.InitCall: lambda self, node: None,
+        nodes.FunctionCall: lambda self, node: cpp_nodes.Semicolon(self.translate_function_call(node)),
+        nodes.MethodCall: lambda self, node: cpp_nodes.Semicolon(self.translate_method_call(node)),
+        nodes.While: 'translate_while_statement',
+        nodes.For: 'translate_for_statement',
+        nodes.If: 'translate_if_statement',
+        nodes.Return: 'translate_return_statement',
+        nodes.Break: lambda self, node: cpp_nodes.Break(),
+    })
+
+    expression_dispatcher = Dispatcher({
+        nodes.IntegerLiteral: 'translate_integer_literal',
+        nodes.DecimalLiteral: lambda self, value: cpp_nodes.DecimalLiteral(value.value),
+        nodes.StringLiteral: lambda self, value: cpp_nodes.StringLiteral(value.value),
+        nodes.VectorLiteral: 'translate_vector_literal',
+        nodes.OptionalTypeConstructor: 'translate_optional_type_constructor',
+        nodes.OptionalSomeCall: 'translate_optional_some_call',
+        nodes.OptionalSomeValue: 'translate_optional_some_value',
+        nodes.DictLiteral: 'translate_dict_literal',
+        nodes.CharLiteral: lambda self, value: cpp_nodes.CharLiteral(value.value),
+        nodes.BoolLiteral: lambda self, value: cpp_nodes.BoolLiteral(value.value.lower()),
+        nodes.BinaryExpression: 'translate_binary_expression',
+        nodes.FunctionCall: 'translate_function_call',
+        nodes.MethodCall: 'translate_method_call',
+        nodes.Name: lambda self, value: cpp_nodes.Id(value.member),
+        nodes.Cast: 'translate_cast',
+        nodes.Ref: 'translate_ref',
+        nodes.Parentheses: lambda self, value: cpp_nodes.Parentheses(self.translate_expression(value.value)),
+        nodes.Field: 'translate_field',
+        nodes.Subscript: 'translate_subscript',
+        nodes.SpecialName: 'translate_special_name',
+        nodes.BuiltinFunc: 'translate_builtin_func',
+        nodes.PrivateBuiltinFunc: 'translate_private_builtin_func',
+        nodes.Decl: 'translate_declaration',
+        nodes.NamedArgument: 'translate_named_argument',
+    })
+
+    type_dispatcher = Dispatcher({
+        nodes.BuiltinType: 'translate_builtin_type',
+        nodes.Name: 'translate_name_type',
+        nodes.VectorType: 'translate_vector_type',
+        nodes.OptionalType: 'translate_optional_type',
+        nodes.DictType: 'translate_dict_type',
+        nodes.TemplateType: 'translate_template_type',
+        nodes.FunctionType: 'translate_function_type',
+        nodes.StructType: 'translate_struct_type',
+        nodes.GenericType: 'translate_generic_type',
+        nodes.AlgebraicType: 'translate_algebraic_type',
+        nodes.RefType: 'translate_ref_type',
+    })
+
     def __init__(self, context: Context) -> None:
         super().__init__()
         self.env = environment.Environment()
@@ -82,123 +198,11 @@ class Translator(unittest.TestCase):
 
         self.context = context
 
-        # Translation
-        self.translate_builtin_function_dispatcher = {
-            nodes.BuiltinFunc.print.value: self.translate_print_function_call,
-            nodes.BuiltinFunc.read.value: self.translate_read_function_call,
-        }
-
-        self.builtin_type_method_call = {
-            nodes.BuiltinType.string.value: self.translate_string_type_method_call
-        }
-        self.method_call_dispatcher = {
-            nodes.BuiltinType: lambda method_call: dispatch(
-                self.builtin_type_method_call, t.cast(nodes.BuiltinType, method_call.instance_type).value, method_call
-            ),
-            nodes.Name: self.translate_method_call_name,
-            nodes.GenericType: self.translate_method_call_name,
-            nodes.VectorType: self.translate_vector_type_method_call,
-            nodes.DictType: lambda _: NotImplementedError,
-            nodes.OptionalType: lambda _: NotImplementedError,
-            nodes.FunctionType: lambda _: NotImplementedError,
-            nodes.TemplateType: lambda _: NotImplementedError,
-            nodes.StructType: lambda _: NotImplementedError,
-            nodes.AlgebraicType: self.translate_algebraic_type_method_call,
-            nodes.RefType: lambda _: NotImplementedError,
-        }
-
-        self.field_dispatcher = {
-            nodes.Name: self.translate_name_type_field,
-            nodes.BuiltinType: self.translate_builtin_type_field,
-            nodes.VectorType: self.translate_vector_type_field,
-            nodes.DictType: self.translate_dict_type_field,
-            nodes.OptionalType: lambda _: NotImplementedError,
-            nodes.FunctionType: lambda _: NotImplementedError,
-            nodes.TemplateType: lambda _: NotImplementedError,
-            nodes.StructType: lambda _: NotImplementedError,
-            nodes.GenericType: self.translate_generic_type_field,
-            nodes.AlgebraicType: self.translate_algebraic_type_field,
-            nodes.RefType: self.translate_ref_field,
-        }
-
-        self.subscript_dispatcher = {
-            nodes.Name: lambda _: NotImplementedError,
-            nodes.BuiltinType: self.translate_builtin_type_subscript,
-            nodes.VectorType: self.translate_collection_type_subscript,
-            nodes.DictType: self.translate_collection_type_subscript,
-            nodes.OptionalType: lambda _: NotImplementedError,
-            nodes.FunctionType: lambda _: NotImplementedError,
-            nodes.TemplateType: lambda _: NotImplementedError,
-            nodes.StructType: lambda _: NotImplementedError,
-            nodes.GenericType: lambda _: NotImplementedError,
-            nodes.AlgebraicType: lambda _: NotImplementedError,
-            nodes.RefType: lambda _: NotImplementedError,
-        }
-
-        self.node_dispatcher = {
-            nodes.Decl: self.translate_declaration,
-            nodes.FunctionDeclaration: self.translate_function_declaration,
-            nodes.StructDeclaration: self.translate_struct_declaration,
-            nodes.InterfaceDeclaration: self.translate_interface_declaration,
-            nodes.AlgebraicDeclaration: self.translate_algebraic_declaration,
-            nodes.FieldDeclaration: self.translate_field_declaration,
-            nodes.MethodDeclaration: self.translate_method_declaration,
-            nodes.InitDeclaration: self.translate_init_declaration,
-            nodes.Assignment: self.translate_assignment,
-            nodes.InitCall: lambda node: None,
-            nodes.FunctionCall: lambda node: cpp_nodes.Semicolon(self.translate_function_call(node)),
-            nodes.MethodCall: lambda node: cpp_nodes.Semicolon(self.translate_method_call(node)),
-            nodes.While: self.translate_while_statement,
-            nodes.For: self.translate_for_statement,
-            nodes.If: self.translate_if_statement,
-            nodes.Return: self.translate_return_statement,
-            nodes.Break: lambda node: cpp_nodes.Break(),
-        }
-
-        self.expression_dispatcher = {
-            nodes.IntegerLiteral: self.translate_integer_literal,
-            nodes.DecimalLiteral: lambda value: cpp_nodes.DecimalLiteral(value.value),
-            nodes.StringLiteral: lambda value: cpp_nodes.StringLiteral(value.value),
-            nodes.VectorLiteral: self.translate_vector_literal,
-            nodes.OptionalTypeConstructor: self.translate_optional_type_constructor,
-            nodes.OptionalSomeCall: self.translate_optional_some_call,
-            nodes.OptionalSomeValue: self.translate_optional_some_value,
-            nodes.DictLiteral: self.translate_dict_literal,
-            nodes.CharLiteral: lambda value: cpp_nodes.CharLiteral(value.value),
-            nodes.BoolLiteral: lambda value: cpp_nodes.BoolLiteral(value.value.lower()),
-            nodes.BinaryExpression: self.translate_binary_expression,
-            nodes.FunctionCall: self.translate_function_call,
-            nodes.MethodCall: self.translate_method_call,
-            nodes.Name: lambda value: cpp_nodes.Id(value.member),
-            nodes.Cast: self.translate_cast,
-            nodes.Ref: self.translate_ref,
-            nodes.Parentheses: lambda value: cpp_nodes.Parentheses(self.translate_expression(value.value)),
-            nodes.Field: self.translate_field,
-            nodes.Subscript: self.translate_subscript,
-            nodes.SpecialName: self.translate_special_name,
-            nodes.BuiltinFunc: self.translate_builtin_func,
-            nodes.PrivateBuiltinFunc: self.translate_private_builtin_func,
-            nodes.Decl: self.translate_declaration,
-            nodes.NamedArgument: self.translate_named_argument,
-        }
-        self.translate_expression: t.Callable[[nodes.Expression], cpp_nodes.Expression] = lambda value: \
-            dispatch(self.expression_dispatcher, type(value), value)
-
-        self.type_dispatcher: t.Dict[type, t.Callable] = {
-            nodes.BuiltinType: self.translate_builtin_type,
-            nodes.Name: self.translate_name_type,
-            nodes.VectorType: self.translate_vector_type,
-            nodes.OptionalType: self.translate_optional_type,
-            nodes.DictType: self.translate_dict_type,
-            nodes.TemplateType: self.translate_template_type,
-            nodes.FunctionType: self.translate_function_type,
-            nodes.StructType: self.translate_struct_type,
-            nodes.GenericType: self.translate_generic_type,
-            nodes.AlgebraicType: self.translate_algebraic_type,
-            nodes.RefType: self.translate_ref_type,
-        }
-        self.translate_type: t.Callable[[nodes.Type], cpp_nodes.Type] = lambda type_: \
-            dispatch(self.type_dispatcher, type(type_), type_)
+    def translate_expression(self, value: nodes.Expression) -> cpp_nodes.Expression:
+        return dispatch(self.expression_dispatcher, type(value), self, value)
+
+    def translate_type(self, type_: nodes.Type) -> cpp_nodes.Type:
+        return dispatch(self.type_dispatcher, type(type_), self, type_)
 
     def translate_integer_literal(self, integer_literal: nodes.IntegerLiteral) -> cpp_nodes.Expression:
         type_annotation = getattr(integer_literal, "type_annotation", None)
@@ -315,7 +319,7 @@ class Translator(unittest.TestCase):
 
     def translate_method_call(self, method_call: nodes.MethodCall) -> cpp_nodes.Expression:
         assert method_call.instance_type is not None
-        return dispatch(self.method_call_dispatcher, type(method_call.instance_type), method_call)
+        return dispatch(self.method_call_dispatcher, type(method_call.instance_type), self, method_call)
 
     def translate_method_call_name(self, method_call: nodes.MethodCall) -> cpp_nodes.Expression:
         return cpp_nodes.MethodCall(
@@ -392,11 +396,11 @@ class Translator(unittest.TestCase):
 
     def translate_field(self, field: nodes.Field) -> cpp_nodes.Expression:
         assert field.base_type is not None
-        return dispatch(self.field_dispatcher, type(field.base_type), field)
+        return dispatch(self.field_dispatcher, type(field.base_type), self, field)
 
     def translate_subscript(self, subscript: nodes.Subscript) -> cpp_nodes.Expression:
         assert subscript.base_type is not None
-        return dispatch(self.subscript_dispatcher, type(subscript.base_type), subscript)
+        return dispatch(self.subscript_dispatcher, type(subscript.base_type), self, subscript)
 
     def translate_name_type_field(self, field: nodes.Field) -> cpp_nodes.Expression:
         base = self.translate_expression(field.base)
@@ -494,7 +498,8 @@ class Translator(unittest.TestCase):
     def translate_function_call(self, function_call: nodes.FunctionCall) -> cpp_nodes.Expression:
         if isinstance(function_call.function_path, nodes.BuiltinFunc):
             return dispatch(
-                self.translate_builtin_function_dispatcher, function_call.function_path.value, function_call.arguments
+                self.translate_builtin_function_dispatcher, function_call.function_path.value, self,
+                function_call.arguments
             )
         init_parameters: t.List[cpp_nodes.Type] = []
         if function_call.instance_call_parameters:
@@ -629,7 +634,7 @@ class Translator(unittest.TestCase):
         result = []
         for node in ast:
             self.current_line = node.line
-            translated = dispatch(self.node_dispatcher, type(node), node)
+            translated = self.visit(node)
             result.extend(self.nodes_buffer)
             self.nodes_buffer = []
             if translated is not None:
@@ -960,7 +965,7 @@ class Translator(unittest.TestCase):
         return cpp_nodes.Pointer(self.translate_type(ref_type.value_type))
 
     def translate_builtin_type(self, builtin_type: nodes.BuiltinType) -> cpp_nodes.Type:
-        if builtin_type.value in nodes.BuiltinType.finite_int_types():
+        if builtin_type.is_finite_int_type:
             self.add_include(cpp_nodes.StdModule.cstdint)
         elif builtin_type.value == nodes.BuiltinType.string.value:
             self.add_include(cpp_nodes.StdModule.string)
@@ -1,8 +1,10 @@
+import enum
 import typing as t
 import unittest
 from copy import copy
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from decimal import Decimal
+from functools import lru_cache
 from itertools import zip_longest
 
 from . import nodes, errors, environment, environment_entries as entries, estimation_nodes as enodes
@@ -15,6 +17,10 @@ from .utils import submangle, dispatch, TYPES, EXPRESSIONS, apply_mapping, apply
 Mapping = t.Dict[str, nodes.Type]
 InferenceResult = namedtuple('InferenceResult', ['type', 'mapping'])
 UnificationResult = namedtuple('UnificationResult', ['type', 'mapping'])
+# Returned by TypeChecker.try_unify_types instead of raising AngelTypeError, which is only built (with its message
+# and code) by TypeChecker.unify_types when the failure is reported. subtype is None if there was nothing to unify.
+UnificationFailure = namedtuple('UnificationFailure', ['subtype', 'supertype', 'possible_types'])
+UnificationOutcome = t.Union[UnificationResult, UnificationFailure]
 
 
 def to_inference_result(unification_result: UnificationResult) -> InferenceResult:
@@ -27,41 +33,109 @@ def build_instance_type(struct_type: nodes.StructType) -> nodes.Type:
     return struct_type.name
 
 
+def _int_types_by_bit_length(int_types: t.List[nodes.Type]) -> t.List[t.List[nodes.Type]]:
+    """Return int types (8, 16, 32 and 64 bits wide) that can hold a value, by the number of bits the value takes."""
+    return [
+        [type_ for type_, width in zip(int_types, (8, 16, 32, 64)) if bit_length <= width]
+        for bit_length in range(65)
+    ]
+
+
+SIGNED_INT_TYPES_BY_BIT_LENGTH = _int_types_by_bit_length(
+    [nodes.BuiltinType.i8, nodes.BuiltinType.i16, nodes.BuiltinType.i32, nodes.BuiltinType.i64]
+)
+UNSIGNED_INT_TYPES_BY_BIT_LENGTH = _int_types_by_bit_length(
+    [nodes.BuiltinType.u8, nodes.BuiltinType.u16, nodes.BuiltinType.u32, nodes.BuiltinType.u64]
+)
+
+
 def get_possible_unsigned_int_types_based_on_value(value: int) -> t.List[nodes.Type]:
-    if value < 0:
+    if value < 0 or value.bit_length() > 64:
         return []
-    elif value <= 255:
-        return [nodes.BuiltinType.u8, nodes.BuiltinType.u16, nodes.BuiltinType.u32, nodes.BuiltinType.u64]
-    elif value <= 65535:
-        return [nodes.BuiltinType.u16, nodes.BuiltinType.u32, nodes.BuiltinType.u64]
-    elif value <= 4294967295:
-        return [nodes.BuiltinType.u32, nodes.BuiltinType.u64]
-    elif value <= 18446744073709551615:
-        return [nodes.BuiltinType.u64]
-    return []
+    return UNSIGNED_INT_TYPES_BY_BIT_LENGTH[value.bit_length()]
 
 
 def get_possible_signed_int_types_based_on_value(value: int) -> t.List[nodes.Type]:
-    if -128 <= value <= 127:
-        return [nodes.BuiltinType.i8, nodes.BuiltinType.i16, nodes.BuiltinType.i32, nodes.BuiltinType.i64]
-    elif -32768 <= value <= 32767:
-        return [nodes.BuiltinType.i16, nodes.BuiltinType.i32, nodes.BuiltinType.i64]
-    elif -2147483648 <= value <= 2147483647:
-        return [nodes.BuiltinType.i32, nodes.BuiltinType.i64]
-    elif -9223372036854775808 <= value <= 9223372036854775807:
-        return [nodes.BuiltinType.i64]
-    return []
+    # The sign bit and the bits of the magnitude (of -value - 1 for negative values, as in two's complement).
+    bit_length = (value if value >= 0 else ~value).bit_length() + 1
+    if bit_length > 64:
+        return []
+    return SIGNED_INT_TYPES_BY_BIT_LENGTH[bit_length]
 
 
-def get_possible_int_types_based_on_value(value: int) -> t.List[nodes.Type]:
+@lru_cache(maxsize=None)
+def _possible_int_types(signed_bit_length: int, unsigned_bit_length: int) -> t.List[nodes.Type]:
     base: t.List[nodes.Type] = []   # nodes.BuiltinType.int_]
     return (
         base
-        + get_possible_signed_int_types_based_on_value(value)
-        + get_possible_unsigned_int_types_based_on_value(value)
+        + (SIGNED_INT_TYPES_BY_BIT_LENGTH[signed_bit_length] if signed_bit_length <= 64 else [])
+        + (UNSIGNED_INT_TYPES_BY_BIT_LENGTH[unsigned_bit_length] if 0 <= unsigned_bit_length <= 64 else [])
     )
 
 
+def get_possible_int_types_based_on_value(value: int) -> t.List[nodes.Type]:
+    """Return int types that can hold the value, narrowest first (the list is shared, do not change it)."""
+    if value >= 0:
+        return _possible_int_types(min(value.bit_length() + 1, 65), min(value.bit_length(), 65))
+    return _possible_int_types(min((~value).bit_length() + 1, 65), -1)
+
+
+UNIFICATION_CACHE_SIZE = 1024
+
+
+def is_context_free(type_: nodes.Type) -> bool:
+    """Whether unification with the type depends only on the type itself.
+
+    Names (resolved through the environment and the mapping), template types and Self are not context free, and
+    neither is a type that is not interned (so it could not be a cache key).
+
+    """
+    if isinstance(type_, nodes.BuiltinType):
+        return type_ is not nodes.BuiltinType.self_
+    if isinstance(type_, nodes.InternedType) and type_._interned:
+        return _is_interned_type_context_free(type_)
+    return False
+
+
+@lru_cache(maxsize=None)
+def _is_interned_type_context_free(type_: nodes.InternedType) -> bool:
+    if isinstance(type_, nodes.TemplateType):
+        return False
+    for name in nodes.node_fields(type(type_)):
+        value = getattr(type_, name)
+        values = value if isinstance(value, list) else [value]
+        if not all(is_context_free(element) for element in values):
+            return False
+    return True
+
+
+def has_template_types(type_: nodes.Type) -> bool:
+    """Whether the type may contain template types (which only mean something to the type checker that made them)."""
+    if isinstance(type_, (nodes.BuiltinType, nodes.Name)):
+        return False
+    if isinstance(type_, nodes.InternedType) and type_._interned:
+        return _has_template_types(type_)
+    return True
+
+
+@lru_cache(maxsize=None)
+def _has_template_types(type_: nodes.InternedType) -> bool:
+    """Whether an interned type contains template types (otherwise replace_template_types returns it as is)."""
+    if isinstance(type_, nodes.TemplateType):
+        return True
+    for name in nodes.node_fields(type(type_)):
+        value = getattr(type_, name)
+        if isinstance(value, dict):
+            value = list(value.values())
+        for element in value if isinstance(value, list) else [value]:
+            if isinstance(element, nodes.InternedType) and element._interned:
+                if _has_template_types(element):
+                    return True
+            elif isinstance(element, nodes.Type) and not isinstance(element, (nodes.Name, nodes.BuiltinType)):
+                return True
+    return False
+
+
 MAX_FLOAT32 = Decimal('3.402823700000000000000000000E+38')
 MIN_FLOAT32 = Decimal('1.17549400000000000000000000E-38')
 MAX_FLOAT64 = Decimal('1.79769313486231570000000000E308')
@@ -79,15 +153,29 @@ def get_possible_float_types_base_on_value(value: str) -> t.List[nodes.Type]:
 
 class TypeChecker(unittest.TestCase):
 
-    def __init__(self, context: Context, env: environment.Environment):
+    def __init__(
+        self, context: Context, env: environment.Environment, unification_cache_size: int = UNIFICATION_CACHE_SIZE
+    ):
+        """Results of unification of context free types (see is_context_free) are kept in an LRU cache of
+        unification_cache_size entries, failures included. Such unification neither reads nor changes the mapping,
+        template types or the environment, so the entries never become stale.
+
+        """
         super().__init__()
         self.env = env
         self.code: errors.Code = errors.Code("", 0)
         self.estimator: t.Optional[t.Any] = None
         self.context = context
 
-        self.template_types: t.List[t.Optional[nodes.Type]] = []
-        self.template_type_id = -1
+        self.unification_cache: t.OrderedDict[
+            t.Tuple[nodes.Type, nodes.Type], t.Union[nodes.Type, UnificationFailure]
+        ] = OrderedDict()
+        self.unification_cache_size = unification_cache_size
+        self.unification_cache_hits = 0
+        self.unification_cache_misses = 0
+
+        # Shared by all type checkers of the compilation, so template types mean the same to all stages.
+        self.template_types = context.template_types
 
         self.infer_type_from_field_of_builtin_type_dispatcher = {
             nodes.BuiltinType.string.value: lambda field, mapping, supertype: to_inference_result(
@@ -356,8 +444,21 @@ class TypeChecker(unittest.TestCase):
     def infer_type(
         self, value: nodes.Expression, supertype: t.Optional[nodes.Type] = None, mapping: t.Optional[Mapping] = None
     ) -> InferenceResult:
-        self.context.template_types = self.template_types
-        return dispatch(self.type_inference_dispatcher, type(value), value, supertype, mapping or {})
+        """Infer type of value (as its subtype if supertype is given).
+
+        Types inferred without a supertype and a mapping are saved in context.inferred_types, so expressions that
+        later stages (or later runs of the estimator) ask about again are not inferred again.
+
+        """
+        if supertype is not None or mapping:
+            return dispatch(self.type_inference_dispatcher, type(value), value, supertype, mapping or {})
+        saved = self.context.inferred_types.get(id(value))
+        if saved is not None and saved[0] is value:
+            return InferenceResult(saved[1], {})
+        result = dispatch(self.type_inference_dispatcher, type(value), value, supertype, {})
+        if not result.mapping and not isinstance(value, enum.Enum) and not has_template_types(result.type):
+            self.context.inferred_types[id(value)] = (value, result.type)
+        return result
 
     def infer_type_from_name(
         self, name: nodes.Name, supertype: t.Optional[nodes.Type], mapping: Mapping
@@ -425,9 +526,7 @@ class TypeChecker(unittest.TestCase):
             if struct_entry is None:
                 raise errors.AngelNameError(function_type.name, self.code)
             assert isinstance(struct_entry, entries.StructEntry)
-            result = self.match_init_declaration(
-                function_type, list(struct_entry.init_declarations.values()), call.arguments, supertype, mapping
-            )
+            result = self.match_init_declaration(function_type, struct_entry, call.arguments, supertype, mapping)
             if isinstance(result.type, nodes.GenericType):
                 call.instance_call_parameters = result.type.parameters
             return result
@@ -436,13 +535,12 @@ class TypeChecker(unittest.TestCase):
         raise errors.AngelNoncallableCall(call.function_path, self.code)
 
     def match_init_declaration(
-        self, struct_type: nodes.StructType, init_declarations: t.List[entries.InitEntry],
+        self, struct_type: nodes.StructType, struct_entry: entries.StructEntry,
         arguments: t.List[nodes.Expression], supertype: t.Optional[nodes.Type], mapping: Mapping
     ) -> InferenceResult:
         matched = True
-        expected_major = []
         struct_mapping = self.basic_struct_mapping(struct_type)
-        for init_entry in init_declarations:
+        for init_entry in struct_entry.plausible_init_declarations(arguments):
             for arg, value in zip_longest(init_entry.arguments, arguments):
                 if arg is None:
                     matched = False
@@ -461,13 +559,13 @@ class TypeChecker(unittest.TestCase):
                     break
             if not matched:
                 matched = True
-                expected_major.append([arg.type for arg in init_entry.arguments])
                 continue
             return to_inference_result(
                 self.unify_types(apply_mapping(build_instance_type(struct_type), mapping), supertype, mapping)
             )
         expected = " or ".join(
-            ("(" + ", ".join(type_.to_code() for type_ in type_list) + ")" for type_list in expected_major)
+            "(" + ", ".join(arg.type.to_code() for arg in init_entry.arguments) + ")"
+            for init_entry in struct_entry.init_declarations.values()
         )
         raise errors.AngelWrongArguments(expected, self.code, arguments)
 
@@ -490,7 +588,13 @@ class TypeChecker(unittest.TestCase):
             self.infer_type(value, arg.type, mapping)
 
         # TODO: add `self` to the environment
-        estimated_arguments = [self.estimate_expression(argument) for argument in arguments]
+        if self.context.check_only:
+            # Where clauses check types of the arguments, not their values.
+            estimated_arguments: t.List[enodes.Expression] = [
+                enodes.DynamicValue(arg.type) for arg in function_type.arguments
+            ]
+        else:
+            estimated_arguments = [self.estimate_expression(argument) for argument in arguments]
         environment_backup = copy(self.env)
         self.env = environment.Environment(function_type.saved_environment)
         self.env.add_parameters(SPEC_LINE, function_type.parameters)
@@ -795,9 +899,8 @@ class TypeChecker(unittest.TestCase):
         self, value: nodes.IntegerLiteral, supertype: t.Optional[nodes.Type], mapping: Mapping
     ) -> InferenceResult:
         possible_types = get_possible_int_types_based_on_value(int(value.value))
-        try:
-            result = self.unify_list_types(possible_types, supertype, mapping)
-        except errors.AngelTypeError:
+        result = self.try_unify_list_types(possible_types, supertype, mapping)
+        if isinstance(result, UnificationFailure):
             if supertype is None:
                 if int(value.value) > 0:
                     message = f"{value.value} is too big"
@@ -808,17 +911,15 @@ class TypeChecker(unittest.TestCase):
             else:
                 message = f"'{supertype.to_code()}' is not a possible type for {value.value}"
             raise errors.AngelTypeError(message, self.code, possible_types)
-        else:
-            value.type_annotation = result.type
-            return to_inference_result(result)
+        value.type_annotation = result.type
+        return to_inference_result(result)
 
     def infer_type_from_decimal_literal(
         self, value: nodes.DecimalLiteral, supertype: t.Optional[nodes.Type], mapping: Mapping
     ) -> InferenceResult:
         possible_types = get_possible_float_types_base_on_value(value.value)
-        try:
-            result = self.unify_list_types(possible_types, supertype, mapping)
-        except errors.AngelTypeError:
+        result = self.try_unify_list_types(possible_types, supertype, mapping)
+        if isinstance(result, UnificationFailure):
             if supertype is None:
                 if int(value.value) > 0:
                     message = f"{value.value} is too big"
@@ -829,8 +930,7 @@ class TypeChecker(unittest.TestCase):
             else:
                 message = f"'{supertype.to_code()}' is not a possible type for {value.value}"
             raise errors.AngelTypeError(message, self.code, possible_types)
-        else:
-            return to_inference_result(result)
+        return to_inference_result(result)
 
     def infer_type_from_vector_literal(
         self, value: nodes.VectorLiteral, supertype: t.Optional[nodes.Type], mapping: Mapping
@@ -838,10 +938,10 @@ class TypeChecker(unittest.TestCase):
         element_result: UnificationResult = UnificationResult(self.create_template_type(), {})
         for element in value.elements:
             current_element_result = self.infer_type(element, mapping=mapping)
-            try:
-                element_result = self.unify_types(element_result.type, current_element_result.type, mapping)
-            except errors.AngelTypeError:
-                element_result = self.unify_types(current_element_result.type, element_result.type, mapping)
+            result = self.try_unify_types(element_result.type, current_element_result.type, mapping)
+            if isinstance(result, UnificationFailure):
+                result = self.unify_types(current_element_result.type, element_result.type, mapping)
+            element_result = result
 
         subtype = nodes.VectorType(element_result.type)
         value.typ = subtype
@@ -854,16 +954,16 @@ class TypeChecker(unittest.TestCase):
         value_result: UnificationResult = UnificationResult(self.create_template_type(), {})
         for key, val in zip(value.keys, value.values):
             current_key_result = self.infer_type(key, mapping=mapping)
-            try:
-                key_result = self.unify_types(key_result.type, current_key_result.type, mapping=mapping)
-            except errors.AngelTypeError:
-                key_result = self.unify_types(current_key_result.type, key_result.type, mapping=mapping)
+            result = self.try_unify_types(key_result.type, current_key_result.type, mapping=mapping)
+            if isinstance(result, UnificationFailure):
+                result = self.unify_types(current_key_result.type, key_result.type, mapping=mapping)
+            key_result = result
 
             current_value_result = self.infer_type(val, mapping=mapping)
-            try:
-                value_result = self.unify_types(value_result.type, current_value_result.type, mapping=mapping)
-            except errors.AngelTypeError:
-                value_result = self.unify_types(current_value_result.type, value_result.type, mapping=mapping)
+            result = self.try_unify_types(value_result.type, current_value_result.type, mapping=mapping)
+            if isinstance(result, UnificationFailure):
+                result = self.unify_types(current_value_result.type, value_result.type, mapping=mapping)
+            value_result = result
         value.annotation = nodes.DictType(key_result.type, value_result.type)
         return to_inference_result(
             self.unify_types(nodes.DictType(key_result.type, value_result.type), supertype, mapping)
@@ -942,18 +1042,61 @@ class TypeChecker(unittest.TestCase):
     def unify_types(
         self, subtype: nodes.Type, supertype: t.Optional[nodes.Type], mapping: Mapping
     ) -> UnificationResult:
+        result = self.try_unify_types(subtype, supertype, mapping)
+        if isinstance(result, UnificationFailure):
+            raise self.unification_error(result)
+        return result
+
+    def try_unify_types(
+        self, subtype: nodes.Type, supertype: t.Optional[nodes.Type], mapping: Mapping
+    ) -> UnificationOutcome:
+        """Like unify_types, but return UnificationFailure instead of raising AngelTypeError."""
         subtype = apply_mapping(subtype, mapping)
         if supertype:
             supertype = apply_mapping(supertype, mapping)
+            if not (is_context_free(subtype) and is_context_free(supertype)):
+                result = dispatch(
+                    self.unification_dispatcher, (type(subtype), type(supertype)), subtype, supertype, mapping
+                )
+                if isinstance(result, UnificationFailure):
+                    return result
+                return UnificationResult(self.replace_template_types(result.type), result.mapping)
+
+            key = (subtype, supertype)
+            cached = self.unification_cache.get(key)
+            if cached is not None:
+                self.unification_cache.move_to_end(key)
+                self.unification_cache_hits += 1
+                if isinstance(cached, UnificationFailure):
+                    return cached
+                return UnificationResult(cached, mapping)
+            self.unification_cache_misses += 1
             result = dispatch(
                 self.unification_dispatcher, (type(subtype), type(supertype)), subtype, supertype, mapping
             )
-            return UnificationResult(self.replace_template_types(result.type), result.mapping)
+            if isinstance(result, UnificationFailure):
+                self._cache_unification(key, result)
+                return result
+            result_type = self.replace_template_types(result.type)
+            self._cache_unification(key, result_type)
+            return UnificationResult(result_type, result.mapping)
 
         if isinstance(subtype, nodes.Name):
             return UnificationResult(self.build_specific_name_type(subtype), mapping)
         return UnificationResult(self.replace_template_types(subtype), mapping)
 
+    def _cache_unification(
+        self, key: t.Tuple[nodes.Type, nodes.Type], result: t.Union[nodes.Type, UnificationFailure]
+    ) -> None:
+        self.unification_cache[key] = result
+        if len(self.unification_cache) > self.unification_cache_size:
+            self.unification_cache.popitem(last=False)
+
+    @property
+    def unification_cache_hit_rate(self) -> float:
+        total = self.unification_cache_hits + self.unification_cache_misses
+        return self.unification_cache_hits / total if total else 0.0
+
     def build_specific_name_type(self, name: nodes.Name) -> nodes.Type:
         entry = self.env.get(name)
         if isinstance(entry, entries.AlgebraicEntry):
@@ -970,17 +1113,19 @@ class TypeChecker(unittest.TestCase):
 
     def unify_builtin_types(
         self, subtype: nodes.BuiltinType, supertype: nodes.BuiltinType, mapping: Mapping
-    ) -> UnificationResult:
-        if supertype.value in subtype.get_builtin_supertypes():
+    ) -> UnificationOutcome:
+        if subtype.is_builtin_subtype(supertype):
             return UnificationResult(supertype, mapping)
-        raise self.basic_type_error(subtype, supertype)
+        return self.unification_failed(subtype, supertype, mapping)
 
     def unify_builtin_type_with_generic_type(
         self, subtype: nodes.BuiltinType, supertype: nodes.GenericType, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         if isinstance(supertype.name, nodes.BuiltinType) and supertype.name.value == nodes.BuiltinType.iterable.value:
             if subtype.value == nodes.BuiltinType.string.value:
-                element_result = self.unify_types(nodes.BuiltinType.char, supertype.parameters[0], mapping)
+                element_result = self.try_unify_types(nodes.BuiltinType.char, supertype.parameters[0], mapping)
+                if isinstance(element_result, UnificationFailure):
+                    return element_result
                 return UnificationResult(
                     nodes.GenericType(nodes.BuiltinType.iterable, [element_result.type]), element_result.mapping
                 )
@@ -988,35 +1133,30 @@ class TypeChecker(unittest.TestCase):
 
     def unify_builtin_type_with_template_type(
         self, subtype: nodes.BuiltinType, supertype: nodes.TemplateType, mapping: Mapping
-    ) -> UnificationResult:
-        assert self.template_types[supertype.id] is None
-        self.template_types[supertype.id] = subtype
-        return UnificationResult(subtype, mapping)
+    ) -> UnificationOutcome:
+        return self.unification_template_supertype_success(subtype, supertype, mapping)
 
     def unify_generic_type_with_builtin_type(
         self, subtype: nodes.GenericType, supertype: nodes.BuiltinType, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         if supertype.value == nodes.BuiltinType.self_.value:
             assert self.env.parents
             parent = self.env.parents[-1]
-            try:
-                self.unify_types(subtype.name, parent, mapping)
-            except errors.AngelTypeError:
-                raise self.basic_type_error(subtype, supertype)
-            else:
-                return UnificationResult(subtype, mapping)
+            if isinstance(self.try_unify_types(subtype.name, parent, mapping), UnificationFailure):
+                return self.unification_failed(subtype, supertype, mapping)
+            return UnificationResult(subtype, mapping)
         elif supertype.value == nodes.BuiltinType.object_.value:
             return UnificationResult(supertype, mapping)
         else:
-            raise self.basic_type_error(subtype, supertype)
+            return self.unification_failed(subtype, supertype, mapping)
 
     def unify_name_with_builtin_type(
         self, subtype: nodes.Name, supertype: nodes.BuiltinType, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         if supertype.value == nodes.BuiltinType.self_.value:
             assert self.env.parents
             parent = self.env.parents[-1]
-            return self.unify_types(subtype, parent, mapping)
+            return self.try_unify_types(subtype, parent, mapping)
         if not supertype.is_interface:
             return self.unification_failed(subtype, supertype, mapping)
         subtype_entry = self.env.get(subtype)
@@ -1031,96 +1171,91 @@ class TypeChecker(unittest.TestCase):
 
     def unification_template_supertype_success(
         self, subtype: nodes.Type, supertype: nodes.TemplateType, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         template_type = self.template_types[supertype.id]
         if template_type is None:
-            self.template_types[supertype.id] = subtype
+            self.template_types.resolve(supertype.id, subtype)
             return UnificationResult(subtype, mapping)
-        return self.unify_types(subtype, template_type, mapping)
+        return self.try_unify_types(subtype, template_type, mapping)
 
     def unification_template_subtype_success(
         self, subtype: nodes.TemplateType, supertype: nodes.Type, mapping: Mapping
-    ) -> UnificationResult:
-        if self.template_types[subtype.id] is None:
-            self.template_types[subtype.id] = supertype
+    ) -> UnificationOutcome:
+        template_type = self.template_types[subtype.id]
+        if template_type is None:
+            self.template_types.resolve(subtype.id, supertype)
             return UnificationResult(supertype, mapping)
-        subt = self.template_types[subtype.id]
-        assert subt
-        return self.unify_types(subt, supertype, mapping)
+        return self.try_unify_types(template_type, supertype, mapping)
 
     def unify_vector_with_generic_type(
         self, subtype: nodes.VectorType, supertype: nodes.GenericType, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         if isinstance(supertype.name, nodes.Name) or supertype.name.value != nodes.BuiltinType.iterable.value:
             return self.unification_failed(subtype, supertype, mapping)
-        element_result = self.unify_types(subtype.subtype, supertype.parameters[0], mapping)
+        element_result = self.try_unify_types(subtype.subtype, supertype.parameters[0], mapping)
+        if isinstance(element_result, UnificationFailure):
+            return element_result
         return UnificationResult(
             nodes.GenericType(nodes.BuiltinType.iterable, [element_result.type]), element_result.mapping
         )
 
     def unify_vector_types(
         self, subtype: nodes.VectorType, supertype: nodes.VectorType, mapping: Mapping
-    ) -> UnificationResult:
-        try:
-            element_result = self.unify_types(subtype.subtype, supertype.subtype, mapping)
-            return UnificationResult(nodes.VectorType(element_result.type), element_result.mapping)
-        except errors.AngelTypeError:
-            raise self.basic_type_error(subtype, supertype)
+    ) -> UnificationOutcome:
+        element_result = self.try_unify_types(subtype.subtype, supertype.subtype, mapping)
+        if isinstance(element_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        return UnificationResult(nodes.VectorType(element_result.type), element_result.mapping)
 
-    def unify_type_with_name(self, subtype: nodes.Type, supertype: nodes.Name, mapping: Mapping) -> UnificationResult:
+    def unify_type_with_name(self, subtype: nodes.Type, supertype: nodes.Name, mapping: Mapping) -> UnificationOutcome:
         entry = self.entry_possible_param(supertype)
         if isinstance(entry, entries.ParameterEntry):
             found = mapping.get(supertype.member)
             if found:
-                return self.unify_types(subtype, found, mapping)
+                return self.try_unify_types(subtype, found, mapping)
             mapping[supertype.member] = subtype
             return UnificationResult(subtype, mapping)
         return self.unification_failed(subtype, supertype, mapping)
 
     def unify_algebraic_type_with_name(
         self, subtype: nodes.AlgebraicType, supertype: nodes.Name, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         if subtype.base == supertype:
             return UnificationResult(subtype, mapping)
         return self.unify_type_with_name(subtype, supertype, mapping)
 
     def unify_optional_types(
         self, subtype: nodes.OptionalType, supertype: nodes.OptionalType, mapping: Mapping
-    ) -> UnificationResult:
-        try:
-            inner_result = self.unify_types(subtype.inner_type, supertype.inner_type, mapping=mapping)
-            return UnificationResult(nodes.OptionalType(inner_result.type), inner_result.mapping)
-        except errors.AngelTypeError:
-            raise self.basic_type_error(subtype, supertype)
+    ) -> UnificationOutcome:
+        inner_result = self.try_unify_types(subtype.inner_type, supertype.inner_type, mapping=mapping)
+        if isinstance(inner_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        return UnificationResult(nodes.OptionalType(inner_result.type), inner_result.mapping)
 
     def unify_function_types(
         self, subtype: nodes.FunctionType, supertype: nodes.FunctionType, mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
         arguments = []
         # TODO: unify where clauses
         clauses = subtype.where_clauses
         for sub_argument, super_argument in zip_longest(subtype.arguments, supertype.arguments):
-            try:
-                argument_result = self.unify_types(sub_argument, super_argument, mapping)
-            except errors.AngelTypeError:
-                raise self.basic_type_error(subtype, supertype)
-            else:
-                mapping = argument_result.mapping
-                arguments.append(nodes.Argument(sub_argument.name, argument_result.type))
-        try:
-            return_result = self.unify_types(subtype.return_type, supertype.return_type, mapping)
-        except errors.AngelTypeError:
-            raise self.basic_type_error(subtype, supertype)
-        else:
-            return UnificationResult(
-                nodes.FunctionType(
-                    subtype.parameters, arguments, return_result.type, clauses, subtype.saved_environment,
-                    is_algebraic_method=subtype.is_algebraic_method
-                ),
-                return_result.mapping
-            )
+            argument_result = self.try_unify_types(sub_argument, super_argument, mapping)
+            if isinstance(argument_result, UnificationFailure):
+                return self.unification_failed(subtype, supertype, mapping)
+            mapping = argument_result.mapping
+            arguments.append(nodes.Argument(sub_argument.name, argument_result.type))
+        return_result = self.try_unify_types(subtype.return_type, supertype.return_type, mapping)
+        if isinstance(return_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        return UnificationResult(
+            nodes.FunctionType(
+                subtype.parameters, arguments, return_result.type, clauses, subtype.saved_environment,
+                is_algebraic_method=subtype.is_algebraic_method
+            ),
+            return_result.mapping
+        )
 
-    def unify_name_types(self, subtype: nodes.Name, supertype: nodes.Name, mapping: Mapping) -> UnificationResult:
+    def unify_name_types(self, subtype: nodes.Name, supertype: nodes.Name, mapping: Mapping) -> UnificationOutcome:
         subtype_entry = self.entry_possible_param(subtype)
         supertype_entry = self.entry_possible_param(supertype)
 
@@ -1128,75 +1263,69 @@ class TypeChecker(unittest.TestCase):
                 not isinstance(subtype_entry, entries.ParameterEntry)):
             found = mapping.get(supertype.member)
             if found:
-                return self.unify_types(subtype, found, mapping)
+                return self.try_unify_types(subtype, found, mapping)
             mapping[supertype.member] = subtype
             return UnificationResult(subtype, mapping)
 
         if subtype.module == supertype.module and subtype.member == supertype.member:
             return UnificationResult(supertype, mapping)
-        raise self.basic_type_error(subtype, supertype)
+        return self.unification_failed(subtype, supertype, mapping)
 
     def unify_struct_types(
         self, subtype: nodes.StructType, supertype: nodes.StructType, mapping: Mapping
-    ) -> UnificationResult:
-        base_result = self.unify_types(subtype.name, supertype.name, mapping)
+    ) -> UnificationOutcome:
+        base_result = self.try_unify_types(subtype.name, supertype.name, mapping)
+        if isinstance(base_result, UnificationFailure):
+            return base_result
         mapping = base_result.mapping
         parameters = []
         for param1, param2 in zip(subtype.parameters, supertype.parameters):
-            try:
-                param_result = self.unify_types(param1, param2, mapping)
-            except errors.AngelTypeError:
-                raise self.basic_type_error(subtype, supertype)
-            else:
-                mapping = param_result.mapping
-                parameters.append(param_result.type)
+            param_result = self.try_unify_types(param1, param2, mapping)
+            if isinstance(param_result, UnificationFailure):
+                return self.unification_failed(subtype, supertype, mapping)
+            mapping = param_result.mapping
+            parameters.append(param_result.type)
         return UnificationResult(nodes.StructType(base_result.type, parameters), mapping)
 
     def unify_generic_types(
         self, subtype: nodes.GenericType, supertype: nodes.GenericType, mapping: Mapping
-    ) -> UnificationResult:
-        base_result = self.unify_types(subtype.name, supertype.name, mapping)
+    ) -> UnificationOutcome:
+        base_result = self.try_unify_types(subtype.name, supertype.name, mapping)
+        if isinstance(base_result, UnificationFailure):
+            return base_result
         mapping = base_result.mapping
         parameters = []
         for param1, param2 in zip(subtype.parameters, supertype.parameters):
-            try:
-                param_result = self.unify_types(param1, param2, mapping)
-            except errors.AngelTypeError:
-                raise self.basic_type_error(subtype, supertype)
-            else:
-                mapping = param_result.mapping
-                parameters.append(param_result.type)
+            param_result = self.try_unify_types(param1, param2, mapping)
+            if isinstance(param_result, UnificationFailure):
+                return self.unification_failed(subtype, supertype, mapping)
+            mapping = param_result.mapping
+            parameters.append(param_result.type)
         return UnificationResult(nodes.GenericType(base_result.type, parameters), mapping)
 
     def unify_ref_types(
         self, subtype: nodes.RefType, supertype: nodes.RefType, mapping: Mapping
-    ) -> UnificationResult:
-        try:
-            value_result = self.unify_types(subtype.value_type, supertype.value_type, mapping)
-        except errors.AngelTypeError:
-            raise self.basic_type_error(subtype, supertype)
-        else:
-            return UnificationResult(nodes.RefType(value_result.type), value_result.mapping)
+    ) -> UnificationOutcome:
+        value_result = self.try_unify_types(subtype.value_type, supertype.value_type, mapping)
+        if isinstance(value_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        return UnificationResult(nodes.RefType(value_result.type), value_result.mapping)
 
     def unify_algebraic_types(
         self, subtype: nodes.AlgebraicType, supertype: nodes.AlgebraicType, mapping: Mapping
-    ) -> UnificationResult:
-        try:
-            base_result = self.unify_types(subtype.base, supertype.base, mapping)
-        except errors.AngelTypeError:
-            raise self.basic_type_error(subtype, supertype)
-        else:
-            mapping = base_result.mapping
+    ) -> UnificationOutcome:
+        base_result = self.try_unify_types(subtype.base, supertype.base, mapping)
+        if isinstance(base_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        mapping = base_result.mapping
 
         parameters = []
         for param1, param2 in zip(subtype.parameters, supertype.parameters):
-            try:
-                param_result = self.unify_types(param1, param2, mapping)
-            except errors.AngelTypeError:
-                raise self.basic_type_error(subtype, supertype)
-            else:
-                mapping = param_result.mapping
-                parameters.append(param_result.type)
+            param_result = self.try_unify_types(param1, param2, mapping)
+            if isinstance(param_result, UnificationFailure):
+                return self.unification_failed(subtype, supertype, mapping)
+            mapping = param_result.mapping
+            parameters.append(param_result.type)
 
         return UnificationResult(
             nodes.AlgebraicType(base_result.type, parameters, subtype.constructor, supertype.constructor_types),
@@ -1205,39 +1334,37 @@ class TypeChecker(unittest.TestCase):
 
     def unify_dict_types(
         self, subtype: nodes.DictType, supertype: nodes.DictType, mapping: Mapping
-    ) -> UnificationResult:
-        try:
-            key_result = self.unify_types(subtype.key_type, supertype.key_type, mapping=mapping)
-            value_result = self.unify_types(subtype.value_type, supertype.value_type, mapping=key_result.mapping)
-            return UnificationResult(nodes.DictType(key_result.type, value_result.type), value_result.mapping)
-        except errors.AngelTypeError:
-            raise self.basic_type_error(subtype, supertype)
+    ) -> UnificationOutcome:
+        key_result = self.try_unify_types(subtype.key_type, supertype.key_type, mapping=mapping)
+        if isinstance(key_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        value_result = self.try_unify_types(subtype.value_type, supertype.value_type, mapping=key_result.mapping)
+        if isinstance(value_result, UnificationFailure):
+            return self.unification_failed(subtype, supertype, mapping)
+        return UnificationResult(nodes.DictType(key_result.type, value_result.type), value_result.mapping)
 
-    def unification_failed(self, subtype: nodes.Type, supertype: nodes.Type, mapping: Mapping) -> UnificationResult:
-        raise self.basic_type_error(subtype, supertype)
+    def unification_failed(self, subtype: nodes.Type, supertype: nodes.Type, mapping: Mapping) -> UnificationOutcome:
+        return UnificationFailure(subtype, supertype, [subtype])
 
     def unify_template_types(
         self, subtype: nodes.TemplateType, supertype: nodes.TemplateType, mapping: Mapping
-    ) -> UnificationResult:
-        real_type = self.template_types[subtype.id] or self.template_types[supertype.id]
-        self.template_types[subtype.id] = real_type
-        self.template_types[supertype.id] = real_type
+    ) -> UnificationOutcome:
+        real_type = self.template_types.union(subtype.id, supertype.id)
         return UnificationResult(real_type or subtype, mapping)
 
-    def unify_list_types(
+    def try_unify_list_types(
         self, subtypes: t.Sequence[nodes.Type], supertype: t.Optional[nodes.Type], mapping: Mapping
-    ) -> UnificationResult:
+    ) -> UnificationOutcome:
+        """Unify the first of subtypes that unifies with supertype."""
         fail = None
         for subtype in subtypes:
-            try:
-                result = self.unify_types(subtype, supertype, mapping=mapping)
-            except errors.AngelTypeError as e:
-                fail = e
-            else:
+            result = self.try_unify_types(subtype, supertype, mapping=mapping)
+            if not isinstance(result, UnificationFailure):
                 return result
+            fail = result
         if fail is not None:
-            raise errors.AngelTypeError(fail.message, self.code, list(subtypes))
-        raise errors.AngelTypeError("no subtypes to unify", self.code, list(subtypes))
+            return UnificationFailure(fail.subtype, fail.supertype, list(subtypes))
+        return UnificationFailure(None, supertype, list(subtypes))
 
     def is_operator(self, implemented_interfaces: nodes.Interfaces, interface: nodes.BuiltinType) -> bool:
         def get_interface(interface: nodes.BuiltinType) -> entries.InterfaceEntry:
@@ -1254,15 +1381,15 @@ class TypeChecker(unittest.TestCase):
                 return True
         return False
 
-    def basic_type_error(self, subtype: nodes.Type, supertype: nodes.Type) -> errors.AngelTypeError:
-        return errors.AngelTypeError(
-            f"{supertype.to_code()} is not a supertype of {subtype.to_code()}", self.code, [subtype]
-        )
+    def unification_error(self, failure: UnificationFailure) -> errors.AngelTypeError:
+        if failure.subtype is None:
+            message = "no subtypes to unify"
+        else:
+            message = f"{failure.supertype.to_code()} is not a supertype of {failure.subtype.to_code()}"
+        return errors.AngelTypeError(message, self.code, failure.possible_types)
 
     def create_template_type(self) -> nodes.TemplateType:
-        self.template_types.append(None)
-        self.template_type_id += 1
-        return nodes.TemplateType(self.template_type_id)
+        return nodes.TemplateType(self.template_types.new())
 
     def update_context(self, env: environment.Environment, code: errors.Code):
         self.env = env
@@ -1281,18 +1408,26 @@ class TypeChecker(unittest.TestCase):
         return result
 
     def replace_template_types(self, from_type: nodes.Type) -> nodes.Type:
+        if isinstance(from_type, nodes.InternedType) and from_type._interned and not _has_template_types(from_type):
+            return from_type
         return dispatch(self.replace_template_types_dispatcher, type(from_type), from_type)
 
     def replace_template_types_template_type(self, template_type: nodes.TemplateType) -> nodes.Type:
         return self.template_types[template_type.id] or template_type
 
     def eval_is(self, subtype: nodes.Type, supertype: nodes.Type, mapping: Mapping) -> bool:
-        try:
-            self.unify_types(subtype, supertype, mapping)
-        except errors.AngelTypeError:
-            return False
-        else:
-            return True
+        return not isinstance(self.try_unify_types(subtype, supertype, mapping), UnificationFailure)
+
+    def is_global_type(self, type_: nodes.Type) -> bool:
+        """Whether the type means the same in every scope: a context free type or a name of a struct.
+
+        Checking that such a type is a subtype of another one neither reads nor changes the mapping and template
+        types, so the result can be saved.
+
+        """
+        if isinstance(type_, nodes.Name):
+            return not type_.module and isinstance(self.env[type_.member], entries.StructEntry)
+        return is_context_free(type_)
 
     def eval_where_clause(self, clause: nodes.Expression, mapping: Mapping) -> bool:
         if isinstance(clause, nodes.BinaryExpression):
@@ -1301,7 +1436,13 @@ class TypeChecker(unittest.TestCase):
                 assert isinstance(clause.right, nodes.Type)
                 left_type = apply_mapping(clause.left, mapping)
                 right_type = apply_mapping(clause.right, mapping)
-                return self.eval_is(left_type, right_type, mapping)
+                if not (self.is_global_type(left_type) and self.is_global_type(right_type)):
+                    return self.eval_is(left_type, right_type, mapping)
+                key = (nodes.type_key(left_type), nodes.type_key(right_type))
+                result = self.context.where_clause_results.get(key)
+                if result is None:
+                    result = self.context.where_clause_results[key] = self.eval_is(left_type, right_type, mapping)
+                return result
             else:
                 assert 0, f"Cannot eval not 'is' expression"
         else:
@@ -1,3 +1,4 @@
+import sys
 import typing as t
 import hashlib
 
@@ -16,30 +17,48 @@ def dispatch(dispatcher, key, *arguments):
     return func(*arguments)
 
 
-def get_hash(string: str) -> str:
+def get_hash(string: str, length: int = 6) -> str:
     md5 = hashlib.new('md5')
     md5.update(string.encode('utf-8'))
-    return md5.hexdigest()[:6]
+    return md5.hexdigest()[:length]
+
+
+def read_module(module: str) -> str:
+    with open(module + '.angel') as file:
+        return file.read()
+
+
+def module_hash(module: str, context: Context) -> str:
+    """Return hash of the imported module, adding the module to the context when it is met for the first time."""
+    hash_ = context.module_hashs.get(module)
+    if not hash_:
+        content = read_module(module)
+        hash_ = context.module_hashs[module] = get_hash(content)
+        context.imported_lines[module] = content
+    return hash_
 
 
 def mangle(name: nodes.Name, context: Context) -> nodes.Name:
     if context.mangle_names:
-        if name.module:
-            module_hash = context.module_hashs.get(name.module)
-            if not module_hash:
-                with open(name.module + '.angel') as file:
-                    content = file.read()
-                module_hash = get_hash(content)
-                context.module_hashs[name.module] = module_hash
-                context.imported_lines[name.module] = content
-            return nodes.Name('_'.join(('angel', module_hash, name.member)), unmangled=name.member)
-        return nodes.Name('_'.join(['angel', context.main_hash, name.member]), unmangled=name.member)
+        key = (name.module, context.main_hash, name.member)
+        member = context.mangled_members.get(key)
+        if member is None:
+            if name.module:
+                member = sys.intern('_'.join(('angel', module_hash(name.module, context), name.member)))
+            else:
+                member = sys.intern('_'.join(['angel', context.main_hash, name.member]))
+            context.mangled_members[key] = member
+        return nodes.Name(member, unmangled=name.member)
     return name
 
 
 def submangle(name: nodes.Name, context: Context) -> nodes.Name:
     if context.mangle_names:
-        return nodes.Name('_'.join(['angel', name.member]), unmangled=name.member)
+        key = (None, None, name.member)
+        member = context.mangled_members.get(key)
+        if member is None:
+            member = context.mangled_members[key] = sys.intern('_'.join(['angel', name.member]))
+        return nodes.Name(member, unmangled=name.member)
     return name
 
 
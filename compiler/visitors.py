@@ -0,0 +1,119 @@
+"""Traversal shared by compiler stages.
+
+A stage declares each of its dispatchers once, at class level, with Dispatcher: a mapping from node class to the
+name of a handler method or to a function taking (stage, node, *arguments). Handlers are resolved once per stage
+class (so subclasses get their overridden methods) instead of being rebuilt as bound methods in every __init__.
+
+All stages derive from Visitor, which calls the handler registered in node_dispatcher for the class of a node.
+Transformer (used by Clarifier) also traverses nodes without a handler, field by field (nodes.node_fields), and
+rebuilds them only if a child was replaced, or replaces the children in place. walk iterates over a whole tree for
+the passes that only collect or update something in every node:
+
+    class Stage(Visitor):
+        node_dispatcher = Dispatcher({nodes.Decl: 'visit_decl', nodes.Break: lambda self, node: None})
+
+"""
+import enum
+import typing as t
+
+from . import nodes, errors
+
+
+Handler = t.Union[str, t.Callable[..., t.Any]]
+
+AST_OBJECTS = (nodes.Node, nodes.Expression, nodes.Type, nodes.Argument, nodes.DeclaredFields, nodes.DeclaredMethods)
+LEAVES = (str, int, enum.Enum)
+
+
+class Dispatcher:
+    """Class-level dispatcher resolved into a plain dict of functions for each class it is accessed from."""
+
+    def __init__(self, handlers: t.Mapping[t.Any, Handler]):
+        self.handlers = dict(handlers)
+        self.name = ""
+        self._tables: t.Dict[type, t.Dict[t.Any, t.Callable[..., t.Any]]] = {}
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: t.Any, owner: type) -> t.Dict[t.Any, t.Callable[..., t.Any]]:
+        cls = type(instance) if instance is not None else owner
+        table = self._tables.get(cls)
+        if table is None:
+            table = self._tables[cls] = {
+                key: getattr(cls, handler) if isinstance(handler, str) else handler
+                for key, handler in self.handlers.items()
+            }
+        if instance is not None:
+            # Later lookups are plain instance attribute lookups: Dispatcher is a non-data descriptor.
+            instance.__dict__[self.name] = table
+        return table
+
+
+def is_ast_object(value: t.Any) -> bool:
+    return isinstance(value, AST_OBJECTS) and not isinstance(value, enum.Enum)
+
+
+def walk(tree: t.Any) -> t.Iterator[t.Any]:
+    """Yield every node of the tree once (nodes shared by several parents too), parents first, in source order."""
+    seen: t.Set[int] = set()
+    stack = [tree]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
+        elif is_ast_object(value) and id(value) not in seen:
+            seen.add(id(value))
+            yield value
+            stack.extend(reversed([getattr(value, name) for name in nodes.node_fields(type(value))]))
+
+
+class Visitor:
+    """Calls the handler registered in node_dispatcher for the class of the node, or generic_visit."""
+
+    node_dispatcher: t.ClassVar[t.Any] = Dispatcher({})
+
+    def visit(self, node, *arguments):
+        handler = self.node_dispatcher.get(type(node))
+        if handler is None:
+            return self.generic_visit(node, *arguments)
+        return handler(self, node, *arguments)
+
+    def generic_visit(self, node, *arguments):
+        raise errors.AngelNotImplemented(f'cannot dispatch {type(node)}')
+
+
+class Transformer(Visitor):
+    """Rebuilds trees bottom-up, reallocating only nodes that have a replaced child.
+
+    Nodes without a handler are traversed field by field. A node none of whose children was replaced is returned as
+    is, so the result shares unchanged subtrees with the input. With in_place set, replaced children are assigned to
+    the existing nodes and lists instead of copying them.
+
+    """
+
+    in_place = False
+
+    def generic_visit(self, node, *arguments):
+        if node is None or isinstance(node, LEAVES):
+            return node
+        if isinstance(node, (list, tuple)):
+            elements = [self.visit(element) for element in node]
+            if not any(new is not old for new, old in zip(elements, node)):
+                return node
+            if self.in_place and isinstance(node, list):
+                node[:] = elements
+                return node
+            return type(node)(elements)
+
+        names = nodes.node_fields(type(node))
+        old_values = [getattr(node, name) for name in names]
+        new_values = [self.visit(value) for value in old_values]
+        if not any(new is not old for new, old in zip(new_values, old_values)):
+            return node
+        if self.in_place:
+            for name, new, old in zip(names, new_values, old_values):
+                if new is not old:
+                    setattr(node, name, new)
+            return node
+        return type(node)(*new_values)
@@ -8,9 +8,22 @@ def main():
     argparser = argparse.ArgumentParser()
     argparser.add_argument("in_file", nargs="?", default=None, type=argparse.FileType(encoding="utf-8"))
     argparser.add_argument("--unmangle-names", action='store_true', default=False)
+    argparser.add_argument(
+        "--check", action='store_true', default=False,
+        help="only check the code for errors, without estimating values at compile time and translating it"
+    )
+    argparser.add_argument(
+        "--cache-dir", default=None, help="directory for the cache of parsed modules and analyzed functions"
+    )
     arguments = argparser.parse_args()
 
-    if arguments.in_file:
+    if arguments.cache_dir:
+        compiler.ast_cache.enable(arguments.cache_dir)
+        compiler.analysis_cache.enable(arguments.cache_dir)
+
+    if arguments.in_file and arguments.check:
+        compiler.check_string(arguments.in_file.read(), not arguments.unmangle_names)
+    elif arguments.in_file:
         print(compiler.compile_string(arguments.in_file.read(), not arguments.unmangle_names))
     else:
         compiler.repl()
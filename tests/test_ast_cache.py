@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import compiler
+from compiler import nodes, ast_cache, clarification, testutils
+from compiler.context import Context
+
+
+class TestASTCache(unittest.TestCase):
+    code = "let a = 1\nfun f() -> I8:\n    return 2\nprint(a)\n"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ast_cache.enable(self.directory.name)
+
+    def tearDown(self):
+        ast_cache.disable()
+        self.directory.cleanup()
+
+    def clarified(self, mangle_names: bool = False) -> nodes.AST:
+        context = Context(self.code.split("\n"), main_hash="abc", mangle_names=mangle_names)
+        return list(ast_cache.parse_and_clarify(self.code, context, clarification.Clarifier(context)))
+
+    def test_hit(self):
+        expected = self.clarified()
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=0, misses=1))
+        self.assertEqual(self.clarified(), expected)
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=1, misses=1))
+
+    def test_context_is_part_of_key(self):
+        self.clarified()
+        self.assertNotEqual(self.clarified(mangle_names=True), self.clarified())
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=1, misses=2))
+
+    def test_imported_module(self):
+        code = "let a: I32 = 3\nprint(a)\n\nfun g(x: I32) -> I32:\n    return foo#double(x)\n\nprint(g(a))\n"
+        modules = {
+            "foo": "fun double(x: I32) -> I32:\n    return x * 2\n",
+            "bar": "fun triple(x: I32) -> I32:\n    return x * 3\n",
+        }
+        with testutils.modules_directory(modules) as directory:
+            ast_cache.disable()
+            expected = compiler.compile_string(code)
+            self.cache = ast_cache.enable(self.directory.name)
+            self.assertIn("angel_", expected)
+            self.assertEqual(compiler.compile_string(code), expected)
+            self.assertEqual(compiler.compile_string(code), expected)
+            # The builtins, the code and foo.
+            self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=3, misses=3))
+            # The code does not import bar, so its entry stays valid.
+            with open(os.path.join(directory, "bar.angel"), "a", encoding="utf-8") as file:
+                file.write("\nfun quadruple(x: I32) -> I32:\n    return x * 4\n")
+            self.assertEqual(compiler.compile_string(code), expected)
+            self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=6, misses=3))
+
+    def test_disabled(self):
+        ast_cache.disable()
+        self.assertEqual(self.clarified(), self.clarified())
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from compiler import nodes, clarification, utils
+from compiler.context import Context
+from compiler.parsers import Parser
+
+
+class TestClarifier(unittest.TestCase):
+    def test_clarifier_shares_unchanged_nodes(self):
+        ast = Parser().parse("let a = 1 + 2\nprint(a)\n")
+        original = repr(ast)
+        clarified = list(clarification.Clarifier(Context([], "", mangle_names=False)).clarify_ast(ast))
+        self.assertIs(clarified[0].value, ast[0].value)
+        self.assertIsNot(clarified[1], ast[1])
+        self.assertIsInstance(clarified[1].function_path, nodes.BuiltinFunc)
+        self.assertEqual(repr(ast), original)
+
+    def test_mangled_names(self):
+        context = Context([], "hash", mangle_names=True)
+        first = utils.mangle(nodes.Name("value"), context)
+        second = utils.mangle(nodes.Name("value"), context)
+        self.assertIsNot(first, second)
+        self.assertIs(first.member, second.member)
+        self.assertEqual(first.member, "angel_hash_value")
+        self.assertIs(
+            utils.submangle(nodes.Name("a"), context).member, utils.submangle(nodes.Name("a"), context).member
+        )
+
+
+class TestReservedNames(unittest.TestCase):
+    def test_same_as_enum_constructors(self):
+        for identifier, member in clarification.RESERVED_NAMES.items():
+            for cls in clarification.NAME_ENUMS:
+                try:
+                    expected = cls(identifier)
+                except ValueError:
+                    continue
+                self.assertIs(member, expected)
+                break
+
+    def test_clarify(self):
+        clarifier = clarification.Clarifier(Context([], "hash", mangle_names=True))
+        self.assertIs(clarifier.visit(nodes.Name("I32")), nodes.BuiltinType.i32)
+        self.assertIs(clarifier.visit(nodes.Name("True")), nodes.BoolLiteral.true)
+        self.assertEqual(clarifier.visit(nodes.Name("value")).member, "angel_hash_value")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from copy import copy
+
+from compiler import nodes, environment_entries as entries
+from compiler.enums import DeclType
+from compiler.environment import Environment
+
+
+class EnvironmentTestCase(unittest.TestCase):
+    def declare(self, env, name, value):
+        env.add_declaration(nodes.Decl(1, DeclType.constant, nodes.Name(name), nodes.BuiltinType.i32,
+                                       nodes.IntegerLiteral(value)))
+
+    def value(self, env, name):
+        entry = env[name]
+        return entry.value.value if entry else None
+
+
+class TestSavedEnvironment(EnvironmentTestCase):
+    def test_saved_environment_does_not_change(self):
+        env = Environment()
+        self.declare(env, "a", "1")
+        env.inc_nesting()
+        self.declare(env, "b", "2")
+        saved = env.save()
+        self.declare(env, "b", "3")
+        self.declare(env, "c", "4")
+        env.dec_nesting()
+        self.declare(env, "a", "5")
+
+        restored = Environment(saved)
+        self.assertEqual([self.value(restored, name) for name in "abc"], ["1", "2", None])
+        self.assertEqual([self.value(env, name) for name in "abc"], ["5", None, None])
+
+    def test_restored_environment_does_not_change_saved_one(self):
+        env = Environment()
+        self.declare(env, "a", "1")
+        saved = env.save()
+        restored = Environment(saved)
+        self.declare(restored, "a", "2")
+        self.assertEqual(self.value(restored, "a"), "2")
+        self.assertEqual(self.value(Environment(saved), "a"), "1")
+        self.assertEqual(self.value(env, "a"), "1")
+
+    def test_saves_are_shared(self):
+        env = Environment()
+        self.declare(env, "a", "1")
+        self.assertIs(env.save(), env.save())
+        env.add_function(1, nodes.Name("f"), [], [], nodes.BuiltinType.void, None)
+        env.add_function(2, nodes.Name("g"), [], [], nodes.BuiltinType.void, None)
+        f, g = env["f"], env["g"]
+        assert isinstance(f, entries.FunctionEntry) and isinstance(g, entries.FunctionEntry)
+        self.assertIsNot(f.saved_environment, g.saved_environment)
+        self.assertIs(f.saved_environment.bindings, g.saved_environment.bindings)
+        self.assertIsNone(Environment(f.saved_environment)["f"])
+        self.assertIs(Environment(g.saved_environment)["f"], f)
+
+    def test_unsaved_bindings_are_replaced(self):
+        env = Environment()
+        for value in range(100):
+            self.declare(env, "a", str(value))
+        self.assertEqual(len(env.scope.bindings["a"]), 1)
+        saved = env.save()
+        self.declare(env, "a", "100")
+        self.declare(env, "a", "101")
+        self.assertEqual(len(env.scope.bindings["a"]), 2)
+        self.assertEqual(self.value(Environment(saved), "a"), "99")
+        self.assertEqual(self.value(env, "a"), "101")
+
+
+class TestResolvedLookups(EnvironmentTestCase):
+    def test_shadowing_after_lookup(self):
+        env = Environment()
+        self.declare(env, "a", "1")
+        env.inc_nesting()
+        self.assertEqual(self.value(env, "a"), "1")
+        self.declare(env, "a", "2")
+        self.assertEqual(self.value(env, "a"), "2")
+        env.dec_nesting()
+        self.assertEqual(self.value(env, "a"), "1")
+
+    def test_lookup_in_left_scope(self):
+        env = Environment()
+        env.inc_nesting()
+        self.declare(env, "a", "1")
+        self.assertEqual(self.value(env, "a"), "1")
+        env.dec_nesting()
+        self.assertIsNone(env["a"])
+
+    def test_outer_names_stay_resolved_after_leaving_scope(self):
+        env = Environment()
+        self.declare(env, "a", "1")
+        env.inc_nesting()
+        self.declare(env, "b", "2")
+        self.assertEqual([self.value(env, name) for name in "ab"], ["1", "2"])
+        env.dec_nesting()
+        self.assertEqual(list(env._resolved), ["a"])
+        self.assertEqual([self.value(env, name) for name in "ab"], ["1", None])
+
+    def test_copies_resolve_separately(self):
+        env = Environment()
+        self.declare(env, "a", "1")
+        backup = copy(env)
+        env.inc_nesting()
+        self.declare(env, "a", "2")
+        self.assertEqual(self.value(env, "a"), "2")
+        self.assertEqual(self.value(backup, "a"), "1")
+
+
+class TestRequiredData(EnvironmentTestCase):
+    def setUp(self):
+        self.env = Environment()
+        self.env.add_interface(1, nodes.Name("I"), [], [])
+        self.env.parents.append(nodes.Name("I"))
+        self.env.add_method(2, nodes.Name("first"), [], nodes.BuiltinType.void)
+        self.env.parents.pop()
+        self.env.add_where_clause(nodes.BinaryExpression(nodes.Name("T"), nodes.Operator.is_, nodes.Name("I")))
+
+    def test_saved(self):
+        interfaces, fields, methods = self.env.get_required_data_from_where_clauses(nodes.Name("T"))
+        self.assertEqual((interfaces, list(methods)), ([nodes.Name("I")], ["first"]))
+        interfaces.append(nodes.BuiltinType.eq)
+        self.assertEqual(self.env.get_required_data_from_where_clauses(nodes.Name("T"))[0], [nodes.Name("I")])
+        self.assertEqual(len(self.env._required_data), 1)
+
+    def test_forgotten_when_interface_changes(self):
+        self.env.get_required_data_from_where_clauses(nodes.Name("T"))
+        self.env.parents.append(nodes.Name("I"))
+        self.env.add_method(3, nodes.Name("second"), [], nodes.BuiltinType.void)
+        self.env.parents.pop()
+        _, _, methods = self.env.get_required_data_from_where_clauses(nodes.Name("T"))
+        self.assertEqual(list(methods), ["first", "second"])
+
+
+if __name__ == '__main__':
+    unittest.main()
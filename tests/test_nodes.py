@@ -0,0 +1,42 @@
+import copy
+import gc
+import pickle
+import unittest
+
+from compiler import nodes
+
+
+class TestInternedTypes(unittest.TestCase):
+    def test_equal_types_are_identical(self):
+        vector = nodes.VectorType(nodes.Name("a"))
+        self.assertIs(vector, nodes.VectorType(nodes.Name("a")))
+        generic = nodes.GenericType(nodes.Name("G"), [vector, nodes.BuiltinType.i32])
+        same_generic = nodes.GenericType(nodes.Name("G"), [nodes.VectorType(nodes.Name("a")), nodes.BuiltinType.i32])
+        self.assertIs(generic, same_generic)
+        self.assertIsNot(generic, nodes.GenericType(nodes.Name("G"), [vector, nodes.BuiltinType.i64]))
+        self.assertEqual({generic: 1}[generic], 1)
+
+    def test_copies_are_interned(self):
+        dict_type = nodes.DictType(nodes.BuiltinType.string, nodes.OptionalType(nodes.Name("a")))
+        self.assertIs(pickle.loads(pickle.dumps(dict_type)), dict_type)
+        self.assertIs(copy.deepcopy(dict_type), dict_type)
+
+    def test_unused_types_are_dropped(self):
+        interned = len(nodes.INTERNED_TYPES)
+        vector = nodes.VectorType(nodes.OptionalType(nodes.Name("unused")))
+        self.assertEqual(len(nodes.INTERNED_TYPES), interned + 2)
+        del vector
+        gc.collect()
+        self.assertEqual(len(nodes.INTERNED_TYPES), interned)
+
+    def test_not_internable(self):
+        first = nodes.VectorType(nodes.FunctionType([], [], nodes.BuiltinType.i32))
+        second = nodes.VectorType(nodes.FunctionType([], [], nodes.BuiltinType.i32))
+        self.assertIsNot(first, second)
+        self.assertEqual(first, second)
+        with self.assertRaises(TypeError):
+            hash(first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,82 +1,215 @@
 import unittest
+from unittest import mock
 
-from compiler import nodes
-from compiler.parsers import build_binary_expression
+import compiler
+from compiler import nodes, lexer, errors, testutils
+from compiler.parsers import Parser
 
 
-class TestEval(unittest.TestCase):
-    def setUp(self):
-        super().setUp()
+class TestLexer(unittest.TestCase):
+    def kinds(self, code: str):
+        tokens = lexer.tokenize(code)
+        return [tokens.kind(idx) for idx in range(len(tokens))]
 
-    def build(self, binary_expression: nodes.BinaryExpression) -> nodes.Expression:
-        return build_binary_expression(binary_expression.left, binary_expression.operator, binary_expression.right)
+    def test_tokens(self):
+        tokens = lexer.tokenize('let a = "b // c" // d\nprint(12)')
+        self.assertEqual(
+            [tokens.text(idx) for idx in range(len(tokens))], ["let", "a", "=", '"b // c"', "print", "(", "12", ")", ""]
+        )
+        K = lexer.TokenKind
+        self.assertEqual(
+            self.kinds("if a:\n    b\nc"), [K.name, K.name, K.operator, K.indent, K.name, K.dedent, K.name, K.eof]
+        )
 
-    def test_build_binary_expression_simple(self):
-        inp = nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.add, nodes.Name('b'))
-        self.assertEqual(self.build(inp), inp)
+    def test_layout(self):
+        K = lexer.TokenKind
+        code = "if a:\n        b\n  // c\n\n    d\n"
+        self.assertEqual(self.kinds(code), [
+            K.name, K.name, K.operator, K.indent, K.indent, K.name, K.dedent, K.name, K.dedent, K.eof
+        ])
+        tokens = lexer.tokenize(code)
+        self.assertEqual([tokens.line_level(idx) for idx in (0, 3, 6)], [0, 2, 1])
 
-    def test_build_binary_expression_nested_same_op(self):
-        inp_l = nodes.BinaryExpression(
-            nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.add, nodes.Name('b')),
-            nodes.Operator.add, nodes.Name('c')
-        )
-        self.assertEqual(self.build(inp_l), inp_l)
+    def test_skip_trivia(self):
+        tokens = lexer.tokenize("let ab = 1  // c\n\nd")
+        self.assertEqual(tokens.offsets[tokens.skip_trivia(3)], 4)
+        self.assertEqual(tokens.offsets[tokens.skip_trivia(10)], 18)
+        self.assertIsNone(tokens.skip_trivia(5))
 
-        inp = nodes.BinaryExpression(
-            nodes.Name('a'), nodes.Operator.add,
-            nodes.BinaryExpression(nodes.Name('b'), nodes.Operator.add, nodes.Name('c'))
+    def test_parse_with_comments(self):
+        ast = Parser().parse("let a = 1  // one\n\n// two\nlet b = a / 2\nif b:\n    print(b)\n")
+        self.assertEqual([node.line for node in ast], [1, 4, 5])
+        self.assertEqual(
+            ast[1].value, nodes.BinaryExpression(nodes.Name("a"), nodes.Operator.div, nodes.IntegerLiteral("2"))
         )
-        self.assertEqual(self.build(inp), inp_l)
 
-        inp = nodes.BinaryExpression(
-            nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.add, nodes.Name('b')),
-            nodes.Operator.add, nodes.BinaryExpression(nodes.Name('c'), nodes.Operator.add, nodes.Name('d'))
-        )
-        expected = nodes.BinaryExpression(
-            nodes.BinaryExpression(
-                nodes.BinaryExpression(
-                    nodes.Name('a'), nodes.Operator.add, nodes.Name('b')
-                ), nodes.Operator.add, nodes.Name('c')
-            ), nodes.Operator.add, nodes.Name('d')
-        )
-        self.assertEqual(self.build(inp), expected)
+    def test_comments_in_body(self):
+        ast = Parser().parse("if a:\n    // one\n    print(1)\n// two\n    print(2)\nprint(3)\n")
+        self.assertEqual([node.line for node in ast[0].body], [3, 5])
+        self.assertEqual([node.line for node in ast], [1, 6])
 
-    def test_build_binary_expression_nested_diff_op(self):
-        inp_l = nodes.BinaryExpression(
-            nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.mul, nodes.Name('b')),
-            nodes.Operator.add, nodes.Name('c')
-        )
-        self.assertEqual(self.build(inp_l), inp_l)
+    def test_keywords_are_whole_names(self):
+        ast = Parser().parse("format(1)\niffy(2)\n")
+        self.assertEqual([node.function_path for node in ast], [nodes.Name("format"), nodes.Name("iffy")])
 
-        inp = nodes.BinaryExpression(
-            nodes.Name('a'), nodes.Operator.mul,
-            nodes.BinaryExpression(nodes.Name('b'), nodes.Operator.add, nodes.Name('c'))
-        )
-        self.assertEqual(self.build(inp), inp_l)
 
-        inp = nodes.BinaryExpression(
-            nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.mul, nodes.Name('b')),
-            nodes.Operator.add, nodes.BinaryExpression(nodes.Name('c'), nodes.Operator.mul, nodes.Name('d'))
-        )
-        self.assertEqual(self.build(inp), inp)
+class TestPositions(unittest.TestCase):
+    def test_error_position(self):
+        with self.assertRaises(errors.AngelSyntaxError) as context:
+            Parser().parse('let a = "b\nc"\nlet d = (1 + ]\n')
+        self.assertEqual((context.exception.code.line, context.exception.code.column), (3, 14))
 
-        inp = nodes.BinaryExpression(
-            nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.add, nodes.Name('b')),
-            nodes.Operator.add, nodes.BinaryExpression(nodes.Name('c'), nodes.Operator.mul, nodes.Name('d'))
+    def test_lines(self):
+        ast = Parser().parse('print("a\n\nb")\n\n// c\nlet d = 1\n')
+        self.assertEqual([node.line for node in ast], [1, 6])
+
+
+class TestExpressionParser(unittest.TestCase):
+    def parse(self, code: str) -> nodes.Expression:
+        ast = Parser().parse("let a = " + code)
+        return ast[0].value
+
+    def test_left_associative(self):
+        a, b, c, d = (nodes.Name(name) for name in "abcd")
+        sub = nodes.Operator.sub
+        self.assertEqual(
+            self.parse("a - b - c - d"),
+            nodes.BinaryExpression(nodes.BinaryExpression(nodes.BinaryExpression(a, sub, b), sub, c), sub, d)
         )
-        self.assertEqual(self.build(inp), inp)
 
-        inp = nodes.BinaryExpression(
-            nodes.BinaryExpression(nodes.Name('a'), nodes.Operator.add, nodes.Name('b')),
-            nodes.Operator.mul, nodes.BinaryExpression(nodes.Name('c'), nodes.Operator.mul, nodes.Name('d'))
+    def test_priority(self):
+        a, b, c, d = (nodes.Name(name) for name in "abcd")
+        self.assertEqual(
+            self.parse("a + b * c == d"),
+            nodes.BinaryExpression(
+                nodes.BinaryExpression(a, nodes.Operator.add, nodes.BinaryExpression(b, nodes.Operator.mul, c)),
+                nodes.Operator.eq_eq, d
+            )
         )
-        expected = nodes.BinaryExpression(
-            nodes.Name('a'), nodes.Operator.add, nodes.BinaryExpression(
-                nodes.BinaryExpression(nodes.Name('b'), nodes.Operator.mul, nodes.Name('c')),
-                nodes.Operator.mul, nodes.Name('d')
+        self.assertEqual(
+            self.parse("a is b and c + d < a"),
+            nodes.BinaryExpression(
+                nodes.BinaryExpression(a, nodes.Operator.is_, b), nodes.Operator.and_,
+                nodes.BinaryExpression(nodes.BinaryExpression(c, nodes.Operator.add, d), nodes.Operator.lt, a)
             )
         )
-        self.assertEqual(self.build(inp), expected)
+
+    def test_long_chain(self):
+        expression = self.parse(" + ".join(str(i) for i in range(5000)))
+        depth = 0
+        while isinstance(expression, nodes.BinaryExpression):
+            self.assertEqual(expression.right, nodes.IntegerLiteral(str(4999 - depth)))
+            expression = expression.left
+            depth += 1
+        self.assertEqual(depth, 4999)
+
+
+class TestIterParse(unittest.TestCase):
+    def test_yields_before_the_rest_is_parsed(self):
+        statements = Parser().iter_parse("let a = 1\nlet b = 2\nlet = 3\n")
+        self.assertEqual(next(statements).line, 1)
+        self.assertEqual(next(statements).line, 2)
+        with self.assertRaises(errors.AngelSyntaxError):
+            next(statements)
+
+
+class TestInterning(unittest.TestCase):
+    def test_identifiers(self):
+        first, second = Parser().parse("let value = 1\nprint(value)\n")
+        self.assertIs(first.name.member, second.arguments[0].member)
+
+
+class TestParseModules(unittest.TestCase):
+    MODULES = {
+        "foo": "fun double(x: I32) -> I32:\n    return baz#add(x, x)\n",
+        "bar": "fun triple(x: I32) -> I32:\n    return x * 3\n",
+        "baz": "fun add(x: I32, y: I32) -> I32:\n    return x + y\n",
+    }
+    CODE = "let a: I32 = foo#double(3)\nprint(bar#triple(a))\n"
+
+    def setUp(self):
+        # Parse in worker processes whatever the size of the modules and the number of CPUs.
+        patches = [
+            mock.patch.object(compiler, "PARALLEL_PARSING_THRESHOLD", 0),
+            mock.patch.object(compiler.os, "cpu_count", return_value=2),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_order(self):
+        modules = [f"let a{i} = {i}\nlet b = a{i}\n" for i in range(4)]
+        result = compiler._parse_modules(modules)
+        self.assertEqual(result, [Parser().parse(module) for module in modules])
+
+    def test_error(self):
+        with self.assertRaises(errors.AngelSyntaxError):
+            compiler._parse_modules(["let a = 1", "let = 1"])
+
+    def test_imported_modules(self):
+        with testutils.modules_directory(self.MODULES):
+            with mock.patch.object(compiler, "PARALLEL_PARSING_THRESHOLD", 10 ** 9):
+                expected = compiler.compile_string(self.CODE)
+            with mock.patch.object(
+                compiler, "ProcessPoolExecutor", wraps=compiler.ProcessPoolExecutor
+            ) as executor:
+                self.assertEqual(compiler.compile_string(self.CODE), expected)
+        # foo and bar are found in the code, baz in foo.
+        self.assertEqual(executor.call_count, 1)
+        for name in ("add", "double", "triple"):
+            self.assertIn(f"_{name}(", expected)
+        self.assertLess(expected.index("_add("), expected.index("_double("))
+
+
+class TestPackrat(unittest.TestCase):
+    code = "let a = 1\nfoo.bar[a](2)\nif a == 1:\n    print(a)\n    a.b = c\n"
+
+    def test_same_result(self):
+        parser = Parser(packrat=True)
+        self.assertEqual(parser.parse(self.code), Parser().parse(self.code))
+        self.assertEqual(parser.packrat_hits["parse_trailer"], 5)
+        self.assertEqual(Parser().packrat_hits, {})
+
+    def test_bounded_cache(self):
+        parser = Parser(packrat=True, packrat_cache_size=2)
+        self.assertEqual(parser.parse(self.code), Parser().parse(self.code))
+        self.assertLessEqual(len(parser.packrat_cache), 2)
+
+
+class TestReparse(unittest.TestCase):
+    code = "let a = 1\nif a == 1:\n    print(a)\nvar b = a\nb = 2\n"
+
+    def check(self, offset: int, removed_length: int, inserted_text: str) -> nodes.AST:
+        parser = Parser()
+        ast = parser.parse(self.code)
+        new_code = self.code[:offset] + inserted_text + self.code[offset + removed_length:]
+        result = parser.reparse(ast, offset, removed_length, inserted_text)
+        self.assertEqual(result, Parser().parse(new_code))
+        self.assertEqual([node.line for node in result], [node.line for node in Parser().parse(new_code)])
+        return result
+
+    def test_edit_statement(self):
+        offset = self.code.index("1\n")
+        self.check(offset, 1, "2 + 3\n\n")
+
+    def test_reuse_unaffected_statements(self):
+        parser = Parser()
+        ast = parser.parse(self.code)
+        result = parser.reparse(ast, self.code.index("var") + 4, 1, "c")
+        self.assertIs(result[0], ast[0])
+        self.assertIs(result[1], ast[1])
+        self.assertIsNot(result[2], ast[2])
+        self.assertIs(result[3], ast[3])
+        result = parser.reparse(result, 0, 0, "\n\n")
+        self.assertIs(result[3], ast[3])
+        self.assertEqual(result[3].line, 7)
+
+    def test_extend_previous_body(self):
+        result = self.check(self.code.index("var"), 0, "    print(2)\n")
+        self.assertEqual(len(result[1].body), 2)
+
+    def test_join_statements(self):
+        self.check(self.code.index("\nb = 2"), 1, " ")
 
 
 if __name__ == '__main__':
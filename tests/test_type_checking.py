@@ -0,0 +1,518 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import compiler
+from compiler import (
+    analysis,
+    analysis_cache,
+    ast_cache,
+    clarification,
+    errors,
+    estimation,
+    nodes,
+    parallel_analysis,
+    parsers,
+    type_checking,
+)
+from compiler.context import Context
+from compiler.environment import Environment
+from compiler.templates import TemplateTypes
+
+
+class TestUnificationCache(unittest.TestCase):
+    def setUp(self):
+        self.type_checker = type_checking.TypeChecker(
+            Context([], main_hash='', mangle_names=False), Environment(load_builtins=True)
+        )
+
+    def test_hits(self):
+        subtype = nodes.VectorType(nodes.BuiltinType.i8)
+        for _ in range(3):
+            result = self.type_checker.unify_types(subtype, nodes.BuiltinType.convertible_to_string, {})
+            self.assertIs(result.type, nodes.BuiltinType.convertible_to_string)
+        self.assertEqual((self.type_checker.unification_cache_hits, self.type_checker.unification_cache_misses), (2, 1))
+        self.assertAlmostEqual(self.type_checker.unification_cache_hit_rate, 2 / 3)
+
+    def test_failures(self):
+        for line in (1, 2):
+            self.type_checker.code = errors.Code("", line)
+            with self.assertRaises(errors.AngelTypeError) as context:
+                self.type_checker.unify_types(nodes.BuiltinType.string, nodes.BuiltinType.i8, {})
+            self.assertEqual(context.exception.code.line, line)
+        self.assertEqual(self.type_checker.unification_cache_hits, 1)
+
+    def test_context_dependent_types_are_not_cached(self):
+        mapping = {}
+        result = self.type_checker.unify_types(
+            nodes.VectorType(nodes.BuiltinType.string), nodes.VectorType(nodes.Name("T")), mapping
+        )
+        self.assertEqual(result.type, nodes.VectorType(nodes.BuiltinType.string))
+        self.assertEqual(mapping, {"T": nodes.BuiltinType.string})
+        self.assertEqual(len(self.type_checker.unification_cache), 0)
+
+    def test_size(self):
+        type_checker = type_checking.TypeChecker(
+            Context([], main_hash='', mangle_names=False), Environment(), unification_cache_size=2
+        )
+        for type_ in (nodes.BuiltinType.i8, nodes.BuiltinType.i16, nodes.BuiltinType.i32):
+            type_checker.unify_types(type_, nodes.BuiltinType.i64, {})
+        self.assertEqual(
+            list(type_checker.unification_cache),
+            [(nodes.BuiltinType.i16, nodes.BuiltinType.i64), (nodes.BuiltinType.i32, nodes.BuiltinType.i64)]
+        )
+
+
+class TestTryUnify(unittest.TestCase):
+    def setUp(self):
+        self.type_checker = type_checking.TypeChecker(
+            Context([], main_hash='', mangle_names=False), Environment(load_builtins=True)
+        )
+
+    def test_failure(self):
+        subtype, supertype = nodes.VectorType(nodes.BuiltinType.string), nodes.VectorType(nodes.BuiltinType.i8)
+        failure = self.type_checker.try_unify_types(subtype, supertype, {})
+        self.assertEqual(failure, type_checking.UnificationFailure(subtype, supertype, [subtype]))
+        with self.assertRaises(errors.AngelTypeError) as context:
+            self.type_checker.unify_types(subtype, supertype, {})
+        self.assertEqual(context.exception.message, "[I8] is not a supertype of [String]")
+
+    def test_success(self):
+        result = self.type_checker.try_unify_types(nodes.BuiltinType.i8, nodes.BuiltinType.i16, {})
+        self.assertEqual(result, type_checking.UnificationResult(nodes.BuiltinType.i16, {}))
+        self.assertTrue(self.type_checker.eval_is(nodes.BuiltinType.i8, nodes.BuiltinType.i16, {}))
+        self.assertFalse(self.type_checker.eval_is(nodes.BuiltinType.i16, nodes.BuiltinType.i8, {}))
+
+    def test_list_types(self):
+        subtypes = [nodes.BuiltinType.i8, nodes.BuiltinType.i16]
+        result = self.type_checker.try_unify_list_types(subtypes, nodes.BuiltinType.i16, {})
+        self.assertIs(result.type, nodes.BuiltinType.i16)
+        failure = self.type_checker.try_unify_list_types(subtypes, nodes.BuiltinType.string, {})
+        self.assertEqual(failure.possible_types, subtypes)
+        self.assertEqual(
+            self.type_checker.unification_error(self.type_checker.try_unify_list_types([], None, {})).message,
+            "no subtypes to unify"
+        )
+
+
+class TestInferredTypes(unittest.TestCase):
+    def setUp(self):
+        self.context = Context([], main_hash='', mangle_names=False)
+        self.type_checker = type_checking.TypeChecker(self.context, Environment(load_builtins=True))
+
+    def test_saved(self):
+        literal = nodes.IntegerLiteral("300")
+        self.assertIs(self.type_checker.infer_type(literal).type, nodes.BuiltinType.i16)
+        self.assertEqual(self.context.inferred_types, {id(literal): (literal, nodes.BuiltinType.i16)})
+        # Another stage gets the saved type.
+        other = type_checking.TypeChecker(self.context, Environment(load_builtins=True))
+        self.context.inferred_types[id(literal)] = (literal, nodes.BuiltinType.i32)
+        self.assertIs(other.infer_type(literal).type, nodes.BuiltinType.i32)
+
+    def test_not_saved(self):
+        literal = nodes.IntegerLiteral("1")
+        self.assertIs(self.type_checker.infer_type(literal, nodes.BuiltinType.i64).type, nodes.BuiltinType.i64)
+        vector = nodes.VectorLiteral([])
+        self.assertIsInstance(self.type_checker.infer_type(vector).type.subtype, nodes.TemplateType)
+        self.assertEqual(self.context.inferred_types, {})
+
+    def test_shared_template_types(self):
+        other = type_checking.TypeChecker(self.context, Environment(load_builtins=True))
+        first, second = self.type_checker.create_template_type(), other.create_template_type()
+        self.assertNotEqual(first.id, second.id)
+        self.assertIs(self.context.template_types, other.template_types)
+
+
+class AnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.context = Context([], main_hash='', mangle_names=False)
+        self.env = Environment(load_builtins=True)
+
+    def analyze(self, analyzer, lines):
+        self.context.lines = lines
+        clarifier = clarification.Clarifier(self.context)
+        list(analyzer.analyze_ast(clarifier.clarify_ast(parsers.Parser().parse("\n".join(lines) + "\n"))))
+
+
+class TestInterfaceCheckResults(AnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.env.add_struct(1, nodes.Name("C"), [], [])
+        self.type_checker = type_checking.TypeChecker(self.context, self.env)
+        self.clause = nodes.BinaryExpression(nodes.Name("T"), nodes.Operator.is_, nodes.BuiltinType.eq)
+
+    def test_saved(self):
+        self.assertFalse(self.type_checker.eval_where_clause(self.clause, {"T": nodes.Name("C")}))
+        self.assertTrue(self.type_checker.eval_where_clause(self.clause, {"T": nodes.BuiltinType.i32}))
+        self.assertEqual(self.context.where_clause_results, {
+            (nodes.type_key(nodes.Name("C")), nodes.BuiltinType.eq): False,
+            (nodes.BuiltinType.i32, nodes.BuiltinType.eq): True,
+        })
+
+    def test_parameters_not_saved(self):
+        self.env.add_parameters(1, [nodes.Name("T")])
+        mapping: type_checking.Mapping = {}
+        self.type_checker.eval_where_clause(self.clause, mapping)
+        self.assertEqual(self.context.where_clause_results, {})
+
+    def test_forgotten_when_struct_is_extended(self):
+        analyzer = analysis.Analyzer(self.context, self.env)
+        self.assertFalse(analyzer._type_checker.eval_where_clause(self.clause, {"T": nodes.Name("C")}))
+        self.assertTrue(self.context.where_clause_results)
+        self.analyze(analyzer, [
+            "extension C is Eq:",
+            "    fun __eq__(other: C) -> Bool:",
+            "        return True",
+        ])
+        self.assertEqual(self.context.where_clause_results, {})
+        self.assertTrue(analyzer._type_checker.eval_where_clause(self.clause, {"T": nodes.Name("C")}))
+
+    def test_implementations_checked_once(self):
+        analyzer = analysis.Analyzer(self.context, self.env)
+        self.analyze(analyzer, [
+            "struct D is Eq:",
+            "    fun __eq__(other: D) -> Bool:",
+            "        return True",
+        ])
+        entry = self.env.get(nodes.Name("D"))
+        self.assertEqual(analyzer._checked_interface_implementations, {(id(entry), nodes.BuiltinType.eq): entry})
+        self.analyze(analyzer, [
+            "interface Named:",
+            "    fun name() -> String",
+            "extension D is Named:",
+            "    fun name() -> String:",
+            '        return "D"',
+        ])
+        self.assertEqual(
+            analyzer._checked_interface_implementations, {(id(entry), nodes.type_key(nodes.Name("Named"))): entry}
+        )
+
+
+class TestInitOverloads(AnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.analyzer = analysis.Analyzer(self.context, self.env)
+        self.analyze(self.analyzer, [
+            "struct P:",
+            "    x: I32",
+            "    init(x: I32):",
+            "        self.x = x",
+            "    init(name: String):",
+            "        self.x = 0",
+            "    init(values: [I32]):",
+            "        self.x = 1",
+            "    init(x: I32, y: I32):",
+            "        self.x = x + y",
+        ])
+        self.entry = self.env.get(nodes.Name("P"))
+
+    def plausible(self, *arguments):
+        return [
+            [arg.type for arg in init_entry.arguments]
+            for init_entry in self.entry.plausible_init_declarations(list(arguments))
+        ]
+
+    def test_plausible(self):
+        string_type, vector_type = nodes.BuiltinType.string, nodes.VectorType(nodes.BuiltinType.i32)
+        self.assertEqual(self.plausible(nodes.StringLiteral("a")), [[string_type]])
+        self.assertEqual(self.plausible(nodes.VectorLiteral([])), [[vector_type]])
+        self.assertEqual(
+            self.plausible(nodes.Name("a")), [[nodes.BuiltinType.i32], [string_type], [vector_type]]
+        )
+        self.assertEqual(
+            self.plausible(nodes.IntegerLiteral("1"), nodes.IntegerLiteral("2")),
+            [[nodes.BuiltinType.i32, nodes.BuiltinType.i32]]
+        )
+        self.assertEqual(self.plausible(), [])
+        self.assertEqual(list(self.entry.init_index), [
+            (1, nodes.BuiltinType.string), (1, nodes.VectorType), (1, None), (2, None), (0, None)
+        ])
+
+    def test_match(self):
+        self.analyze(self.analyzer, ['let p = P("a")', 'let q = P([1, 2])', 'let r = P(1, 2)'])
+
+    def test_no_match(self):
+        with self.assertRaises(errors.AngelWrongArguments) as context:
+            self.analyze(self.analyzer, ['let p = P("a", "b")'])
+        self.assertIn("(I32) or (String) or ([I32]) or (I32, I32)", str(context.exception))
+
+
+class TestParallelAnalysis(unittest.TestCase):
+    LINES = [
+        "fun first(a: I64) -> I64:",
+        "    return a",
+        "",
+        "fun second(a: I64) -> I64:",
+        "    return first(a)",
+        "",
+        "fun third(s: String) -> String:",
+        "    return s + \"!\"",
+        "",
+        "fun fourth(a: I64) -> I64:",
+        "    return second(first(a))",
+        "",
+        "print(fourth(1))",
+        "print(third(\"a\"))",
+    ]
+
+    def compile(self, lines, threshold, cpus=2):
+        default, debug = analysis.PARALLEL_ANALYSIS_THRESHOLD, compiler.DEBUG
+        analysis.PARALLEL_ANALYSIS_THRESHOLD, compiler.DEBUG = threshold, True
+        try:
+            with mock.patch.object(analysis.os, "cpu_count", return_value=cpus):
+                return compiler.compile_string("\n".join(lines) + "\n", mangle_names=False)
+        except errors.AngelError as e:
+            return str(e)
+        finally:
+            analysis.PARALLEL_ANALYSIS_THRESHOLD, compiler.DEBUG = default, debug
+
+    def test_same_output(self):
+        for threshold in (1, 2):
+            self.assertEqual(self.compile(self.LINES, threshold), self.compile(self.LINES, 10 ** 9))
+
+    def test_no_workers_with_one_cpu(self):
+        expected = self.compile(self.LINES, 10 ** 9)
+        with mock.patch.object(analysis, "ProcessPoolExecutor", side_effect=AssertionError):
+            self.assertEqual(self.compile(self.LINES, 1, cpus=1), expected)
+
+    def test_first_error(self):
+        lines = self.LINES[:4] + ["    return \"b\""] + self.LINES[5:7] + ["    return 1"] + self.LINES[8:]
+        self.assertIn("return", self.compile(lines, 10 ** 9))
+        self.assertEqual(self.compile(lines, 1), self.compile(lines, 10 ** 9))
+
+    def test_referenced_names(self):
+        lines = self.LINES[:5]
+        clarifier = clarification.Clarifier(Context(lines, main_hash='', mangle_names=False))
+        declaration = list(clarifier.clarify_ast(parsers.Parser().parse("\n".join(lines) + "\n")))[1]
+        self.assertEqual(parallel_analysis.referenced_names(declaration), {"second", "first", "a"})
+
+    def test_loaded_template_types_follow_existing_ones(self):
+        worker_types = TemplateTypes()
+        first, second = worker_types.new(), worker_types.new()
+        worker_types.union(first, second)
+        worker_types.resolve(first, nodes.VectorType(nodes.TemplateType(second)))
+        data = parallel_analysis.dump_results([[nodes.TemplateType(first)]], worker_types, [])
+        template_types = TemplateTypes()
+        template_types.new()
+        [body] = parallel_analysis.load_results(data, template_types, [])
+        self.assertEqual(body, [nodes.TemplateType(first + 1)])
+        self.assertEqual(template_types.find(first + 1), template_types.find(second + 1))
+        self.assertEqual(template_types[first + 1], nodes.VectorType(nodes.TemplateType(second + 1)))
+
+
+class TestAnalysisCache(unittest.TestCase):
+    LINES = [
+        "struct Point:",
+        "    x: I64",
+        "    y: I64",
+        "",
+        "fun first(p: Point) -> I64:",
+        "    return p.x",
+        "",
+        "fun second(p: Point) -> I64:",
+        "    return first(p)",
+        "",
+        "fun third(s: String) -> [String]:",
+        "    var strings: [String] = []",
+        "    strings.append(s)",
+        "    return strings",
+        "",
+        "print(second(Point(1, 2)))",
+        "print(third(\"a\"))",
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = analysis_cache.enable(self.directory.name)
+
+    def tearDown(self):
+        analysis_cache.disable()
+        self.directory.cleanup()
+
+    def compile(self, lines, mangle_names=True):
+        self.cache.stats = ast_cache.CacheStats()
+        return compiler.compile_string("\n".join(lines) + "\n", mangle_names=mangle_names)
+
+    def uncached(self, lines, mangle_names=True):
+        analysis_cache.disable()
+        try:
+            return compiler.compile_string("\n".join(lines) + "\n", mangle_names=mangle_names)
+        finally:
+            self.cache = analysis_cache.enable(self.directory.name)
+
+    def test_reused(self):
+        for mangle_names in (False, True):
+            expected = self.uncached(self.LINES, mangle_names)
+            self.assertEqual(self.compile(self.LINES, mangle_names), expected)
+            self.assertEqual(self.compile(self.LINES, mangle_names), expected)
+            self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=3, misses=0))
+
+    def test_changed_function_and_dependents_are_analyzed(self):
+        self.compile(self.LINES)
+        lines = self.LINES[:5] + ["fun first(p: Point) -> I64:", "    return p.y"] + self.LINES[7:]
+        del lines[4]
+        expected = self.uncached(lines)
+        self.assertEqual(self.compile(lines), expected)
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=1, misses=2))
+
+    def test_changed_struct(self):
+        self.compile(self.LINES)
+        lines = self.LINES[:3] + ["    z: I64"] + self.LINES[3:]
+        lines[-2] = "print(second(Point(1, 2, 3)))"
+        expected = self.uncached(lines)
+        self.assertEqual(self.compile(lines), expected)
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=1, misses=2))
+
+    def test_moved_function(self):
+        self.compile(self.LINES)
+        lines = ["let a = 1", ""] + self.LINES + ["print(a)"]
+        expected = self.uncached(lines)
+        self.assertEqual(self.compile(lines), expected)
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=3, misses=0))
+
+    def test_function_resolving_global_template_type(self):
+        lines = [
+            "var v = []",
+            "fun f() -> I32:",
+            "    v.append(1)",
+            "    return 0",
+            "print(f())",
+            "print(v)",
+        ]
+        expected = self.uncached(lines)
+        self.assertEqual(self.compile(lines), expected)
+        self.assertEqual(self.compile(lines), expected)
+        expected = self.uncached(lines + ["print(1)"])
+        self.assertEqual(self.compile(lines + ["print(1)"]), expected)
+        # The body of f resolves the element type of v, so it is analyzed every time.
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=0, misses=1))
+
+    def test_error_after_reused_function(self):
+        self.compile(self.LINES)
+        lines = self.LINES[:9] + ["    return \"b\""] + self.LINES[10:]
+        compiler.DEBUG = True
+        try:
+            with self.assertRaises(errors.AngelTypeError) as context:
+                self.compile(lines)
+        finally:
+            compiler.DEBUG = False
+        self.assertEqual(context.exception.code.line, 10)
+        # The function after the failing one is taken from the cache before the failing one is analyzed.
+        self.assertEqual(self.cache.stats, ast_cache.CacheStats(hits=2, misses=1))
+
+
+class TestCheckOnly(unittest.TestCase):
+    LINES = [
+        "fun count(limit: I64) -> I64:",
+        "    var total: I64 = 0",
+        "    var i: I64 = 0",
+        "    while i < limit:",
+        "        total = total + i",
+        "        i = i + 1",
+        "    return total",
+        "",
+        "let value = count(100)",
+        "print(value)",
+    ]
+
+    def check(self, lines):
+        compiler.DEBUG = True
+        try:
+            compiler.check_string("\n".join(lines) + "\n")
+        finally:
+            compiler.DEBUG = False
+
+    def test_values_are_not_estimated(self):
+        with mock.patch.object(estimation.Evaluator, "estimate_expression", side_effect=AssertionError):
+            self.check(self.LINES)
+
+    def test_type_errors(self):
+        lines = self.LINES[:6] + ["    return \"total\""] + self.LINES[7:]
+        with self.assertRaises(errors.AngelTypeError) as context:
+            self.check(lines)
+        self.assertEqual(context.exception.code.line, 7)
+
+    def test_where_clauses_are_checked(self):
+        lines = [
+            "struct Point:",
+            "    x: I64",
+            "",
+            "fun same<A>(a: A, b: A) -> Bool where A is Eq:",
+            "    return True",
+            "",
+            "print(same(1, 2))",
+            "print(same(Point(1), Point(2)))",
+        ]
+        with self.assertRaises(errors.AngelUnsatisfiedWhereClause) as context:
+            self.check(lines)
+        self.assertEqual(context.exception.code.line, 8)
+
+
+class TestBuiltinTypeLattice(unittest.TestCase):
+    def test_subtypes(self):
+        for subtype in nodes.BuiltinType:
+            if subtype.value not in nodes.BUILTIN_SUPERTYPES:
+                continue
+            for supertype in nodes.BuiltinType:
+                self.assertEqual(
+                    subtype.is_builtin_subtype(supertype), supertype.value in subtype.get_builtin_supertypes()
+                )
+
+    def test_kinds(self):
+        self.assertTrue(nodes.BuiltinType.u16.is_finite_int_type)
+        self.assertFalse(nodes.BuiltinType.int_.is_finite_int_type)
+        self.assertTrue(nodes.BuiltinType.f32.is_finite)
+        self.assertTrue(nodes.BuiltinType.eq.is_interface)
+        self.assertFalse(nodes.BuiltinType.string.is_interface)
+
+    def test_possible_int_types(self):
+        i8, i16, i32, i64 = nodes.BuiltinType.i8, nodes.BuiltinType.i16, nodes.BuiltinType.i32, nodes.BuiltinType.i64
+        u8, u16, u32, u64 = nodes.BuiltinType.u8, nodes.BuiltinType.u16, nodes.BuiltinType.u32, nodes.BuiltinType.u64
+        cases = [
+            (0, [i8, i16, i32, i64, u8, u16, u32, u64]),
+            (127, [i8, i16, i32, i64, u8, u16, u32, u64]),
+            (128, [i16, i32, i64, u8, u16, u32, u64]),
+            (256, [i16, i32, i64, u16, u32, u64]),
+            (-128, [i8, i16, i32, i64]),
+            (-129, [i16, i32, i64]),
+            (2 ** 63, [u64]),
+            (-2 ** 63, [i64]),
+            (2 ** 64, []),
+            (-2 ** 63 - 1, []),
+        ]
+        for value, expected in cases:
+            self.assertEqual(type_checking.get_possible_int_types_based_on_value(value), expected)
+
+
+class TestTemplateTypes(unittest.TestCase):
+    def test_union(self):
+        template_types = TemplateTypes()
+        first, second, third = template_types.new(), template_types.new(), template_types.new()
+        template_types.union(first, second)
+        self.assertIsNone(template_types.union(second, third))
+        template_types.resolve(third, nodes.BuiltinType.i8)
+        for id_ in (first, second, third):
+            self.assertIs(template_types[id_], nodes.BuiltinType.i8)
+        self.assertEqual(template_types.union(first, template_types.new()), nodes.BuiltinType.i8)
+
+    def test_path_compression(self):
+        template_types = TemplateTypes()
+        ids = [template_types.new() for _ in range(4)]
+        for child, parent in zip(ids, ids[1:]):
+            template_types.parents[child] = parent
+        root = template_types.find(ids[0])
+        self.assertEqual(root, ids[-1])
+        self.assertEqual([template_types.parents[id_] for id_ in ids], [root] * 4)
+
+    def test_unify_unresolved_template_types(self):
+        type_checker = type_checking.TypeChecker(
+            Context([], main_hash='', mangle_names=False), Environment(load_builtins=True)
+        )
+        first, second = type_checker.create_template_type(), type_checker.create_template_type()
+        self.assertEqual(type_checker.unify_types(first, second, {}).type, first)
+        type_checker.unify_types(nodes.BuiltinType.string, second, {})
+        self.assertIs(type_checker.replace_template_types(nodes.VectorType(first)).subtype, nodes.BuiltinType.string)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from compiler import nodes, errors, utils, visitors
+from compiler.parsers import Parser
+
+
+class TestVisitors(unittest.TestCase):
+    def test_in_place_transformer(self):
+        class Doubler(visitors.Transformer):
+            in_place = True
+            node_dispatcher = visitors.Dispatcher({
+                nodes.IntegerLiteral: lambda self, node: nodes.IntegerLiteral(str(int(node.value) * 2)),
+            })
+
+        ast = Parser().parse("let a = [1, 2]\n")
+        vector = ast[0].value
+        self.assertIs(Doubler().visit(ast), ast)
+        self.assertIs(ast[0].value, vector)
+        self.assertEqual(vector.elements, [nodes.IntegerLiteral("2"), nodes.IntegerLiteral("4")])
+
+    def test_visitor_without_handler(self):
+        with self.assertRaises(errors.AngelNotImplemented):
+            visitors.Visitor().visit(nodes.Break(1))
+
+    def test_walk(self):
+        ast = Parser().parse("let a = b + 1\nprint(a)\n")
+        names = [node.member for node in visitors.walk(ast) if isinstance(node, nodes.Name)]
+        self.assertEqual(names, ["a", "b", "print", "a"])
+        self.assertIs(next(visitors.walk(ast)), ast[0])
+
+    def test_dispatcher_uses_overridden_methods(self):
+        class Base:
+            dispatcher = visitors.Dispatcher({int: 'handle', str: lambda self, value: value + "!"})
+
+            def handle(self, value):
+                return value
+
+        class Derived(Base):
+            def handle(self, value):
+                return value + 1
+
+        self.assertEqual(utils.dispatch(Base().dispatcher, int, Base(), 1), 1)
+        self.assertEqual(utils.dispatch(Derived().dispatcher, int, Derived(), 1), 2)
+        self.assertEqual(utils.dispatch(Derived().dispatcher, str, Derived(), "a"), "a!")
+        with self.assertRaises(errors.AngelNotImplemented):
+            utils.dispatch(Base().dispatcher, float, Base(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()